@@ -0,0 +1 @@
+# Balatro Mod & Injector Manager: UI-free core shared by the Kivy app and the CLI.
@@ -0,0 +1,277 @@
+import argparse
+import sys
+
+from . import core, lovely
+
+
+def _config_value(config, key, default):
+    value = config.get(key)
+    return core.clean_path(value) if value else default
+
+
+def cmd_install(args):
+    from . import batch
+    paths = [core.clean_path(p) for p in args.paths]
+    sources = batch.collect_sources(paths)
+    if len(sources) == 1:
+        # A single mod, possibly the only one in a folder of mods.
+        print(core.install_mod(sources[0], args.mods_dir, dedupe=not args.no_dedupe))
+        return
+    report = batch.install_mods(paths, args.mods_dir, workers=args.jobs, dedupe=not args.no_dedupe)
+    print(report.summary())
+    if report.failed or report.plan.collisions:
+        raise core.ManagerError("Batch install incomplete.")
+
+
+def cmd_remove(args):
+    from .trash import Trash
+    for mod_name in args.names:
+        entry_id = core.uninstall_mod(mod_name, args.mods_dir, undo_seconds=None if args.keep else 0)
+        if args.keep and entry_id:
+            print(f"Mod '{mod_name}' moved to the trash (restore with: trash --restore {entry_id}).")
+        else:
+            print(f"Mod '{mod_name}' uninstalled.")
+    # This process won't be around for the background deleter to finish.
+    Trash.beside(args.mods_dir).purge()
+
+
+def cmd_trash(args):
+    from .trash import Trash
+    trash = Trash.beside(args.mods_dir)
+    if args.restore:
+        print(f"Restored '{trash.restore(args.restore)}'.")
+    elif args.empty:
+        print(f"Deleted {trash.purge(everything=True)} trashed folder(s).")
+    else:
+        for meta in trash.entries():
+            print(f"{meta['id']}\t{meta['kind']}\t{meta['name']}")
+
+
+def cmd_list(args):
+    if not (args.details or args.search or args.sort):
+        for mod_name in core.list_mods(args.mods_dir):
+            print(mod_name)
+        return
+    from .index import ModIndex
+    from .search import ModSearch
+    mods, changed = ModIndex(args.mods_dir).refresh()
+    mods = ModSearch(mods).search(args.search or "", args.sort or "name")
+    if not args.details:
+        for mod in mods:
+            print(mod["dir"])
+        return
+    for mod in mods:
+        print("\t".join([mod["dir"], mod.get("name", ""), mod.get("version", ""), ", ".join(mod.get("authors", [])),
+                         str(mod.get("size", "")), str(mod.get("files", ""))]))
+
+
+def cmd_catalog(args):
+    from .catalog import Catalog
+    catalog = Catalog(args.url)
+    mods, changed = catalog.refresh(offline=args.offline)
+    if catalog.error:
+        print(catalog.error, file=sys.stderr)
+    if args.install:
+        for mod_id in args.install:
+            print(catalog.install(mod_id, args.mods_dir))
+        return
+    for mod in catalog.search(args.search or "", args.sort or "name"):
+        print("\t".join([mod["dir"], mod["name"], mod["version"], ", ".join(mod["authors"]), ", ".join(mod["tags"])]))
+
+
+def cmd_download(args):
+    manifest = lovely.fetch(args.release, args.version, offline=args.offline)
+    if manifest.get("dll"):
+        print(f"Lovely {args.version} downloaded and extracted successfully.")
+    else:
+        print("Extraction complete, but version.dll not found.")
+
+
+def cmd_install_lovely(args):
+    if lovely.install(args.game_dir, args.release, args.version):
+        print(f"Lovely {args.version} installed.")
+    else:
+        print(f"Lovely {args.version} is already installed.")
+
+
+def cmd_lovely_status(args):
+    installed = lovely.installed_version(args.game_dir)
+    print("Installed: " + ("none" if installed is None else installed[0]))
+    for manifest in lovely.downloaded():
+        print(f"Downloaded: {manifest['version']}\t{manifest['release']}")
+
+
+def cmd_gc(args):
+    from .store import ContentStore
+    store = ContentStore.beside(args.mods_dir)
+    freed = store.gc(keep_bytes=0 if args.all else None)
+    total, unused = store.usage()
+    print(f"Freed {freed / (1024 * 1024):.1f} MB; store holds {total / (1024 * 1024):.1f} MB "
+          f"({unused / (1024 * 1024):.1f} MB not used by any mod).")
+
+
+def cmd_profile(args):
+    from .config import ConfigStore
+    store = ConfigStore()
+    if args.delete:
+        store.delete(args.delete)
+    elif args.name:
+        store.switch(args.name)
+        print(f"Switched to profile '{args.name}'.")
+        return
+    for name in store.profiles():
+        print(("* " if name == store.active else "  ") + name)
+
+
+def cmd_mod_profile(args):
+    from .profiles import ModProfiles
+    profiles = ModProfiles(args.mods_dir)
+    if args.create:
+        profiles.create(args.create)
+        print(f"Profile '{args.create}' created.")
+    elif args.delete:
+        profiles.delete(args.delete)
+        print(f"Profile '{args.delete}' deleted.")
+    elif args.name:
+        profiles.switch(args.name)
+        print(f"Switched to profile '{args.name}'.")
+    else:
+        active = profiles.active()
+        for name in profiles.names():
+            print(("* " if name == active else "  ") + name)
+
+
+def cmd_trace(args):
+    from . import trace
+    records = trace.read_log()
+    if args.last:
+        records = records[-args.last:]
+    if args.span:
+        records = [r for r in records if r["span"] == args.span]
+    print(trace.format_summary(trace.summary(records)))
+
+
+def cmd_log(args):
+    import time
+    from . import logtail
+    pattern = logtail.compile_filter(args.filter)
+    tail = logtail.LogTail(args.mods_dir)
+    tail.poll()
+    while tail.behind():
+        tail.poll()
+    if tail.path is None:
+        raise core.ManagerError("No Lovely log found in " + logtail.log_folder(args.mods_dir))
+    lines = tail.snapshot(pattern, args.errors)[-args.lines:]
+    for number, text, is_error in lines:
+        print(text)
+    if not args.follow:
+        return
+    shown = lines[-1][0] if lines else 0
+    try:
+        while True:
+            if not tail.poll():
+                time.sleep(0.5)
+            for number, text, is_error in tail.snapshot(pattern, args.errors):
+                if number > shown:
+                    print(text, flush=True)
+                    shown = number
+    except KeyboardInterrupt:
+        pass
+
+
+def build_parser(config):
+    parser = argparse.ArgumentParser(prog="python -m balatro_manager",
+                                     description="Balatro Mod & Injector Manager (headless)")
+    parser.add_argument("--mods-dir", default=_config_value(config, "mod_target", core.default_mod_target),
+                        help="Mods target directory")
+    parser.add_argument("--game-dir", default=_config_value(config, "target_dll", core.default_target_dll),
+                        help="Target DLL directory (Balatro install)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("install", help="Install mods from ZIP files, mod folders or folders of ZIPs")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Mods to install in parallel (default: CPU count)")
+    p.add_argument("--no-dedupe", action="store_true", help="Write files in full instead of linking them from the store")
+    p.set_defaults(func=cmd_install)
+
+    p = sub.add_parser("remove", help="Remove installed mods by name")
+    p.add_argument("names", nargs="+")
+    p.add_argument("--keep", action="store_true", help="Keep the mods in the trash so they can be restored")
+    p.set_defaults(func=cmd_remove)
+
+    p = sub.add_parser("trash", help="List removed mods kept in the trash, restore one, or empty it")
+    p.add_argument("--restore", metavar="ID", help="Move a trashed mod back into the Mods folder")
+    p.add_argument("--empty", action="store_true", help="Delete everything in the trash")
+    p.set_defaults(func=cmd_trash)
+
+    p = sub.add_parser("gc", help="Drop stored mod files that no installed mod uses")
+    p.add_argument("--all", action="store_true", help="Also drop the ones kept to make reinstalls cheap")
+    p.set_defaults(func=cmd_gc)
+
+    p = sub.add_parser("list", help="List installed mods")
+    p.add_argument("--details", action="store_true",
+                   help="Tab-separated directory, name, version, authors, size and file count (from the mod index)")
+    p.add_argument("--search", help="Only mods whose name, author or tags match every word")
+    p.add_argument("--sort", choices=["name", "size", "date"], help="Order by name, size or install date (newest first)")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("catalog", help="Browse or install mods from the remote mod catalog")
+    p.add_argument("--url", default=config.get("catalog_url"),
+                   help="Catalog index URL (default: catalog_url from config.json)")
+    p.add_argument("--search", help="Only mods whose name, author or tags match every word")
+    p.add_argument("--sort", choices=["name", "size", "date"], help="Order by name, size or last update (newest first)")
+    p.add_argument("--offline", action="store_true", help="Use the cached catalog without contacting the server")
+    p.add_argument("--install", nargs="+", metavar="ID", help="Download and install these mods")
+    p.set_defaults(func=cmd_catalog)
+
+    p = sub.add_parser("download", help="Download and extract a Lovely version")
+    p.add_argument("--release", default=lovely.DEFAULT_RELEASE, choices=lovely.RELEASES)
+    p.add_argument("--version", default=lovely.DEFAULT_VERSION, choices=lovely.VERSIONS)
+    p.add_argument("--offline", action="store_true", help="Install from the local archive cache only")
+    p.set_defaults(func=cmd_download)
+
+    p = sub.add_parser("install-lovely", help="Copy a downloaded version.dll into the game directory")
+    p.add_argument("--release", default=lovely.DEFAULT_RELEASE, choices=lovely.RELEASES)
+    p.add_argument("--version", default=lovely.DEFAULT_VERSION, choices=lovely.VERSIONS)
+    p.set_defaults(func=cmd_install_lovely)
+
+    p = sub.add_parser("lovely-status", help="Show the installed and downloaded Lovely versions")
+    p.set_defaults(func=cmd_lovely_status)
+
+    p = sub.add_parser("profile", help="List config profiles, or switch to (creating) a named one")
+    p.add_argument("name", nargs="?")
+    p.add_argument("--delete", metavar="NAME", help="Delete a profile")
+    p.set_defaults(func=cmd_profile)
+
+    p = sub.add_parser("mod-profile", help="List mod profiles, or swap the Mods folder to another one")
+    p.add_argument("name", nargs="?")
+    p.add_argument("--create", metavar="NAME", help="Create an empty mod profile")
+    p.add_argument("--delete", metavar="NAME", help="Delete an inactive mod profile and its mods")
+    p.set_defaults(func=cmd_mod_profile)
+
+    p = sub.add_parser("log", help="Show the newest Lovely log from the Mods folder")
+    p.add_argument("--follow", "-f", action="store_true", help="Keep printing lines as the game writes them")
+    p.add_argument("--filter", metavar="REGEX", help="Only lines matching this regular expression")
+    p.add_argument("--errors", action="store_true", help="Only error lines")
+    p.add_argument("--lines", "-n", type=int, default=50, help="Lines to show before following (default 50)")
+    p.set_defaults(func=cmd_log)
+
+    p = sub.add_parser("trace", help="Summarize recorded operation timings from the trace log")
+    p.add_argument("--last", type=int, metavar="N", help="Only the last N spans")
+    p.add_argument("--span", help="Only spans with this name (install, extract, download, ...)")
+    p.set_defaults(func=cmd_trace)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser(core.load_config()).parse_args(argv)
+    try:
+        args.func(args)
+    except core.ManagerError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
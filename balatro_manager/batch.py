@@ -0,0 +1,158 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import core
+
+
+# ----- Planning -----
+def source_size(mod_path):
+    if os.path.isdir(mod_path):
+        return sum(os.path.getsize(os.path.join(root_dir, f)) for root_dir, dirs, files in os.walk(mod_path) for f in files)
+    import zipfile
+    with zipfile.ZipFile(mod_path, 'r') as zf:
+        return sum(info.file_size for info in zf.infolist())
+
+
+def installed_names(mod_path):
+    return [name for prefix, name in core.mod_layout(mod_path)]
+
+
+# Files that file managers leave behind; they don't make a folder a mod.
+IGNORED_FILES = {"desktop.ini", "thumbs.db"}
+
+
+def is_mod_collection(path):
+    # A folder of mods: it holds at least one ZIP and nothing but ZIPs and folders.
+    # A mod folder has files of its own (main.lua, a manifest...), so one that merely
+    # bundles a ZIP among its files is still installed as a single mod.
+    if not os.path.isdir(path):
+        return False
+    archives = False
+    for entry in os.scandir(path):
+        name = entry.name.lower()
+        if entry.is_dir():
+            continue
+        if name.endswith(".zip"):
+            archives = True
+        elif not (name.startswith(".") or name in IGNORED_FILES):
+            return False
+    return archives
+
+
+def collect_sources(paths):
+    # A folder of mods (see is_mod_collection) is expanded into its ZIPs and
+    # sub-folders; any other path is installed as given.
+    sources = []
+    for path in paths:
+        if is_mod_collection(path):
+            for name in sorted(os.listdir(path)):
+                full = os.path.join(path, name)
+                if os.path.isdir(full) or name.lower().endswith(".zip"):
+                    sources.append(full)
+        else:
+            sources.append(path)
+    return sources
+
+
+def install_keys(paths, mod_target):
+    # Job keys (see jobs.mod_key) of every mod directory installing paths would write.
+    # A source that can't be read keys the Mods folder itself; its install fails early anyway.
+    from .jobs import mod_key
+    keys = set()
+    for source in collect_sources(paths):
+        try:
+            keys.update(mod_key(mod_target, name) for name in installed_names(source))
+        except Exception:
+            keys.add(mod_key(mod_target, ""))
+    return keys
+
+
+class BatchPlan:
+    def __init__(self, sources, mod_target):
+        self.sources = sources
+        self.mod_target = mod_target
+        self.names = {}
+        self.sizes = {}
+        self.errors = {}
+        self.collisions = {}
+        # Two sources may not install into the same top-level directory.
+        owners = {}
+        for source in sources:
+            try:
+                if not os.path.exists(source) or not (os.path.isdir(source) or source.lower().endswith(".zip")):
+                    raise core.ManagerError("Invalid mod selection.")
+                names = installed_names(source)
+                self.sizes[source] = source_size(source)
+            except Exception as e:
+                self.errors[source] = str(e)
+                continue
+            self.names[source] = names
+            for name in {n.lower() for n in names}:
+                owners.setdefault(name, []).append(source)
+        for name, owned_by in owners.items():
+            if len(owned_by) > 1:
+                self.collisions[name] = owned_by
+        existing = set(os.listdir(mod_target)) if os.path.isdir(mod_target) else set()
+        self.replaced = sorted(name for names in self.names.values() for name in names if name in existing)
+
+    def total_bytes(self):
+        return sum(self.sizes.values())
+
+    def ok(self):
+        return not self.errors and not self.collisions
+
+
+# ----- Report -----
+class BatchReport:
+    def __init__(self, plan):
+        self.plan = plan
+        self.installed = {}
+        self.failed = dict(plan.errors)
+
+    def summary(self):
+        lines = [f"Installed {len(self.installed)} of {len(self.plan.sources)} mods."]
+        for name, sources in sorted(self.plan.collisions.items()):
+            lines.append(f"Collision on '{name}': " + ", ".join(os.path.basename(s) for s in sources))
+        if self.plan.replaced:
+            lines.append("Replaced: " + ", ".join(self.plan.replaced))
+        for source, error in sorted(self.failed.items()):
+            lines.append(f"Failed {os.path.basename(source)}: {error}")
+        return "\n".join(lines)
+
+
+# ----- Install -----
+def install_mods(paths, mod_target, workers=None, progress=None, cancel=None, dedupe=True):
+    # Installs many mods concurrently. Nothing is written if the batch has invalid
+    # sources or name collisions; the returned report explains why.
+    plan = BatchPlan(collect_sources(paths), mod_target)
+    report = BatchReport(plan)
+    if not plan.ok():
+        return report
+    if not os.path.exists(mod_target):
+        os.makedirs(mod_target)
+    done_by_source = {}
+    total = plan.total_bytes()
+    lock = threading.Lock()
+
+    def source_progress(source):
+        def report_bytes(done, source_total):
+            with lock:
+                done_by_source[source] = done
+                all_done = sum(done_by_source.values())
+            if progress:
+                progress(all_done, total)
+        return report_bytes
+
+    def install(source):
+        try:
+            core.install_mod(source, mod_target, source_progress(source), cancel, dedupe=dedupe)
+            report.installed[source] = plan.names[source]
+        except core.OperationCancelled:
+            report.failed[source] = "Cancelled."
+        except Exception as e:
+            report.failed[source] = str(e)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 4) as executor:
+        list(executor.map(install, plan.sources))
+    return report
@@ -0,0 +1,212 @@
+import os
+import json
+import time
+import hashlib
+import threading
+
+from . import download, trace
+from .core import file_sha256
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# A cached archive whose server sent neither ETag nor Last-Modified can't be
+# revalidated; it is reused without asking for this long after it was downloaded.
+UNVALIDATED_MAX_AGE = 24 * 60 * 60
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+class CacheMiss(Exception):
+    pass
+
+
+# ----- Archive Cache -----
+class ArchiveCache:
+    # Release archives stored under objects/<sha256>, with index.json mapping each URL to
+    # its object plus the ETag/Last-Modified needed to revalidate it. Least recently used
+    # objects are evicted once the cache grows past max_bytes. Fetches of the same URL
+    # run one at a time, so the later ones find the archive the first one downloaded.
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.url_locks = {}
+        os.makedirs(self.objects_dir(), exist_ok=True)
+        os.makedirs(self.partial_dir(), exist_ok=True)
+
+    @classmethod
+    def shared(cls, root):
+        # One instance per cache folder, so every thread takes the same locks.
+        root = os.path.normpath(os.path.abspath(root))
+        with _caches_lock:
+            if root not in _caches:
+                _caches[root] = cls(root)
+            return _caches[root]
+
+    def objects_dir(self):
+        return os.path.join(self.root, "objects")
+
+    def partial_dir(self):
+        return os.path.join(self.root, "partial")
+
+    def index_path(self):
+        return os.path.join(self.root, "index.json")
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_dir(), sha256)
+
+    def load_index(self):
+        try:
+            with open(self.index_path(), "r") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def save_index(self, index):
+        # Another process (the CLI next to the app) may be saving at the same moment.
+        tmp = f"{self.index_path()}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f, indent=4)
+        os.replace(tmp, self.index_path())
+
+    def lookup(self, url):
+        entry = self.load_index().get(url)
+        if entry and os.path.isfile(self.object_path(entry["sha256"])):
+            return entry
+        return None
+
+    def touch(self, url):
+        with self.lock:
+            index = self.load_index()
+            if url in index:
+                index[url]["last_used"] = time.time()
+                self.save_index(index)
+
+    def revalidate(self, url, session):
+        # Returns (entry, headers): entry is set when the cached copy can be used as is,
+        # headers are the server's validators for a fresh download otherwise. A server
+        # error or an unreachable server doesn't fail the operation while there is a
+        # cached copy to fall back on.
+        entry = self.lookup(url)
+        if entry and not (entry.get("etag") or entry.get("last_modified")) and \
+                time.time() - entry.get("downloaded", 0) < UNVALIDATED_MAX_AGE:
+            return entry, {}
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            r = session.head(url, headers=headers, allow_redirects=True, timeout=30)
+        except Exception:
+            if not entry:
+                raise
+            # Network is unavailable; the cached copy is the best we have.
+            return entry, {}
+        if entry and (r.status_code == 304 or r.status_code >= 500):
+            return entry, {}
+        if entry and r.status_code < 300 and self._same(entry, r.headers):
+            # Servers often ignore conditional headers on HEAD; matching validators say the same.
+            return entry, {}
+        return None, r.headers
+
+    @staticmethod
+    def _same(entry, headers):
+        etag = headers.get("etag")
+        if etag and entry.get("etag"):
+            return etag == entry["etag"]
+        modified = headers.get("last-modified")
+        return bool(modified and modified == entry.get("last_modified"))
+
+    def partial_path(self, url):
+        # The folders are made again here and in add(): the shared instance outlives a
+        # user clearing the cache folder while the app is open.
+        os.makedirs(self.partial_dir(), exist_ok=True)
+        return os.path.join(self.partial_dir(), hashlib.sha256(url.encode()).hexdigest())
+
+    def fetch(self, url, progress=None, offline=False, session=None, **download_options):
+        # Returns (path, sha256) of the archive for url, downloading only when the
+        # cached copy is missing or the server reports it has changed.
+        with self.url_lock(url):
+            return self._fetch(url, progress, offline, session, **download_options)
+
+    def url_lock(self, url):
+        # Held by anything that revalidates and then downloads url.
+        with self.lock:
+            return self.url_locks.setdefault(url, threading.Lock())
+
+    def _fetch(self, url, progress, offline, session, **download_options):
+        if offline:
+            entry = self.lookup(url)
+            if not entry:
+                raise CacheMiss("Archive not in cache: " + url)
+        else:
+            session = session or download._new_session()
+            with trace.phase("revalidate"):
+                entry, headers = self.revalidate(url, session)
+        if entry:
+            self.touch(url)
+            trace.add(cached=True)
+            return self.object_path(entry["sha256"]), entry["sha256"]
+        partial = self.partial_path(url)
+        with trace.phase("network"):
+            try:
+                download.download_file(url, partial, progress, session=session, **download_options)
+            except download.DownloadCancelled:
+                raise
+            except Exception:
+                # The server said the archive changed but then failed to send it; an
+                # older copy still beats no copy.
+                entry = self.lookup(url)
+                if not entry:
+                    raise
+                trace.add(cached=True, stale=True)
+                return self.object_path(entry["sha256"]), entry["sha256"]
+        trace.add(bytes=os.path.getsize(partial), cached=False)
+        with trace.phase("hash"):
+            sha256 = file_sha256(partial)
+        return self.add(url, partial, sha256, headers)
+
+    def add(self, url, path, sha256, headers=None):
+        # Moves a fully downloaded archive into the store and records it for url.
+        headers = headers or {}
+        if os.path.exists(self.object_path(sha256)):
+            os.remove(path)
+        else:
+            os.makedirs(self.objects_dir(), exist_ok=True)
+            os.replace(path, self.object_path(sha256))
+        with self.lock:
+            index = self.load_index()
+            index[url] = {
+                "sha256": sha256,
+                "size": os.path.getsize(self.object_path(sha256)),
+                "etag": headers.get("etag"),
+                "last_modified": headers.get("last-modified"),
+                "downloaded": time.time(),
+                "last_used": time.time(),
+            }
+            self.evict(index, keep=sha256)
+            self.save_index(index)
+        return self.object_path(sha256), sha256
+
+    def evict(self, index, keep=None):
+        # Objects can be shared by several URLs, so sizes and recency are tracked per object.
+        objects = {}
+        for url, entry in index.items():
+            obj = objects.setdefault(entry["sha256"], {"size": entry["size"], "last_used": 0, "urls": []})
+            obj["last_used"] = max(obj["last_used"], entry["last_used"])
+            obj["urls"].append(url)
+        total = sum(obj["size"] for obj in objects.values())
+        for sha256, obj in sorted(objects.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if sha256 == keep:
+                continue
+            try:
+                os.remove(self.object_path(sha256))
+            except FileNotFoundError:
+                pass
+            for url in obj["urls"]:
+                del index[url]
+            total -= obj["size"]
@@ -0,0 +1,270 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from urllib.parse import urljoin
+
+from . import core, trace
+from .index import _as_list
+
+CATALOG_VERSION = 1
+# Connections kept open per host. Index refreshes and mod downloads share them, and
+# download_file opens up to four ranged connections to the same host at once.
+POOL_SIZE = 8
+FETCH_TIMEOUT = 30
+# A catalog older than this is refreshed when the app opens it; the cached copy is
+# shown straight away either way.
+MAX_AGE = 60 * 60
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def session():
+    # One pooled requests.Session for everything the catalog fetches, so refreshing the
+    # index and downloading mods from the same host reuse connections (and TLS sessions).
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            s.mount("http://", adapter)
+            s.mount("https://", adapter)
+            _session = s
+        return _session
+
+
+def catalog_path(url):
+    key = hashlib.sha1(url.encode()).hexdigest()
+    return os.path.join(core.cache_dir(), "catalog", key + ".json")
+
+
+def discard_download(path):
+    # Removes a link returned by Catalog.download, and the folder it was made in.
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    try:
+        os.rmdir(os.path.dirname(path))
+    except OSError:
+        pass
+
+
+def _number(value):
+    try:
+        return max(0, float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def normalize(data, base_url):
+    # Turns an index document into catalog entries. The index is either a list of mods
+    # or {"mods": [...]}; each mod needs an "id" (or "name") and a "download_url" (or
+    # "url", relative to the index). Entries carry the same fields as installed-mod
+    # entries ("dir" is the id), so ModSearch works on them unchanged.
+    items = data.get("mods") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise core.ManagerError("Catalog index has no list of mods.")
+    mods = []
+    seen = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        mod_id = str(item.get("id") or item.get("name") or "").strip()
+        url = item.get("download_url") or item.get("url")
+        if not mod_id or not url or mod_id in seen:
+            continue
+        seen.add(mod_id)
+        mods.append({
+            "dir": mod_id,
+            "name": str(item.get("name") or mod_id),
+            "version": str(item.get("version") or ""),
+            "authors": _as_list(item.get("authors", item.get("author"))),
+            "tags": _as_list(item.get("tags", item.get("categories"))),
+            "description": str(item.get("description") or ""),
+            "download_url": urljoin(base_url, str(url)),
+            "size": int(_number(item.get("size"))),
+            "mtime": _number(item.get("updated")),
+            "sha256": str(item.get("sha256") or "").lower() or None,
+        })
+    return mods
+
+
+class Catalog:
+    # Mods available from a remote index (a JSON document at url). The parsed index is
+    # kept in cache/catalog/ with the server's ETag and Last-Modified, so load() works
+    # offline and costs one local read, and refresh() sends a conditional GET that the
+    # server answers with an empty 304 while the index is unchanged. If the server
+    # can't be reached, refresh() falls back to the cached copy and sets self.error.
+    def __init__(self, url, path=None):
+        if not url or not url.strip():
+            raise core.ManagerError("No catalog URL set (\"catalog_url\" in config.json, or --url).")
+        self.url = url.strip()
+        self.path = path or catalog_path(url)
+        self.lock = threading.Lock()
+        self.etag = None
+        self.last_modified = None
+        self.digest = None
+        self.fetched = 0
+        self.mods = []
+        self.error = None
+        self._search = None
+        self.loaded = self.load()
+
+    def load(self):
+        # Reads the cached index; returns False when there is none (or it is unusable).
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != CATALOG_VERSION or data.get("url") != self.url:
+                return False
+        except Exception:
+            return False
+        with self.lock:
+            self.etag = data.get("etag")
+            self.last_modified = data.get("last_modified")
+            self.digest = data.get("digest")
+            self.fetched = data.get("fetched", 0)
+            self.mods = data["mods"]
+            self._search = None
+        return True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self.lock:
+            data = {"version": CATALOG_VERSION, "url": self.url, "etag": self.etag,
+                    "last_modified": self.last_modified, "digest": self.digest,
+                    "fetched": self.fetched, "mods": self.mods}
+        tmp = self.path + ".tmp"
+        # dumps() encodes in one C call; dump() would write thousands of small chunks.
+        text = json.dumps(data, separators=(",", ":"))
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, self.path)
+
+    def age(self):
+        # Seconds since the index was last confirmed current; None if it never was.
+        return time.time() - self.fetched if self.loaded else None
+
+    def stale(self, max_age=MAX_AGE):
+        return not self.loaded or self.age() > max_age
+
+    def refresh(self, offline=False, timeout=FETCH_TIMEOUT):
+        # Returns (mods, changed). Offline, only the cached index is used.
+        self.error = None
+        if offline:
+            if not self.loaded:
+                raise core.ManagerError("The mod catalog hasn't been downloaded yet.")
+            return self.mods, False
+        headers = {}
+        if self.loaded:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+        with trace.span("catalog fetch", url=self.url, conditional=bool(headers)) as span:
+            try:
+                with span.phase("network"):
+                    r = session().get(self.url, headers=headers, timeout=timeout)
+                    if r.status_code != 304:
+                        r.raise_for_status()
+                    body = r.content
+            except Exception as e:
+                if not self.loaded:
+                    raise core.ManagerError(f"Failed to fetch the mod catalog: {e}")
+                # Offline or the server is down; the cached copy is the best we have.
+                self.error = f"Catalog server unreachable, showing the cached list ({e})."
+                span.add(cached=True, offline=True)
+                return self.mods, False
+            if r.status_code == 304:
+                span.add(cached=True, status=304)
+                self.fetched = time.time()
+                with span.phase("save"):
+                    self.save()
+                return self.mods, False
+            span.add(bytes=len(body), status=r.status_code)
+            digest = hashlib.sha1(body).hexdigest()
+            changed = digest != self.digest
+            if changed:
+                with span.phase("parse"):
+                    try:
+                        data = json.loads(body)
+                    except ValueError as e:
+                        raise core.ManagerError(f"Catalog index is not valid JSON: {e}")
+                    mods = normalize(data, r.url or self.url)
+                span.add(mods=len(mods))
+            with self.lock:
+                if changed:
+                    self.mods, self.digest, self._search = mods, digest, None
+                self.etag = r.headers.get("etag")
+                self.last_modified = r.headers.get("last-modified")
+                self.fetched = time.time()
+                self.loaded = True
+            with span.phase("save"):
+                self.save()
+            return self.mods, changed
+
+    # ----- Browsing -----
+    def search(self, query="", sort="name"):
+        # The search index is built once per version of the catalog and reused across queries.
+        from .search import ModSearch
+        with self.lock:
+            if self._search is None:
+                self._search = ModSearch(self.mods)
+            index = self._search
+        return index.search(query, sort)
+
+    def get(self, mod_id):
+        for mod in self.mods:
+            if mod["dir"] == mod_id:
+                return mod
+        raise core.ManagerError(f"'{mod_id}' is not in the mod catalog.")
+
+    # ----- Install -----
+    def download(self, mod_id, progress=None, cancel=None):
+        # Fetches a mod's archive through the archive cache (revalidated, so a mod that
+        # is already downloaded isn't fetched again) and returns a link to it named
+        # after the mod, which is what install_mod names the installed folder after.
+        # Each link is made in a folder of its own, so downloads of the same mod running
+        # at once never share a file. The caller removes it with discard_download().
+        entry = self.get(mod_id)
+        cache = core.archive_cache()
+        try:
+            path, sha256 = cache.fetch(entry["download_url"], progress, session=session(), cancel=cancel)
+        except core.ManagerError:
+            raise
+        except Exception as e:
+            raise core.ManagerError(f"Failed to download '{entry['name']}': {e}")
+        if entry.get("sha256") and entry["sha256"] != sha256:
+            raise core.ManagerError(f"Download of '{entry['name']}' doesn't match the catalog's checksum.")
+        folder = os.path.join(core.cache_dir(), "catalog", "downloads")
+        os.makedirs(folder, exist_ok=True)
+        named = os.path.join(tempfile.mkdtemp(dir=folder),
+                             (re.sub(r"[^\w .-]", "_", mod_id).strip(" .") or "mod") + ".zip")
+        try:
+            os.link(path, named)
+        except OSError:
+            try:
+                shutil.copyfile(path, named)
+            except OSError:
+                discard_download(named)
+                raise
+        return named
+
+    def install(self, mod_id, mod_target, progress=None, cancel=None):
+        # progress(done, total) covers the download (first half) and the install.
+        with trace.span("catalog install", mod=mod_id):
+            download_progress = (lambda percent: progress(percent, 200)) if progress else None
+            path = self.download(mod_id, download_progress, cancel)
+            install_progress = (lambda done, total: progress(100 + done * 100 // max(total, 1), 200)) if progress else None
+            try:
+                return core.install_mod(path, mod_target, install_progress, cancel)
+            finally:
+                discard_download(path)
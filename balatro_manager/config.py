@@ -0,0 +1,183 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+
+from . import core, trace
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PROFILE = "default"
+# Seconds of quiet after the last edit before it is written out.
+SAVE_DELAY = 0.5
+PROFILE_NAME = re.compile(r"^[\w][\w .-]*$")
+
+
+def write_atomic(path, text):
+    # Readers see either the old file or the new one, never a half-written one.
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        data = json.loads(text)
+        return (data, text) if isinstance(data, dict) else ({}, None)
+    except Exception:
+        return {}, None
+
+
+def _dump(data):
+    return json.dumps(data, indent=4)
+
+
+class ConfigStore:
+    # config.json holds the default profile's settings (the same flat keys as always)
+    # plus "active_profile". Every other profile lives in its own file under
+    # config-profiles/, so editing one profile only rewrites that profile's file.
+    # update() is cheap and can be called on every keystroke: writes are coalesced
+    # into one after SAVE_DELAY seconds of quiet, skipped when nothing changed, and
+    # flush() writes whatever is still pending (call it on exit). One writer thread,
+    # started on the first update(), waits out the deadline that each update() pushes back.
+    def __init__(self, path=None, delay=SAVE_DELAY):
+        self.path = path or core.config_path()
+        self.profile_dir = os.path.join(os.path.dirname(os.path.abspath(self.path)), "config-profiles")
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.writer = None
+        self.deadline = None
+        self.pending = None
+        self.written = {}
+        root, self.written[self.path] = _read(self.path)
+        self.active = root.get("active_profile", DEFAULT_PROFILE)
+        if self.active != DEFAULT_PROFILE and not os.path.isfile(self.profile_path(self.active)):
+            self.active = DEFAULT_PROFILE
+
+    def profile_path(self, name):
+        if name == DEFAULT_PROFILE:
+            return self.path
+        if not PROFILE_NAME.match(name):
+            raise core.ManagerError(f"Invalid profile name: {name}")
+        return os.path.join(self.profile_dir, name + ".json")
+
+    def profiles(self):
+        names = [DEFAULT_PROFILE]
+        if os.path.isdir(self.profile_dir):
+            names += sorted(n[:-5] for n in os.listdir(self.profile_dir) if n.endswith(".json") and n[:-5] != DEFAULT_PROFILE)
+        return names
+
+    def load(self):
+        # Settings of the active profile, with pending edits applied.
+        with self.lock:
+            if self.pending is not None:
+                return dict(self.pending)
+            return self._load(self.active)
+
+    def _load(self, name):
+        path = self.profile_path(name)
+        with trace.span("config read", profile=name) as span:
+            data, text = _read(path)
+            span.add(bytes=len(text or ""))
+        self.written.setdefault(path, text)
+        data.pop("active_profile", None)
+        return data
+
+    def update(self, data):
+        with self.lock:
+            self.pending = dict(data)
+            self.deadline = time.monotonic() + self.delay
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._write_later, name="config-writer", daemon=True)
+                self.writer.start()
+            self.wake.notify()
+
+    def save(self, data):
+        # Writes data to the active profile right away (if it changed).
+        with self.lock:
+            self.pending = dict(data)
+        return self.flush()
+
+    def flush(self):
+        with self.lock:
+            return self._flush()
+
+    def _flush(self):
+        self.deadline = None
+        if self.pending is None:
+            return False
+        data, self.pending = self.pending, None
+        return self._write(self.active, data)
+
+    def _write_later(self):
+        with self.lock:
+            while True:
+                if self.deadline is None:
+                    self.wake.wait()
+                    continue
+                remaining = self.deadline - time.monotonic()
+                if remaining > 0:
+                    self.wake.wait(remaining)
+                    continue
+                try:
+                    self._flush()
+                except Exception:
+                    # The "config write" span has the error too; the writer has to survive it.
+                    log.exception("Config: saving settings failed")
+
+    def _write(self, name, data):
+        path = self.profile_path(name)
+        data = dict(data)
+        if name == DEFAULT_PROFILE:
+            data["active_profile"] = self.active
+        text = _dump(data)
+        if self.written.get(path) == text:
+            return False
+        if path != self.path:
+            os.makedirs(self.profile_dir, exist_ok=True)
+        with trace.span("config write", profile=name, bytes=len(text)):
+            write_atomic(path, text)
+        self.written[path] = text
+        return True
+
+    def _write_root(self):
+        # Keeps config.json's active_profile in step without touching its settings.
+        root, text = _read(self.path)
+        if root.get("active_profile", DEFAULT_PROFILE) == self.active:
+            return
+        root["active_profile"] = self.active
+        text = _dump(root)
+        with trace.span("config write", profile=DEFAULT_PROFILE, bytes=len(text)):
+            write_atomic(self.path, text)
+        self.written[self.path] = text
+
+    def switch(self, name, copy_current=True):
+        # Makes name the active profile and returns its settings. A new profile
+        # starts as a copy of the current one unless copy_current is False.
+        path = self.profile_path(name)
+        self.flush()
+        with self.lock:
+            if name != DEFAULT_PROFILE and not os.path.isfile(path):
+                self._write(name, self._load(self.active) if copy_current else {})
+            self.active = name
+            self._write_root()
+            return self._load(name)
+
+    def delete(self, name):
+        if name == DEFAULT_PROFILE:
+            raise core.ManagerError("The default profile can't be deleted.")
+        if name == self.active:
+            self.switch(DEFAULT_PROFILE)
+        try:
+            os.remove(self.profile_path(name))
+        except FileNotFoundError:
+            pass
+        self.written.pop(self.profile_path(name), None)
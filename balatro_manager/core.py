@@ -0,0 +1,418 @@
+import os
+import hashlib
+import platform
+import shutil
+import subprocess
+
+# ----- Determine Default Paths for Each OS -----
+if platform.system() == "Windows":
+    default_target_dll = r"C:\Program Files (x86)\Steam\steamapps\common\Balatro"
+    default_mod_target = os.path.expandvars(r"%AppData%\Balatro\Mods")
+elif platform.system() == "Darwin":
+    default_target_dll = "/Applications/Balatro"
+    default_mod_target = os.path.expanduser("~/Library/Application Support/Balatro/Mods")
+else:
+    default_target_dll = os.path.expanduser("~/Balatro")
+    default_mod_target = os.path.expanduser("~/.balatro/mods")
+
+HASH_BUFFER = 1024 * 1024
+
+class ManagerError(Exception):
+    pass
+
+
+class OperationCancelled(ManagerError):
+    pass
+
+
+def check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise OperationCancelled("Operation cancelled.")
+
+
+# ----- Helper to remove surrounding quotes.
+def clean_path(path):
+    return path.strip().strip('"').strip("'")
+
+
+def state_dir():
+    return os.path.join(os.getcwd(), "state")
+
+
+def lovely_folder():
+    return os.path.join(os.getcwd(), "lovely")
+
+
+# ----- Config: Load/Save paths -----
+def config_path():
+    return os.path.join(os.getcwd(), "config.json")
+
+
+def load_config(path=None):
+    # Settings of the active profile; see config.ConfigStore.
+    from .config import ConfigStore
+    return ConfigStore(path).load()
+
+
+def save_config(data, path=None):
+    from .config import ConfigStore
+    ConfigStore(path).save(data)
+
+
+# ----- Launch Balatro -----
+def launch_balatro(target_dir):
+    exe_name = "balatro.exe" if platform.system() == "Windows" else "balatro"
+    exe_path = os.path.join(target_dir, exe_name)
+    if not os.path.isfile(exe_path):
+        raise ManagerError("Balatro executable not found in target directory.")
+    try:
+        return subprocess.Popen([exe_path])
+    except Exception as e:
+        raise ManagerError("Failed to launch Balatro: " + str(e))
+
+
+# ----- Lovely -----
+def cache_dir():
+    return os.path.join(os.getcwd(), "cache")
+
+
+def archive_cache():
+    from .cache import ArchiveCache
+    return ArchiveCache.shared(cache_dir())
+
+
+def download_archive(url, progress=None, max_updates_per_second=10, connections=4, offline=False):
+    # Returns (path, sha256) of the archive in the local cache, downloading it only if needed.
+    return archive_cache().fetch(url, progress, offline=offline, connections=connections,
+                                 max_updates_per_second=max_updates_per_second)
+
+
+def extract_archive(archive_path, target_folder, url):
+    from . import trace
+    with trace.span("extract", archive=os.path.basename(url)) as span:
+        try:
+            span.add(archive_bytes=os.path.getsize(archive_path))
+        except OSError:
+            pass
+        _extract_archive(archive_path, target_folder, url)
+
+
+def _extract_archive(archive_path, target_folder, url):
+    try:
+        if "zip" in url:
+            from . import extract
+            extract.extract_zip(archive_path, target_folder)
+        elif "tar.gz" in url:
+            import tarfile
+            from . import trace
+            with tarfile.open(archive_path, 'r:gz') as tar, trace.phase("inflate"):
+                tar.extractall(target_folder)
+                files = [m for m in tar.getmembers() if m.isfile()]
+            trace.add(files=len(files), bytes=sum(m.size for m in files))
+        else:
+            raise ManagerError("Unsupported archive format.")
+    except ManagerError:
+        raise
+    except Exception as e:
+        raise ManagerError("Extraction error: " + str(e))
+
+
+def find_version_dll(folder):
+    for root_dir, dirs, files in os.walk(folder):
+        for file in files:
+            if file.lower() == "version.dll":
+                return os.path.join(root_dir, file)
+    return None
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_BUFFER), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def extracted_sha256(folder):
+    # SHA-256 of the archive a Lovely folder was last extracted from, if any.
+    try:
+        with open(os.path.join(folder, ".archive-sha256"), "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _reset_folder(folder):
+    if os.path.exists(folder):
+        shutil.rmtree(folder)
+    os.makedirs(folder, exist_ok=True)
+
+
+def download_lovely(url, folder=None, progress=None, max_updates_per_second=10, offline=False, stream=True):
+    # tar.gz releases that aren't cached yet are extracted while they download
+    # (see download.stream_extract_tar); everything else goes through the cache first.
+    from . import trace
+    with trace.span("download", url=url, offline=offline):
+        return _download_lovely(url, folder or lovely_folder(), progress, max_updates_per_second, offline, stream)
+
+
+def _download_lovely(url, folder, progress, max_updates_per_second, offline, stream):
+    from . import trace
+    cache = archive_cache()
+    try:
+        if stream and "tar.gz" in url and not offline:
+            # Revalidated once, under the same per-URL lock as ArchiveCache.fetch.
+            from . import download
+            session = download._new_session()
+            with cache.url_lock(url):
+                with trace.phase("revalidate"):
+                    entry, headers = cache.revalidate(url, session)
+                if not entry:
+                    _reset_folder(folder)
+                    partial = cache.partial_path(url)
+                    with trace.phase("download + extract"):
+                        sha256 = download.stream_extract_tar(url, folder, progress, tee_path=partial, session=session,
+                                                             max_updates_per_second=max_updates_per_second)
+                    cache.add(url, partial, sha256, headers)
+                    trace.add(bytes=os.path.getsize(cache.object_path(sha256)), cached=False)
+                    with open(os.path.join(folder, ".archive-sha256"), "w") as f:
+                        f.write(sha256)
+                    return find_version_dll(folder) is not None
+                cache.touch(url)
+                trace.add(cached=True)
+                archive_path, sha256 = cache.object_path(entry["sha256"]), entry["sha256"]
+        else:
+            archive_path, sha256 = download_archive(url, progress, max_updates_per_second, offline=offline)
+    except ManagerError:
+        raise
+    except Exception as e:
+        raise ManagerError("Download error: " + str(e))
+    # The folder remembers which archive it was extracted from; same bytes, nothing to do.
+    if extracted_sha256(folder) != sha256:
+        with trace.phase("clear"):
+            _reset_folder(folder)
+        extract_archive(archive_path, folder, url)
+        with open(os.path.join(folder, ".archive-sha256"), "w") as f:
+            f.write(sha256)
+    return find_version_dll(folder) is not None
+
+
+def uninstall_lovely(target_dir, mod_dir):
+    target_dll_path = os.path.join(target_dir, "version.dll")
+    lovely_dir_path = os.path.join(mod_dir, "lovely")
+    errors = []
+    if os.path.isfile(target_dll_path):
+        try:
+            os.remove(target_dll_path)
+        except Exception as e:
+            errors.append(str(e))
+    if os.path.isdir(lovely_dir_path):
+        from .trash import Trash
+        try:
+            Trash.beside(mod_dir).move(lovely_dir_path, kind="lovely")
+        except Exception as e:
+            errors.append(str(e))
+    if errors:
+        raise ManagerError("Uninstall failed: " + ", ".join(errors))
+
+
+# ----- Mods -----
+def mod_name_for(mod_path):
+    if os.path.isfile(mod_path):
+        return os.path.splitext(os.path.basename(mod_path))[0]
+    return os.path.basename(mod_path.rstrip(os.sep))
+
+
+def top_level_entries(mod_path):
+    # Returns (dirs, files) at the top level of a mod ZIP or folder without writing anything.
+    dirs, files = set(), set()
+    if os.path.isdir(mod_path):
+        for entry in os.scandir(mod_path):
+            (dirs if entry.is_dir() else files).add(entry.name)
+        return dirs, files
+    import zipfile
+    with zipfile.ZipFile(mod_path, 'r') as zf:
+        for name in zf.namelist():
+            head, sep, rest = name.partition("/")
+            if sep:
+                dirs.add(head)
+            elif head:
+                files.add(head)
+    return dirs, files
+
+
+def mod_layout(mod_path):
+    # Where each part of a source ends up, as [(prefix inside the source, installed name)].
+    # A source holding only folders is a wrapper (or a multi-mod pack) and installs each
+    # folder as its own mod; anything else installs as one mod named after the source.
+    dirs, files = top_level_entries(mod_path)
+    for name in dirs | files:
+        if name in ("", ".", "..") or "\\" in name or ":" in name:
+            raise ManagerError(f"Unsafe path in mod: {name}")
+    if dirs and not files:
+        return [(d, d) for d in sorted(dirs)]
+    return [("", mod_name_for(mod_path))]
+
+
+STAGING_PREFIX = ".installing-"
+
+
+def cleanup_staging(mod_target):
+    # Removes staging directories left behind by installs that were killed midway,
+    # and whatever a previous run left in the trash (see trash).
+    from .trash import Trash
+    if not os.path.isdir(mod_target):
+        return
+    trash = Trash.beside(mod_target)
+    for entry in os.scandir(mod_target):
+        if entry.name.startswith(STAGING_PREFIX) and entry.is_dir():
+            try:
+                trash.move(entry.path, kind="staging")
+            except OSError:
+                shutil.rmtree(entry.path, ignore_errors=True)
+    trash.purge_in_background()
+
+
+def install_mod(mod_path, mod_target, progress=None, cancel=None, extract_workers=None, dedupe=True):
+    from . import trace
+    with trace.span("install", source=os.path.basename(os.path.normpath(mod_path or "")), dedupe=dedupe):
+        return _install_mod(mod_path, mod_target, progress, cancel, extract_workers, dedupe)
+
+
+def _install_mod(mod_path, mod_target, progress, cancel, extract_workers, dedupe):
+    # Installs or updates a mod. Only files that are new or changed since the last
+    # install are written (see sync); progress(done, total) is called in bytes, and
+    # setting the cancel event stops the install. With dedupe, files are linked from
+    # the content store next to mod_target (see store) instead of written in full.
+    # New mods are written in their final layout into a staging directory inside
+    # mod_target and renamed into place, so a crash never leaves a partial mod behind.
+    import tempfile
+    from . import sync, trace
+    from .store import ContentStore
+    if not os.path.exists(mod_target):
+        os.makedirs(mod_target)
+    if not mod_path or not os.path.exists(mod_path):
+        raise ManagerError("Invalid mod selection.")
+    mod_name = mod_name_for(mod_path)
+    is_zip = os.path.isfile(mod_path) and mod_path.lower().endswith(".zip")
+    if not is_zip and not os.path.isdir(mod_path):
+        raise ManagerError("Invalid mod selection.")
+    report = sync.SyncReport()
+    store = ContentStore.beside(mod_target) if dedupe else None
+    staging = None
+    staged = []
+    layout = []
+
+    def destination(name):
+        nonlocal staging
+        dest_dir = os.path.join(mod_target, name)
+        if os.path.exists(dest_dir):
+            return dest_dir
+        if staging is None:
+            staging = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=mod_target)
+        staged.append((os.path.join(staging, name), dest_dir))
+        return staged[-1][0]
+
+    try:
+        with trace.phase("layout"):
+            layout = mod_layout(mod_path)
+        if is_zip:
+            import zipfile
+            with zipfile.ZipFile(mod_path, 'r') as zf, trace.phase("extract"):
+                total = sum(info.file_size for info in zf.infolist())
+                for prefix, name in layout:
+                    report.merge(sync.sync_zip(zf, prefix + "/" if prefix else "", destination(name),
+                                               progress, cancel, report.bytes_written + report.bytes_saved, total,
+                                               manifest_dir=os.path.join(mod_target, name), workers=extract_workers,
+                                               store=store))
+        else:
+            total = 0
+            with trace.phase("scan"):
+                for root_dir, dirs, files in os.walk(mod_path):
+                    total += sum(os.path.getsize(os.path.join(root_dir, f)) for f in files)
+            with trace.phase("copy"):
+                for prefix, name in layout:
+                    report.merge(sync.sync_folder(os.path.join(mod_path, prefix), destination(name),
+                                                  progress, cancel, report.bytes_written + report.bytes_saved, total,
+                                                  manifest_dir=os.path.join(mod_target, name), store=store))
+        with trace.phase("rename"):
+            while staged:
+                os.rename(*staged[0])
+                staged.pop(0)
+    except Exception as e:
+        # Staged mods are discarded; updates to existing mods stop where they were.
+        for staged_dir, dest_dir in staged:
+            sync.remove_manifest(dest_dir)
+        if isinstance(e, OperationCancelled):
+            raise
+        if is_zip:
+            raise ManagerError(f"Failed to extract mod ZIP: {e}")
+        raise ManagerError(f"Failed to copy mod folder: {e}")
+    finally:
+        if staging is not None:
+            _discard_staging(staging, mod_target)
+        if store is not None:
+            store.save()
+        trace.add(mods=len(layout), bytes=report.bytes_written,
+                  bytes_unchanged=report.bytes_saved, files=report.added + report.changed,
+                  unchanged=report.unchanged, linked=report.linked, removed=report.removed)
+    message = f"Mod '{mod_name}' installed from {'ZIP' if is_zip else 'folder'}."
+    if report.unchanged or report.linked:
+        message += f"\n{report.summary()}"
+    return message
+
+
+def _discard_staging(staging, mod_target):
+    # Empty after a successful install; whatever is left of a failed one goes to the trash.
+    from .trash import Trash
+    try:
+        os.rmdir(staging)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        try:
+            Trash.beside(mod_target).move(staging, kind="staging")
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def uninstall_mod(mod_name, mod_target, progress=None, cancel=None, undo_seconds=0):
+    # Moves the mod into the trash next to mod_target, which takes one rename however
+    # many files it has; the files are deleted on a background thread once
+    # undo_seconds have passed. Returns the trash entry id for Trash.restore (None if
+    # the mod had to be deleted in place).
+    from . import trace
+    from .trash import Trash
+    mod_dir = os.path.join(mod_target, mod_name)
+    with trace.span("uninstall", mod=mod_name) as span:
+        if not os.path.isdir(mod_dir):
+            raise ManagerError("Mod not found.")
+        check_cancelled(cancel)
+        try:
+            with span.phase("trash"):
+                entry_id = Trash.beside(mod_target).move(mod_dir, keep=undo_seconds)
+        except Exception as e:
+            raise ManagerError(f"Failed to uninstall mod '{mod_name}' (is the game running?): {e}")
+    if progress:
+        progress(1, 1)
+    return entry_id
+
+
+def release_store(mod_target):
+    # Drops content-store objects no installed mod links to any more, beyond the
+    # store's cache budget. Failing here never fails the uninstall itself.
+    from .store import ContentStore
+    store = ContentStore.beside(mod_target)
+    if os.path.isdir(store.root):
+        try:
+            return store.gc()
+        except OSError:
+            pass
+    return 0
+
+
+def list_mods(mod_target):
+    if not os.path.isdir(mod_target):
+        raise ManagerError("Mods target directory not found.")
+    return [item for item in os.listdir(mod_target)
+            if not item.startswith(STAGING_PREFIX) and os.path.isdir(os.path.join(mod_target, item))]
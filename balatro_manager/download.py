@@ -0,0 +1,326 @@
+import os
+import json
+import time
+import threading
+
+from .core import OperationCancelled
+
+CHUNK_SIZE = 64 * 1024
+# Segments smaller than this are not worth a separate connection.
+MIN_SEGMENT_SIZE = 1024 * 1024
+
+
+class DownloadCancelled(OperationCancelled):
+    pass
+
+
+class ResourceChanged(Exception):
+    # The file on the server is no longer the one the partial download holds.
+    pass
+
+
+# ----- Progress throttling -----
+class ProgressThrottle:
+    # Forwards at most max_per_second updates (plus the final one) to callback(percent).
+    def __init__(self, callback, max_per_second=10):
+        self.callback = callback
+        self.interval = 1.0 / max_per_second if max_per_second else 0
+        self.last_time = 0
+        self.last_value = None
+        self.lock = threading.Lock()
+
+    def __call__(self, done, total, force=False):
+        if not self.callback or not total:
+            return
+        percent = int(done / total * 100)
+        with self.lock:
+            now = time.monotonic()
+            if percent == self.last_value:
+                return
+            if not force and percent < 100 and now - self.last_time < self.interval:
+                return
+            self.last_time = now
+            self.last_value = percent
+        self.callback(percent)
+
+
+# ----- Resume state -----
+def _state_path(part_path):
+    return part_path + ".json"
+
+
+def _load_state(part_path, url, total, validator):
+    try:
+        with open(_state_path(part_path), "r") as f:
+            state = json.load(f)
+        if (state["url"] == url and state["total"] == total and state.get("validator") == validator
+                and os.path.exists(part_path)):
+            return state
+    except Exception:
+        pass
+    return None
+
+
+def _save_state(part_path, state):
+    tmp = _state_path(part_path) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, _state_path(part_path))
+
+
+def _split(total, connections):
+    count = max(1, min(connections, total // MIN_SEGMENT_SIZE))
+    size = total // count
+    segments = []
+    for i in range(count):
+        start = i * size
+        end = total - 1 if i == count - 1 else start + size - 1
+        segments.append({"start": start, "end": end, "done": 0})
+    return segments
+
+
+def _new_session():
+    import requests
+    return requests.Session()
+
+
+def probe(session, url, timeout=30):
+    # Returns (total_size, accepts_ranges, validator); total_size is 0 when the server
+    # doesn't say. validator is what If-Range needs to tell whether the file changed:
+    # a strong ETag, else Last-Modified, else None.
+    r = session.head(url, allow_redirects=True, timeout=timeout)
+    if r.status_code >= 400:
+        return 0, False, None
+    total = int(r.headers.get("content-length") or 0)
+    ranges = r.headers.get("accept-ranges", "").lower() == "bytes"
+    etag = r.headers.get("etag")
+    validator = etag if etag and not etag.startswith("W/") else r.headers.get("last-modified")
+    return total, ranges, validator
+
+
+# ----- Download -----
+def download_file(url, dest, progress=None, connections=4, max_updates_per_second=10,
+                  retries=3, session=None, cancel=None, timeout=30):
+    # Downloads url to dest. Bytes land in dest + ".part" first; if the transfer is
+    # interrupted, calling again with the same url and dest picks up where it left off.
+    # The server's validator is saved with the partial file and sent as If-Range, so
+    # a file that changed on the server in the meantime is fetched again from the
+    # start instead of being spliced from old and new bytes.
+    session = session or _new_session()
+    report = ProgressThrottle(progress, max_updates_per_second)
+    part_path = dest + ".part"
+    total, ranges, validator = probe(session, url, timeout)
+
+    restarts = 0
+    while ranges and total:
+        state = _load_state(part_path, url, total, validator)
+        if state is None:
+            state = {"url": url, "total": total, "validator": validator, "segments": _split(total, connections)}
+            with open(part_path, "wb") as f:
+                f.truncate(total)
+            _save_state(part_path, state)
+        try:
+            _download_segments(session, url, part_path, state, report, retries, cancel, timeout)
+            break
+        except ResourceChanged:
+            restarts += 1
+            if restarts > retries:
+                raise IOError("The file kept changing on the server during the download.")
+            os.remove(_state_path(part_path))
+            total, ranges, validator = probe(session, url, timeout)
+    else:
+        _download_stream(session, url, part_path, total, report, retries, cancel, timeout)
+
+    os.replace(part_path, dest)
+    if os.path.exists(_state_path(part_path)):
+        os.remove(_state_path(part_path))
+    return dest
+
+
+def _download_segments(session, url, part_path, state, report, retries, cancel, timeout):
+    total = state["total"]
+    validator = state.get("validator")
+    lock = threading.Lock()
+    errors = []
+    changed = threading.Event()
+
+    def downloaded():
+        return sum(segment["done"] for segment in state["segments"])
+
+    def fetch(segment):
+        attempts = 0
+        while segment["start"] + segment["done"] <= segment["end"]:
+            try:
+                headers = {"Range": "bytes=%d-%d" % (segment["start"] + segment["done"], segment["end"])}
+                if validator:
+                    headers["If-Range"] = validator
+                with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+                    if r.status_code == 200 and validator:
+                        # If-Range didn't match: the whole file is being sent, because it changed.
+                        changed.set()
+                        raise ResourceChanged()
+                    if r.status_code != 206:
+                        raise IOError("Server ignored range request (HTTP %d)" % r.status_code)
+                    with open(part_path, "r+b") as f:
+                        f.seek(segment["start"] + segment["done"])
+                        last_save = time.monotonic()
+                        for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                            if cancel is not None and cancel.is_set():
+                                raise DownloadCancelled()
+                            if changed.is_set():
+                                raise ResourceChanged()
+                            if not chunk:
+                                continue
+                            f.write(chunk)
+                            if time.monotonic() - last_save > 1:
+                                # Bytes must be on disk before the state file claims them.
+                                f.flush()
+                                with lock:
+                                    _save_state(part_path, state)
+                                last_save = time.monotonic()
+                            with lock:
+                                segment["done"] += len(chunk)
+                                done = downloaded()
+                            report(done, total)
+            except (DownloadCancelled, ResourceChanged):
+                raise
+            except Exception:
+                attempts += 1
+                if attempts > retries:
+                    raise
+            finally:
+                with lock:
+                    _save_state(part_path, state)
+
+    def worker(segment):
+        try:
+            fetch(segment)
+        except Exception as e:
+            errors.append(e)
+
+    pending = [s for s in state["segments"] if s["start"] + s["done"] <= s["end"]]
+    threads = [threading.Thread(target=worker, args=(s,), daemon=True) for s in pending]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if changed.is_set():
+        raise ResourceChanged()
+    if errors:
+        raise errors[0]
+    report(total, total, force=True)
+
+
+def _download_stream(session, url, part_path, total, report, retries, cancel, timeout):
+    # Servers without range support can't resume, so each attempt starts over.
+    attempts = 0
+    while True:
+        try:
+            with session.get(url, stream=True, timeout=timeout) as r:
+                r.raise_for_status()
+                total = int(r.headers.get("content-length") or total or 0)
+                done = 0
+                with open(part_path, "wb") as f:
+                    for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                        if cancel is not None and cancel.is_set():
+                            raise DownloadCancelled()
+                        if chunk:
+                            f.write(chunk)
+                            done += len(chunk)
+                            report(done, total)
+            report(done, total, force=True)
+            return
+        except DownloadCancelled:
+            raise
+        except Exception:
+            attempts += 1
+            if attempts > retries:
+                raise
+
+
+# ----- Streaming extraction -----
+class _ChunkReader:
+    # File-like view over chunks handed across from the download thread.
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.buffer = b""
+        self.finished = False
+
+    def read(self, size=-1):
+        while not self.finished and (size < 0 or len(self.buffer) < size):
+            chunk = self.chunks.get()
+            if chunk is None:
+                self.finished = True
+            elif isinstance(chunk, Exception):
+                raise chunk
+            else:
+                self.buffer += chunk
+        if size < 0:
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+def stream_extract_tar(url, target_folder, progress=None, tee_path=None, max_updates_per_second=10,
+                       session=None, cancel=None, timeout=30, queue_size=64):
+    # Downloads a .tar.gz and extracts members as the bytes arrive, so no temporary
+    # archive is needed and extraction overlaps the download. If tee_path is given the
+    # raw archive is written there as well. Returns the archive's SHA-256.
+    import queue
+    import hashlib
+    import tarfile
+    session = session or _new_session()
+    report = ProgressThrottle(progress, max_updates_per_second)
+    chunks = queue.Queue(maxsize=queue_size)
+    sha256 = hashlib.sha256()
+    stop = threading.Event()
+
+    def produce():
+        tee = None
+        try:
+            # Inside the try: a tee that can't be opened has to reach the reader as an
+            # error, or it would wait for chunks forever.
+            tee = open(tee_path, "wb") if tee_path else None
+            with session.get(url, stream=True, timeout=timeout) as r:
+                r.raise_for_status()
+                total = int(r.headers.get("content-length") or 0)
+                done = 0
+                for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                    if stop.is_set() or (cancel is not None and cancel.is_set()):
+                        raise DownloadCancelled()
+                    if not chunk:
+                        continue
+                    sha256.update(chunk)
+                    if tee:
+                        tee.write(chunk)
+                    done += len(chunk)
+                    report(done, total)
+                    chunks.put(chunk)
+                report(done, total, force=True)
+            chunks.put(None)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            if tee:
+                tee.close()
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        reader = _ChunkReader(chunks)
+        with tarfile.open(fileobj=reader, mode="r|gz") as tar:
+            tar.extractall(target_folder)
+        # Drain anything after the end-of-archive marker so the hash covers the whole file.
+        reader.read()
+    except Exception:
+        stop.set()
+        # Unblock the producer if it is waiting on a full queue.
+        while producer.is_alive():
+            try:
+                chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        raise
+    producer.join()
+    return sha256.hexdigest()
@@ -0,0 +1,128 @@
+import os
+import shutil
+import threading
+import zipfile
+
+from . import core
+
+COPY_BUFFER = 1024 * 1024
+# zlib releases the GIL while inflating, so extraction scales with cores up to a point.
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def _balance(jobs, workers):
+    # Greedy largest-first packing so every thread gets about the same number of bytes.
+    buckets = [[] for _ in range(workers)]
+    loads = [0] * workers
+    for info, dest in sorted(jobs, key=lambda job: job[0].file_size, reverse=True):
+        i = loads.index(min(loads))
+        buckets[i].append((info, dest))
+        loads[i] += info.file_size + 1
+    return [bucket for bucket in buckets if bucket]
+
+
+def extract_members(archive_path, jobs, workers=None, progress=None, cancel=None):
+    # jobs is a list of (ZipInfo, destination path). Each worker thread opens its own
+    # handle on the archive, since a ZipFile can't be read from several threads at once.
+    workers = max(1, min(workers or DEFAULT_WORKERS, len(jobs)))
+    total = sum(info.file_size for info, dest in jobs)
+    done = 0
+    lock = threading.Lock()
+    errors = []
+
+    def run(bucket):
+        nonlocal done
+        try:
+            with zipfile.ZipFile(archive_path, 'r') as zf:
+                for info, dest in bucket:
+                    if errors or (cancel is not None and cancel.is_set()):
+                        return
+                    parent = os.path.dirname(dest)
+                    if parent:
+                        os.makedirs(parent, exist_ok=True)
+                    if os.path.lexists(dest):
+                        # Never write through a hardlink into the content store.
+                        os.remove(dest)
+                    with zf.open(info) as src, open(dest, "wb") as out:
+                        shutil.copyfileobj(src, out, COPY_BUFFER)
+                    with lock:
+                        done += info.file_size
+                        current = done
+                    if progress:
+                        progress(current, total)
+        except Exception as e:
+            errors.append(e)
+
+    if workers == 1:
+        run(jobs)
+    else:
+        threads = [threading.Thread(target=run, args=(bucket,), daemon=True) for bucket in _balance(jobs, workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+    core.check_cancelled(cancel)
+
+
+def member_digests(archive_path, infos, workers=None, cancel=None):
+    # SHA-256 hex of each member's contents, keyed by filename. Members are inflated
+    # on the same threads as extract_members but never written anywhere.
+    import hashlib
+    workers = max(1, min(workers or DEFAULT_WORKERS, len(infos)))
+    digests = {}
+    errors = []
+
+    def run(bucket):
+        try:
+            with zipfile.ZipFile(archive_path, 'r') as zf:
+                for info, _ in bucket:
+                    if errors or (cancel is not None and cancel.is_set()):
+                        return
+                    sha = hashlib.sha256()
+                    with zf.open(info) as src:
+                        for chunk in iter(lambda: src.read(COPY_BUFFER), b""):
+                            sha.update(chunk)
+                    digests[info.filename] = sha.hexdigest()
+        except Exception as e:
+            errors.append(e)
+
+    buckets = _balance([(info, None) for info in infos], workers)
+    if len(buckets) <= 1:
+        for bucket in buckets:
+            run(bucket)
+    else:
+        threads = [threading.Thread(target=run, args=(bucket,), daemon=True) for bucket in buckets]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    if errors:
+        raise errors[0]
+    core.check_cancelled(cancel)
+    return digests
+
+
+def extract_zip(archive_path, target_folder, workers=None, progress=None, cancel=None):
+    # Drop-in for ZipFile.extractall that inflates members on several threads.
+    from . import trace
+    jobs = []
+    with zipfile.ZipFile(archive_path, 'r') as zf, trace.phase("plan"):
+        for info in zf.infolist():
+            # _extract_member's path sanitising, without extracting anything.
+            arcname = info.filename.replace("\\", "/")
+            parts = [p for p in arcname.split("/") if p not in ("", ".", "..")]
+            if parts and ":" in parts[0]:
+                parts[0] = parts[0].split(":")[-1]
+            if not parts:
+                continue
+            dest = os.path.join(target_folder, *parts)
+            if info.is_dir():
+                os.makedirs(dest, exist_ok=True)
+            else:
+                jobs.append((info, dest))
+    trace.add(files=len(jobs), bytes=sum(info.file_size for info, dest in jobs))
+    if jobs:
+        with trace.phase("inflate"):
+            extract_members(archive_path, jobs, workers, progress, cancel)
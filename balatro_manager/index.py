@@ -0,0 +1,219 @@
+import os
+import re
+import json
+import hashlib
+import threading
+
+from . import core, trace
+from .usage import DiskUsage
+
+INDEX_VERSION = 1
+# Steamodded header lines: "--- MOD_NAME: Foo", "--- MOD_AUTHOR: [a, b]", "--- VERSION: 1.0"
+HEADER_LINE = re.compile(r"^---\s*([A-Z_]+)\s*:\s*(.*?)\s*$")
+HEADER_LINES = 40
+
+
+# ----- Metadata parsing -----
+def _as_list(value):
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    if not value:
+        return []
+    value = str(value).strip()
+    if value.startswith("[") and value.endswith("]"):
+        value = value[1:-1]
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _json_metadata(path):
+    # Steamodded 1.0 metadata file: a JSON object with at least id/name.
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    if not isinstance(data, dict) or "name" not in data or not ("id" in data or "main_file" in data):
+        return None
+    return {
+        "name": str(data.get("name")),
+        "id": str(data.get("id", "")),
+        "version": str(data.get("version", "")),
+        "authors": _as_list(data.get("author")),
+        "description": str(data.get("description", "")),
+        "tags": _as_list(data.get("tags") or data.get("categories")),
+    }
+
+
+def _header_metadata(path):
+    # Legacy Steamodded header at the top of the mod's main Lua file.
+    fields = {}
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for _ in range(HEADER_LINES):
+                line = f.readline()
+                if not line:
+                    break
+                match = HEADER_LINE.match(line)
+                if match:
+                    fields[match.group(1)] = match.group(2)
+    except OSError:
+        return None
+    if "MOD_NAME" not in fields:
+        return None
+    return {
+        "name": fields["MOD_NAME"],
+        "id": fields.get("MOD_ID", ""),
+        "version": fields.get("VERSION", fields.get("MOD_VERSION", "")),
+        "authors": _as_list(fields.get("MOD_AUTHOR")),
+        "description": fields.get("MOD_DESCRIPTION", ""),
+        "tags": _as_list(fields.get("TAGS") or fields.get("MOD_TAGS")),
+    }
+
+
+def _lovely_metadata(path):
+    # Lovely-only mods: lovely.toml with a [manifest] version.
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            match = re.search(r'^\s*version\s*=\s*"([^"]*)"', f.read(4096), re.MULTILINE)
+    except OSError:
+        return None
+    return {"version": match.group(1)} if match else None
+
+
+def read_metadata(mod_dir, names):
+    # names are the file names at the top of mod_dir, from the scan that's already been done.
+    for name in sorted(names):
+        if name.lower().endswith(".json"):
+            meta = _json_metadata(os.path.join(mod_dir, name))
+            if meta:
+                return meta
+    for name in sorted(names):
+        if name.lower().endswith(".lua"):
+            meta = _header_metadata(os.path.join(mod_dir, name))
+            if meta:
+                return meta
+    if "lovely.toml" in names:
+        meta = _lovely_metadata(os.path.join(mod_dir, "lovely.toml"))
+        if meta:
+            return meta
+    return {}
+
+
+def scan_mod(mod_dir):
+    # Metadata of one mod directory, from its top-level files. Size and file count
+    # come from usage.DiskUsage, which walks the whole tree.
+    try:
+        with os.scandir(mod_dir) as entries:
+            names = [entry.name for entry in entries if entry.is_file()]
+    except OSError:
+        names = []
+    return read_metadata(mod_dir, names)
+
+
+# ----- Index -----
+def index_path(mod_target):
+    key = hashlib.sha1(os.path.normcase(os.path.abspath(mod_target)).encode()).hexdigest()
+    return os.path.join(core.state_dir(), "index", key + ".json")
+
+
+class ModIndex:
+    # Persistent index of the mods in one Mods folder. A refresh is a single scandir
+    # of the folder; mods are only re-read when their directory mtime has changed.
+    def __init__(self, mod_target, path=None):
+        self.mod_target = mod_target
+        self.path = path or index_path(mod_target)
+        self.lock = threading.Lock()
+        self.entries = self.load()
+        self.usage = DiskUsage(mod_target)
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                return data["mods"]
+        except Exception:
+            pass
+        return {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": INDEX_VERSION, "mods": self.entries}, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def refresh(self, sizes=True):
+        # Returns (entries sorted by directory name, names that were added/changed/removed).
+        # Mods that changed have no "size"/"files" until their tree has been walked;
+        # with sizes=False that is left to a later update_usage() call, so the list
+        # can be shown first and the sizes filled in as they come.
+        entries, changed = self._refresh()
+        if sizes and self.unsized():
+            entries = self.update_usage()
+        return entries, changed
+
+    def _refresh(self):
+        if not os.path.isdir(self.mod_target):
+            raise core.ManagerError("Mods target directory not found.")
+        with self.lock, trace.span("refresh") as span:
+            seen = {}
+            changed = []
+            for entry in os.scandir(self.mod_target):
+                if entry.name.startswith(core.STAGING_PREFIX) or not entry.is_dir():
+                    continue
+                mtime = entry.stat().st_mtime_ns
+                old = self.entries.get(entry.name)
+                if old is not None and old["mtime"] == mtime:
+                    seen[entry.name] = old
+                    continue
+                info = scan_mod(entry.path)
+                if old is not None and "size" in old:
+                    # Kept until the usage scan replaces it, so sorting by size stays stable.
+                    info["last_size"] = old["size"]
+                info["dir"] = entry.name
+                info["mtime"] = mtime
+                seen[entry.name] = info
+                changed.append(entry.name)
+            changed.extend(name for name in self.entries if name not in seen)
+            self.entries = seen
+            span.add(mods=len(seen), rescanned=len(changed))
+            if changed:
+                with span.phase("save"):
+                    self.save()
+            return [self.entries[name] for name in sorted(self.entries, key=str.lower)], changed
+
+    def unsized(self):
+        with self.lock:
+            return [name for name, entry in self.entries.items() if "size" not in entry]
+
+    def update_usage(self, names=None, on_update=None, cancel=None):
+        # Walks the given mods (default: every one without a size) on the disk-usage
+        # thread pool, records their size and file count, and returns the entries.
+        # The index isn't locked meanwhile, so refreshes and invalidations go on.
+        names = self.unsized() if names is None else names
+        results = self.usage.scan(names, on_update, cancel)
+        with self.lock:
+            for name, result in results.items():
+                entry = self.entries.get(name)
+                if entry is not None:
+                    entry.pop("last_size", None)
+                    entry.update(result)
+            self.save()
+            return [self.entries[name] for name in sorted(self.entries, key=str.lower)]
+
+    def invalidate(self, name=None):
+        # Forces the next refresh to re-read one mod, or every mod when name is None.
+        # A named mod is also walked again in full, since a file edited in place
+        # doesn't show in its directory's mtime; everything else keeps its cached usage.
+        with self.lock:
+            if name is None:
+                self.entries = {}
+            else:
+                self.entries.pop(name, None)
+        if name is not None:
+            self.usage.forget(name)
+
+
+def display_name(entry):
+    return entry.get("name") or entry["dir"]
@@ -0,0 +1,149 @@
+import os
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .core import OperationCancelled
+from .download import ProgressThrottle
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+def mod_key(mod_target, name):
+    # The key of an installed mod's directory. Lower case, because on Windows and
+    # macOS "MyMod" and "mymod" are the same folder.
+    return os.path.normcase(os.path.abspath(os.path.join(mod_target, name))).lower()
+
+
+# ----- Job -----
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, description, key, fn, on_update=None, max_updates_per_second=10):
+        self.id = next(self._ids)
+        self.description = description
+        self.key = key
+        # A job can hold several keys (a batch install holds every mod it writes).
+        self.keys = frozenset([key] if isinstance(key, str) else key)
+        self.fn = fn
+        self.state = PENDING
+        self.progress = 0
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.finished = threading.Event()
+        self.on_update = on_update
+        self._throttle = ProgressThrottle(self._progress_changed, max_updates_per_second)
+
+    def _progress_changed(self, percent):
+        self.progress = percent
+        self._notify()
+
+    def _notify(self):
+        if self.on_update:
+            self.on_update(self)
+
+    def report(self, done, total):
+        # Called by the job function; forwarded to on_update at a bounded rate.
+        self._throttle(done, total)
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise OperationCancelled("Operation cancelled.")
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+
+# ----- Scheduler -----
+class JobScheduler:
+    # Runs jobs on a worker pool. A job's keys are the mod directories it touches (see
+    # mod_key); jobs sharing any key run one after another in submission order, jobs
+    # with no key in common run in parallel.
+    def __init__(self, workers=2, on_update=None):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.on_update = on_update
+        self.lock = threading.Lock()
+        self.busy_keys = set()
+        self.waiting = []
+        self.jobs = {}
+
+    def submit(self, description, key, fn):
+        # key is one key or a collection of them. fn(job) does the work; it should call
+        # job.report() and job.check_cancelled(), or pass job.report and
+        # job.cancel_event on to the core operation.
+        job = Job(description, key, fn, self.on_update)
+        with self.lock:
+            self.jobs[job.id] = job
+            self.waiting.append(job)
+            ready = self._take_ready()
+        if job not in ready:
+            job._notify()
+        for next_job in ready:
+            next_job._notify()
+            self.executor.submit(self._run, next_job)
+        return job
+
+    def _take_ready(self):
+        # Waiting jobs whose keys are all free, marked busy. A job also waits for any
+        # earlier waiting job it shares a key with, so order per key is kept.
+        ready = []
+        blocked = set()
+        for job in self.waiting:
+            if job.keys & self.busy_keys or job.keys & blocked:
+                blocked |= job.keys
+                continue
+            self.busy_keys |= job.keys
+            ready.append(job)
+        self.waiting = [job for job in self.waiting if job not in ready]
+        return ready
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job:
+            job.cancel_event.set()
+        return job
+
+    def cancel_all(self):
+        for job in self.active():
+            job.cancel_event.set()
+
+    def active(self):
+        with self.lock:
+            return [job for job in self.jobs.values() if job.state in (PENDING, RUNNING)]
+
+    def _run(self, job):
+        if job.cancelled():
+            job.state = CANCELLED
+        else:
+            job.state = RUNNING
+            job._notify()
+            try:
+                job.result = job.fn(job)
+                job.state = DONE
+                job.progress = 100
+            except OperationCancelled:
+                job.state = CANCELLED
+            except Exception as e:
+                job.error = e
+                job.state = FAILED
+        with self.lock:
+            del self.jobs[job.id]
+            self.busy_keys -= job.keys
+            ready = self._take_ready()
+        job.finished.set()
+        job._notify()
+        for next_job in ready:
+            self.executor.submit(self._run, next_job)
+
+    def shutdown(self, wait=True, cancel=False):
+        if cancel:
+            self.cancel_all()
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,150 @@
+import os
+import re
+import threading
+import collections
+
+from . import core
+
+# Lovely writes one log per game session to <Mods>/lovely/log/lovely-<timestamp>.log.
+LOG_SUBDIR = ("lovely", "log")
+# Lines kept in memory; older ones fall off the front.
+MAX_LINES = 5000
+# When a log is first opened only its last TAIL_BYTES are read, so a log from a
+# long session costs the same to open as a short one.
+TAIL_BYTES = 1024 * 1024
+# Bytes read per poll at most; a writer far ahead is caught up over several polls.
+READ_LIMIT = 256 * 1024
+# Lovely's level prefixes are upper case ("ERROR - [G] ..."); Lua crashes print a traceback.
+ERROR_LINE = re.compile(r"\b(ERROR|FATAL|PANIC)\b|Oops! The game crashed|stack traceback")
+
+
+def log_folder(mod_target):
+    return os.path.join(mod_target, *LOG_SUBDIR)
+
+
+def newest_log(mod_target):
+    # Path of the most recently written log, or None.
+    newest, newest_mtime = None, -1
+    for folder in (log_folder(mod_target), os.path.join(mod_target, LOG_SUBDIR[0])):
+        try:
+            entries = list(os.scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.endswith(".log") and entry.is_file():
+                mtime = entry.stat().st_mtime_ns
+                if mtime > newest_mtime:
+                    newest, newest_mtime = entry.path, mtime
+    return newest
+
+
+def compile_filter(pattern):
+    if not pattern:
+        return None
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise core.ManagerError(f"Invalid filter: {e}")
+
+
+class LogTail:
+    # Follows the newest Lovely log in a Mods folder. poll() reads only the bytes
+    # appended since the last poll (plain seek + read from the last offset), so
+    # memory stays at the ring buffer of max_lines lines whatever the file's size.
+    # A newer log (the game was restarted) is switched to automatically, and a log
+    # that shrank (truncated) is read again from the start.
+    def __init__(self, mod_target, max_lines=MAX_LINES, path=None):
+        self.mod_target = mod_target
+        self.fixed_path = path
+        self.path = None
+        self.offset = 0
+        self.partial = b""
+        self.lines = collections.deque(maxlen=max_lines)
+        # Number of the next line; lines are (number, text, is_error).
+        self.next_number = 1
+        self.error_count = 0
+        self.skip_first = False
+        self.lock = threading.Lock()
+
+    def _open(self, path):
+        self.path = path
+        self.partial = b""
+        self.lines.clear()
+        self.next_number = 1
+        self.error_count = 0
+        size = os.path.getsize(path)
+        self.offset = max(0, size - TAIL_BYTES)
+        # Starting mid-file: the first (cut) line is dropped below.
+        self.skip_first = self.offset > 0
+
+    def poll(self):
+        # Reads what was appended since the last call and returns how many lines were added.
+        path = self.fixed_path or newest_log(self.mod_target)
+        if path is None:
+            return 0
+        with self.lock:
+            try:
+                if path != self.path:
+                    self._open(path)
+                size = os.path.getsize(path)
+                if size < self.offset:
+                    self._open(path)
+                    self.offset = 0
+                    self.skip_first = False
+                if size == self.offset:
+                    return 0
+                # The tail of a freshly opened log is taken in one read.
+                limit = TAIL_BYTES if self.skip_first else READ_LIMIT
+                with open(path, "rb") as f:
+                    f.seek(self.offset)
+                    data = f.read(min(limit, size - self.offset))
+            except OSError:
+                return 0
+            self.offset += len(data)
+            data = self.partial + data
+            parts = data.split(b"\n")
+            self.partial = parts.pop()
+            if len(self.partial) > READ_LIMIT:
+                # A runaway line without newlines is cut rather than buffered forever.
+                parts.append(self.partial)
+                self.partial = b""
+            if self.skip_first and parts:
+                parts.pop(0)
+                self.skip_first = False
+            # Lines that would fall straight out of the buffer aren't decoded at all.
+            kept = parts[-self.lines.maxlen:]
+            self.next_number += len(parts) - len(kept)
+            for raw in kept:
+                text = raw.rstrip(b"\r").decode("utf-8", errors="replace")
+                is_error = ERROR_LINE.search(text) is not None
+                self.error_count += is_error
+                self.lines.append((self.next_number, text, is_error))
+                self.next_number += 1
+            return len(parts)
+
+    def behind(self):
+        # True while there are appended bytes not read yet (after a large burst).
+        try:
+            return self.path is not None and os.path.getsize(self.path) > self.offset
+        except OSError:
+            return False
+
+    def snapshot(self, pattern=None, errors_only=False):
+        # Lines in the buffer matching pattern (a string or compiled regex).
+        if isinstance(pattern, str):
+            pattern = compile_filter(pattern)
+        with self.lock:
+            lines = list(self.lines)
+        if errors_only:
+            lines = [line for line in lines if line[2]]
+        if pattern is not None:
+            lines = [line for line in lines if pattern.search(line[1])]
+        return lines
+
+
+def next_error(lines, after=-1):
+    # Index in lines of the first error after index `after`, wrapping around; None if there is none.
+    for i in list(range(after + 1, len(lines))) + list(range(0, after + 1)):
+        if lines[i][2]:
+            return i
+    return None
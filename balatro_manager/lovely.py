@@ -0,0 +1,208 @@
+import os
+import json
+import shutil
+import threading
+
+from . import core, trace
+
+# ----- Catalog -----
+RELEASE_BASE = "https://github.com/ethangreen-dev/lovely-injector/releases/download"
+VERSIONS = ("0.7.1", "0.7.0", "0.6.0")
+DEFAULT_VERSION = VERSIONS[0]
+# Release labels, as offered in the UI and on the command line, and the asset each one downloads.
+ASSETS = {
+    "Windows (x86_64-pc-windows-msvc)": "lovely-x86_64-pc-windows-msvc.zip",
+    "macOS (x86_64-apple-darwin)": "lovely-x86_64-apple-darwin.tar.gz",
+    "macOS (aarch64-apple-darwin)": "lovely-aarch64-apple-darwin.tar.gz",
+}
+RELEASES = tuple(ASSETS)
+DEFAULT_RELEASE = RELEASES[0]
+MANIFEST = "manifest.json"
+DLL_NAME = "version.dll"
+
+
+def release_url(release, version=DEFAULT_VERSION):
+    if release not in ASSETS or version not in VERSIONS:
+        raise core.ManagerError("Invalid release selection.")
+    return f"{RELEASE_BASE}/v{version}/{ASSETS[release]}"
+
+
+def version_folder(release, version=DEFAULT_VERSION):
+    # Each version of each release is extracted once into its own folder under lovely/.
+    asset = ASSETS[release].split(".")[0]
+    return os.path.join(core.lovely_folder(), f"v{version}-{asset[len('lovely-'):]}")
+
+
+# ----- Manifests -----
+def load_manifest(folder):
+    try:
+        with open(os.path.join(folder, MANIFEST), "r") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def build_manifest(folder, release, version, archive_sha256):
+    # Records every extracted file's size and hash, and where version.dll is, so
+    # installs never have to walk or re-hash the extracted tree.
+    files = {}
+    dll = None
+    for root_dir, dirs, names in os.walk(folder):
+        for name in names:
+            full = os.path.join(root_dir, name)
+            rel = os.path.relpath(full, folder).replace(os.sep, "/")
+            if rel in (MANIFEST, ".archive-sha256"):
+                continue
+            files[rel] = {"size": os.path.getsize(full), "sha256": core.file_sha256(full)}
+            if name.lower() == DLL_NAME and dll is None:
+                dll = rel
+    manifest = {"version": version, "release": release, "archive_sha256": archive_sha256, "dll": dll, "files": files}
+    tmp = os.path.join(folder, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(folder, MANIFEST))
+    return manifest
+
+
+def fetch(release, version=DEFAULT_VERSION, progress=None, max_updates_per_second=10, offline=False):
+    # Makes sure this version is downloaded and extracted, and returns its manifest.
+    # A version that is already extracted from the same archive costs one revalidation.
+    folder = version_folder(release, version)
+    core.download_lovely(release_url(release, version), folder, progress, max_updates_per_second, offline=offline)
+    archive_sha256 = core.extracted_sha256(folder)
+    manifest = load_manifest(folder)
+    if manifest is None or manifest.get("archive_sha256") != archive_sha256:
+        with trace.span("lovely manifest", version=version) as span:
+            manifest = build_manifest(folder, release, version, archive_sha256)
+            span.add(files=len(manifest["files"]), bytes=sum(f["size"] for f in manifest["files"].values()))
+    return manifest
+
+
+def downloaded():
+    # Manifests of every extracted version, newest version first.
+    manifests = []
+    root = core.lovely_folder()
+    if os.path.isdir(root):
+        for entry in os.scandir(root):
+            manifest = load_manifest(entry.path) if entry.is_dir() else None
+            if manifest:
+                manifest["folder"] = entry.path
+                manifests.append(manifest)
+    order = {version: i for i, version in enumerate(VERSIONS)}
+    return sorted(manifests, key=lambda m: (order.get(m["version"], len(order)), m["release"]))
+
+
+def dll_hashes():
+    # {version.dll sha256: (version, release)} over everything downloaded.
+    return {m["files"][m["dll"]]["sha256"]: (m["version"], m["release"]) for m in downloaded() if m.get("dll")}
+
+
+# ----- Installed file hashes -----
+class HashCache:
+    # sha256 of files keyed by path, reused while size and mtime are unchanged, so
+    # checking which Lovely is installed is a stat instead of a hash on every refresh.
+    def __init__(self, path=None):
+        self.path = path or os.path.join(core.state_dir(), "lovely-hashes.json")
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, "r") as f:
+                self.entries = json.load(f)
+        except Exception:
+            self.entries = {}
+
+    def sha256(self, path):
+        st = os.stat(path)
+        key = os.path.normcase(os.path.abspath(path))
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                return entry[2]
+        sha = core.file_sha256(path)
+        self.remember(path, sha, st)
+        return sha
+
+    def remember(self, path, sha, st=None):
+        st = st or os.stat(path)
+        key = os.path.normcase(os.path.abspath(path))
+        with self.lock:
+            self.entries[key] = [st.st_size, st.st_mtime_ns, sha]
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.entries, f)
+            os.replace(tmp, self.path)
+
+
+_hash_caches = {}
+
+
+def _hash_cache():
+    path = os.path.join(core.state_dir(), "lovely-hashes.json")
+    if path not in _hash_caches:
+        _hash_caches[path] = HashCache(path)
+    return _hash_caches[path]
+
+
+# ----- Install -----
+def install(target_dir, release, version=DEFAULT_VERSION):
+    # Copies this version's version.dll into the game directory. Returns False without
+    # writing anything if the installed file already has the same size and hash.
+    manifest = load_manifest(version_folder(release, version))
+    if manifest is None:
+        raise core.ManagerError(f"Lovely {version} not downloaded.")
+    if not manifest.get("dll"):
+        raise core.ManagerError("version.dll not found in downloaded files.")
+    return install_dll(os.path.join(version_folder(release, version), *manifest["dll"].split("/")),
+                       manifest["files"][manifest["dll"]], target_dir)
+
+
+def install_dll(source, expected, target_dir):
+    # expected is the manifest entry ({"size", "sha256"}) for source.
+    with trace.span("lovely install") as span:
+        return _install_dll(source, expected, target_dir, span)
+
+
+def _install_dll(source, expected, target_dir, span):
+    if not os.path.isdir(target_dir):
+        raise core.ManagerError("Invalid target DLL directory.")
+    dest = os.path.join(target_dir, DLL_NAME)
+    cache = _hash_cache()
+    try:
+        with span.phase("compare"):
+            if os.path.getsize(dest) == expected["size"] and cache.sha256(dest) == expected["sha256"]:
+                span.add(skipped=True)
+                return False
+    except OSError:
+        pass
+    tmp = dest + ".installing"
+    try:
+        with span.phase("copy"):
+            shutil.copyfile(source, tmp)
+        span.add(bytes=expected["size"])
+        with span.phase("verify"):
+            verified = core.file_sha256(tmp) == expected["sha256"]
+        if not verified:
+            raise core.ManagerError("Downloaded version.dll does not match its manifest; download it again.")
+        os.replace(tmp, dest)
+    except core.ManagerError:
+        raise
+    except Exception as e:
+        raise core.ManagerError("Failed to install Lovely: " + str(e))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    cache.remember(dest, expected["sha256"])
+    return True
+
+
+def installed_version(target_dir):
+    # None when no version.dll is installed, otherwise (version, release), with
+    # version "unknown" for a DLL that matches nothing downloaded here.
+    dest = os.path.join(target_dir, DLL_NAME)
+    if not os.path.isfile(dest):
+        return None
+    try:
+        sha = _hash_cache().sha256(dest)
+    except OSError:
+        return ("unknown", None)
+    return dll_hashes().get(sha, ("unknown", None))
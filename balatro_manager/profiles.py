@@ -0,0 +1,149 @@
+import os
+import json
+
+from . import core
+from .config import DEFAULT_PROFILE, PROFILE_NAME
+
+
+class ModProfiles:
+    # Named sets of mods for one Mods folder. Inactive profiles are whole Mods
+    # folders parked in "<Mods>.profiles/<name>" next to it, so activating one is two
+    # directory renames on the same filesystem, whatever the size of either modpack.
+    # The installed-mods index follows each folder around, so a profile that has been
+    # active before lists instantly without rescanning its mods.
+    # A switch is recorded in "<Mods>.profiles/active.json" before anything is renamed,
+    # and recover() finishes or rolls back a switch that was interrupted.
+    def __init__(self, mod_target):
+        self.mod_target = os.path.normpath(mod_target)
+        self.root = self.mod_target + ".profiles"
+        self.state_path = os.path.join(self.root, "active.json")
+
+    def _state(self):
+        try:
+            with open(self.state_path, "r") as f:
+                state = json.load(f)
+            if isinstance(state, dict) and state.get("active"):
+                return state
+        except Exception:
+            pass
+        return {"active": DEFAULT_PROFILE}
+
+    def _save_state(self, state):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def stored_path(self, name):
+        if not PROFILE_NAME.match(name):
+            raise core.ManagerError(f"Invalid profile name: {name}")
+        return os.path.join(self.root, name)
+
+    def active(self):
+        return self._state()["active"]
+
+    def names(self):
+        names = {self.active()}
+        if os.path.isdir(self.root):
+            names.update(entry.name for entry in os.scandir(self.root) if entry.is_dir())
+        return sorted(names, key=str.lower)
+
+    def create(self, name):
+        # New profiles start empty, i.e. an unmodded game.
+        path = self.stored_path(name)
+        if name in self.names():
+            raise core.ManagerError(f"Profile '{name}' already exists.")
+        os.makedirs(path)
+
+    def delete(self, name):
+        if name == self.active():
+            raise core.ManagerError("The active profile can't be deleted.")
+        path = self.stored_path(name)
+        if not os.path.isdir(path):
+            raise core.ManagerError(f"Profile '{name}' not found.")
+        from .trash import Trash
+        # Dropped first: the mods' manifests are found by listing the folder.
+        _move_index(path, None)
+        Trash.beside(self.mod_target).move(path, kind="profile")
+
+    def switch(self, name):
+        self.recover()
+        current = self.active()
+        if name == current:
+            return
+        incoming = self.stored_path(name)
+        outgoing = self.stored_path(current)
+        if not os.path.isdir(incoming):
+            raise core.ManagerError(f"Profile '{name}' not found.")
+        if os.path.exists(outgoing):
+            raise core.ManagerError(f"Profile folder '{outgoing}' is in the way.")
+        self._save_state({"active": current, "switching_to": name})
+        try:
+            if os.path.isdir(self.mod_target):
+                os.rename(self.mod_target, outgoing)
+                _move_index(self.mod_target, outgoing)
+            else:
+                os.makedirs(outgoing)
+            os.rename(incoming, self.mod_target)
+            _move_index(incoming, self.mod_target)
+        except OSError as e:
+            self.recover()
+            raise core.ManagerError(f"Failed to switch profile (is the game running?): {e}")
+        self._save_state({"active": name})
+
+    def recover(self):
+        # Finishes a switch that got as far as parking the old profile, otherwise undoes it.
+        state = self._state()
+        name = state.get("switching_to")
+        if not name:
+            return
+        current = state["active"]
+        incoming, outgoing = self.stored_path(name), self.stored_path(current)
+        if not os.path.exists(self.mod_target):
+            # Put the new profile in place, or failing that the old one back.
+            for candidate, owner in ((incoming, name), (outgoing, current)):
+                if not os.path.isdir(candidate):
+                    continue
+                try:
+                    os.rename(candidate, self.mod_target)
+                except OSError:
+                    continue
+                _move_index(candidate, self.mod_target)
+                self._save_state({"active": owner})
+                return
+            return
+        if os.path.isdir(outgoing) and not os.path.exists(incoming):
+            current = name
+        self._save_state({"active": current})
+
+
+def _move_index(src_dir, dest_dir):
+    # The index and disk-usage cache are keyed by folder path, and each mod's sync
+    # manifest by the mod's path; a renamed folder takes them all with it. Called
+    # once the folder has been renamed to dest_dir (or, with dest_dir None, before
+    # it is removed).
+    from .index import index_path
+    from .usage import usage_path
+    from .sync import manifest_path
+    moves = [(path_for(src_dir), None if dest_dir is None else path_for(dest_dir))
+             for path_for in (index_path, usage_path)]
+    listed = src_dir if dest_dir is None else dest_dir
+    if os.path.isdir(listed):
+        for entry in os.scandir(listed):
+            if entry.is_dir():
+                moves.append((manifest_path(os.path.join(src_dir, entry.name)),
+                              None if dest_dir is None else manifest_path(os.path.join(dest_dir, entry.name))))
+    for src, dest in moves:
+        try:
+            if dest is None:
+                os.remove(src)
+            else:
+                os.replace(src, dest)
+        except FileNotFoundError:
+            # Nothing to take along; whatever is still keyed by dest_dir belongs to no folder now.
+            if dest is not None:
+                try:
+                    os.remove(dest)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,86 @@
+from .index import display_name
+
+# Per-term results kept between keystrokes; typing usually only extends the last term.
+TERM_CACHE_SIZE = 256
+# Sort keys offered by the UI; every order is computed once per index build.
+SORT_KEYS = {
+    "name": (lambda mod: display_name(mod).lower(), False),
+    "size": (lambda mod: mod.get("size", mod.get("last_size", 0)), True),
+    "date": (lambda mod: mod.get("mtime", 0), True),
+}
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ModSearch:
+    # In-memory search over installed-mod entries (as returned by ModIndex.refresh).
+    # Each mod's name, directory, authors and tags are folded into one lowercase
+    # haystack. Terms of three or more characters are looked up in a trigram index
+    # and confirmed with a substring check; shorter terms are checked against every
+    # haystack, so they match anywhere too ("ab" finds "Crab"). A query matches a mod
+    # when every term does. Nothing here touches the disk.
+    def __init__(self, mods):
+        self.mods = mods
+        self.term_cache = {}
+        self.haystacks = []
+        self.trigrams = {}
+        for i, mod in enumerate(mods):
+            fields = [display_name(mod), mod["dir"]] + list(mod.get("authors", [])) + list(mod.get("tags", []))
+            haystack = "\n".join(fields).lower()
+            self.haystacks.append(haystack)
+            for gram in _trigrams(haystack):
+                self.trigrams.setdefault(gram, set()).add(i)
+        self.orders = {}
+        self.ranks = {}
+        for name, (key, reverse) in SORT_KEYS.items():
+            order = sorted(range(len(mods)), key=lambda i: key(mods[i]), reverse=reverse)
+            rank = [0] * len(mods)
+            for position, i in enumerate(order):
+                rank[i] = position
+            self.orders[name], self.ranks[name] = order, rank
+        self.sorted_mods = {name: [mods[i] for i in order] for name, order in self.orders.items()}
+
+    def _term_matches(self, term):
+        found = self.term_cache.get(term)
+        if found is not None:
+            return found
+        haystacks = self.haystacks
+        if len(term) < 3:
+            # Too short for the trigram index. Scanning every haystack (or only what the
+            # term's first character matched) takes a few ms even for a 20,000-mod catalog.
+            candidates = self.term_cache.get(term[:-1]) if len(term) == 2 else None
+            if candidates is None:
+                candidates = range(len(haystacks))
+            found = {i for i in candidates if term in haystacks[i]}
+        else:
+            # Whatever matched the term one character shorter is a superset of the
+            # answer, and usually much smaller than the trigram sets.
+            candidates = self.term_cache.get(term[:-1]) if len(term) > 3 else None
+            if candidates is None:
+                grams = sorted((self.trigrams.get(gram, set()) for gram in _trigrams(term)), key=len)
+                candidates = grams[0].intersection(*grams[1:]) if grams[0] else ()
+            found = {i for i in candidates if term in haystacks[i]}
+        if len(self.term_cache) >= TERM_CACHE_SIZE:
+            self.term_cache.clear()
+        self.term_cache[term] = found
+        return found
+
+    def search(self, query="", sort="name"):
+        # Returns the matching entries in the requested order ("name", "size" or "date").
+        order = self.orders[sort]
+        terms = query.lower().split()
+        if not terms:
+            return self.sorted_mods[sort]
+        matched = None
+        for term in sorted(terms, key=len, reverse=True):
+            found = self._term_matches(term)
+            matched = found if matched is None else matched & found
+            if not matched:
+                return []
+        if len(matched) * 8 < len(order):
+            # A narrow result is cheaper to sort directly than to pick out of the full order.
+            return [self.mods[i] for i in sorted(matched, key=self.ranks[sort].__getitem__)]
+        return [self.mods[i] for i in order if i in matched]
+
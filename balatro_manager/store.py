@@ -0,0 +1,282 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+import time
+import zlib
+
+COPY_BUFFER = 1024 * 1024
+INDEX_VERSION = 2
+# Objects stored before the index recorded mtimes all carry this one.
+OBJECT_MTIME_NS = 946684800 * 10 ** 9
+# Only files a mod reads and never rewrites are hardlinked; anything else (Lua,
+# config, save data) is reflinked or copied, so a mod that writes its own files
+# can't change them under other mods, profiles or the store.
+HARDLINK_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".ogg", ".wav", ".mp3", ".flac",
+                       ".ttf", ".otf", ".fnt", ".fs", ".glsl"}
+# Objects no mod links to any more are kept up to this size so reinstalling a
+# version that was seen before stays cheap; the oldest are dropped first.
+DEFAULT_KEEP_BYTES = 256 * 1024 * 1024
+FICLONE = 0x40049409
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def digests(path):
+    # (SHA-256 hex, CRC-32) of a file in one read; core.file_sha256 when only the hash is needed.
+    sha = hashlib.sha256()
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_BUFFER), b""):
+            sha.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+    return sha.hexdigest(), crc
+
+
+def _reflink(src, dest):
+    # Copy-on-write clone where the filesystem supports it (Btrfs, XFS, APFS).
+    if sys.platform.startswith("linux"):
+        import fcntl
+        with open(src, "rb") as s, open(dest, "wb") as d:
+            try:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+                return True
+            except OSError:
+                pass
+        os.remove(dest)
+        return False
+    if sys.platform == "darwin":
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if hasattr(libc, "clonefile"):
+            return libc.clonefile(os.fsencode(src), os.fsencode(dest), 0) == 0
+    return False
+
+
+class ContentStore:
+    # Content-addressed store for installed mod files, kept next to the Mods folder
+    # ("<Mods>.store") so it is on the same filesystem. Objects live at
+    # objects/<sha256[:2]>/<sha256> and are materialized into mods as reflinks, as
+    # hardlinks for assets (see HARDLINK_EXTENSIONS), or as plain copies. The link count
+    # is the reference count: an object with a single link is no longer used by any
+    # mod and is only kept (within keep_bytes) as a cache. Objects keep the mtime they
+    # were stored with, which index.json records; an asset edited in place through a
+    # hardlink changes the object's mtime, and that is how it gets noticed. ZIP members
+    # are also indexed by (size, CRC-32) from the central directory, which only names a
+    # candidate: sync_zip confirms its SHA-256 before linking it. object_lock is held
+    # while materializing and by gc, so gc never deletes an object being linked.
+    def __init__(self, root, keep_bytes=DEFAULT_KEEP_BYTES):
+        self.root = root
+        self.keep_bytes = keep_bytes
+        self.objects_dir = os.path.join(root, "objects")
+        self.tmp_dir = os.path.join(root, "tmp")
+        self.index_path = os.path.join(root, "index.json")
+        self.lock = threading.Lock()
+        self.object_lock = threading.RLock()
+        self.aliases = None
+        self.mtimes = None
+        self.aliases_dirty = False
+        # Cleared after the first failed clone, so other filesystems don't pay for trying.
+        self.can_reflink = True
+
+    @classmethod
+    def beside(cls, mod_target):
+        # One shared instance per store, so concurrent installs see each other's aliases.
+        root = os.path.normpath(os.path.abspath(mod_target)) + ".store"
+        with _stores_lock:
+            if root not in _stores:
+                _stores[root] = cls(root)
+            return _stores[root]
+
+    def object_path(self, sha):
+        return os.path.join(self.objects_dir, sha[:2], sha)
+
+    def has(self, sha):
+        try:
+            st = os.stat(self.object_path(sha))
+        except OSError:
+            return False
+        return st.st_mtime_ns == self._mtime(sha)
+
+    # ----- Adding content -----
+    def temp_path(self):
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.tmp_dir)
+        os.close(fd)
+        return path
+
+    def adopt(self, temp, size=None, crc=None, sha=None):
+        # Moves a finished temp file into the store (or drops it if the content is
+        # already there) and returns its hash. Hold object_lock until the object is
+        # materialized, or a gc in between may delete it again.
+        file_crc = crc
+        if sha is None:
+            sha, file_crc = digests(temp)
+        with self.object_lock:
+            if self.has(sha):
+                os.remove(temp)
+            else:
+                mtime = os.stat(temp).st_mtime_ns
+                os.makedirs(os.path.dirname(self.object_path(sha)), exist_ok=True)
+                # A stale object is replaced by name; mods still linked to it keep their copy.
+                os.replace(temp, self.object_path(sha))
+                with self.lock:
+                    self._load_aliases()
+                    self.mtimes[sha] = mtime
+                    self.aliases_dirty = True
+        self._alias(size if size is not None else os.path.getsize(self.object_path(sha)), file_crc, sha)
+        return sha
+
+    def put_file(self, path):
+        # Returns (sha256, crc32) of path, copying it into the store if it's new.
+        # The object keeps path's mtime, as a plain copy would.
+        sha, crc = digests(path)
+        if not self.has(sha):
+            temp = self.temp_path()
+            try:
+                shutil.copy2(path, temp)
+                self.adopt(temp, os.path.getsize(path), crc, sha)
+            finally:
+                if os.path.exists(temp):
+                    os.remove(temp)
+        return sha, crc
+
+    # ----- Index -----
+    def _load_aliases(self):
+        # index.json: {"aliases": {"size:crc": sha}, "mtimes": {sha: mtime_ns}}.
+        if self.aliases is None:
+            try:
+                with open(self.index_path, "r") as f:
+                    data = json.load(f)
+                if data.get("version") != INDEX_VERSION:
+                    raise ValueError("old store index")
+                self.aliases, self.mtimes = data["aliases"], data["mtimes"]
+            except Exception:
+                self.aliases, self.mtimes = {}, {}
+
+    def _mtime(self, sha):
+        with self.lock:
+            self._load_aliases()
+            return self.mtimes.get(sha, OBJECT_MTIME_NS)
+
+    def _alias(self, size, crc, sha):
+        with self.lock:
+            self._load_aliases()
+            key = f"{size}:{crc}"
+            if self.aliases.get(key) != sha:
+                self.aliases[key] = sha
+                self.aliases_dirty = True
+
+    def lookup(self, size, crc):
+        # Hash of a stored object with this size and CRC-32, if there is one. Files can
+        # share both by chance (or by design); check the SHA-256 before using it.
+        with self.lock:
+            self._load_aliases()
+            sha = self.aliases.get(f"{size}:{crc}")
+        return sha if sha and self.has(sha) else None
+
+    def save(self):
+        with self.lock:
+            if not self.aliases_dirty:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            tmp = self.index_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"version": INDEX_VERSION, "aliases": self.aliases, "mtimes": self.mtimes}, f,
+                          separators=(",", ":"))
+            os.replace(tmp, self.index_path)
+            self.aliases_dirty = False
+
+    # ----- Materializing -----
+    def materialize(self, sha, dest):
+        # Puts the object at dest and returns how: "reflink", "hardlink" or "copy".
+        # dest is unlinked first so nothing is ever written through an existing link.
+        # Reflinks and copies get the object's mtime, so every way gives the same file.
+        src = self.object_path(sha)
+        parent = os.path.dirname(dest)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        if os.path.lexists(dest):
+            os.remove(dest)
+        with self.object_lock:
+            how = None
+            if self.can_reflink:
+                if _reflink(src, dest):
+                    how = "reflink"
+                else:
+                    self.can_reflink = False
+            if how is None and os.path.splitext(dest)[1].lower() in HARDLINK_EXTENSIONS:
+                try:
+                    os.link(src, dest)
+                    return "hardlink"
+                except OSError:
+                    pass
+            if how is None:
+                shutil.copyfile(src, dest)
+                how = "copy"
+            st = os.stat(src)
+            os.utime(dest, ns=(st.st_atime_ns, st.st_mtime_ns))
+            return how
+
+    # ----- Garbage collection -----
+    def gc(self, keep_bytes=None):
+        # Deletes unreferenced objects beyond keep_bytes, the longest-unreferenced
+        # first (dropping the last link updates an object's ctime). Returns bytes freed.
+        keep_bytes = self.keep_bytes if keep_bytes is None else keep_bytes
+        with self.object_lock:
+            unused = []
+            if os.path.isdir(self.objects_dir):
+                for bucket in os.scandir(self.objects_dir):
+                    for entry in os.scandir(bucket.path):
+                        st = entry.stat()
+                        if st.st_nlink <= 1:
+                            stale = st.st_mtime_ns != self._mtime(entry.name)
+                            unused.append((stale, st.st_ctime, st.st_size, entry.path))
+            # Stale objects go first whatever their age; they can't be linked again.
+            unused.sort(key=lambda item: (not item[0], item[1]))
+            kept = sum(size for stale, ctime, size, path in unused if not stale)
+            freed = 0
+            for stale, ctime, size, path in unused:
+                if not stale and kept <= keep_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                freed += size
+                if not stale:
+                    kept -= size
+        if os.path.isdir(self.tmp_dir):
+            # Left over from installs that were killed midway.
+            for entry in os.scandir(self.tmp_dir):
+                try:
+                    if os.path.getmtime(entry.path) < time.time() - 3600:
+                        os.remove(entry.path)
+                except OSError:
+                    pass
+        if freed:
+            with self.lock:
+                self._load_aliases()
+                self.aliases = {key: sha for key, sha in self.aliases.items() if os.path.exists(self.object_path(sha))}
+                self.mtimes = {sha: mtime for sha, mtime in self.mtimes.items() if os.path.exists(self.object_path(sha))}
+                self.aliases_dirty = True
+            self.save()
+        return freed
+
+    def usage(self):
+        # (bytes in the store, bytes no mod links to).
+        total = unused = 0
+        if os.path.isdir(self.objects_dir):
+            for bucket in os.scandir(self.objects_dir):
+                for entry in os.scandir(bucket.path):
+                    st = entry.stat()
+                    total += st.st_size
+                    if st.st_nlink <= 1:
+                        unused += st.st_size
+        return total, unused
+
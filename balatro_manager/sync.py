@@ -0,0 +1,289 @@
+import os
+import json
+import shutil
+import hashlib
+import zlib
+
+from . import core
+
+COPY_BUFFER = 1024 * 1024
+
+
+# ----- Manifests -----
+# One manifest per installed mod directory, kept outside the Mods folder so the game
+# never sees it: {relative path: {"size", "crc", "mtime", "src_mtime"}}.
+def manifest_path(dest_dir):
+    key = hashlib.sha1(os.path.normcase(os.path.abspath(dest_dir)).encode()).hexdigest()
+    return os.path.join(core.state_dir(), "manifests", key + ".json")
+
+
+def load_manifest(dest_dir):
+    try:
+        with open(manifest_path(dest_dir), "r") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_manifest(dest_dir, manifest):
+    path = manifest_path(dest_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def remove_manifest(dest_dir):
+    try:
+        os.remove(manifest_path(dest_dir))
+    except FileNotFoundError:
+        pass
+
+
+def file_crc32(path):
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_BUFFER), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _copy_with_crc(src_file, dest_path):
+    # Streams src_file to dest_path and returns the CRC-32 of what was written.
+    # An existing file is unlinked first: it may be a hardlink into the content store.
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+    crc = 0
+    with open(dest_path, "wb") as out:
+        for chunk in iter(lambda: src_file.read(COPY_BUFFER), b""):
+            crc = zlib.crc32(chunk, crc)
+            out.write(chunk)
+    return crc
+
+
+# ----- Report -----
+class SyncReport:
+    def __init__(self):
+        self.added = 0
+        self.changed = 0
+        self.removed = 0
+        self.unchanged = 0
+        self.bytes_written = 0
+        self.bytes_saved = 0
+        self.linked = 0
+
+    def merge(self, other):
+        for name in vars(other):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def summary(self):
+        text = (f"{self.added} added, {self.changed} changed, {self.removed} removed, "
+                f"{self.unchanged} unchanged ({self.bytes_saved / (1024 * 1024):.1f} MB not rewritten)")
+        if self.linked:
+            text += f", {self.linked} linked from the store"
+        return text
+
+
+# ----- Sync -----
+def _dest_files(dest_dir):
+    files = {}
+    for root_dir, dirs, names in os.walk(dest_dir):
+        for name in names:
+            full = os.path.join(root_dir, name)
+            files[os.path.relpath(full, dest_dir).replace(os.sep, "/")] = os.stat(full)
+    return files
+
+
+def _intact(entry, st):
+    # The destination still holds exactly what the manifest says we wrote.
+    return entry is not None and st is not None and st.st_size == entry["size"] and st.st_mtime_ns == entry["mtime"]
+
+
+def _safe_rel(rel):
+    # Member names come from downloaded archives. Windows also splits paths on "\",
+    # and reads "C:", "\\server\share" and "\Windows" as roots, so backslashes count as
+    # separators here and anything absolute, drive-relative or climbing out is refused.
+    # Returns the name with "/" separators, as the manifest keys it.
+    name = rel.replace("\\", "/")
+    parts = [part for part in name.split("/") if part not in ("", ".")]
+    if not parts or name.startswith("/") or ".." in parts or any(":" in part for part in parts):
+        raise core.ManagerError(f"Unsafe path in mod: {rel}")
+    return "/".join(parts)
+
+
+def _dest_path(dest_dir, rel):
+    # rel must have been through _safe_rel; the containment check is the last line of defence.
+    root = os.path.abspath(dest_dir)
+    dest = os.path.abspath(os.path.join(root, *rel.split("/")))
+    if os.path.commonpath([root, dest]) != root or dest == root:
+        raise core.ManagerError(f"Unsafe path in mod: {rel}")
+    return os.path.join(dest_dir, *rel.split("/"))
+
+
+def _finish(dest_dir, manifest, existing, keep_dirs, report, manifest_dir):
+    # Deletes files the source no longer has, then any directories left empty by that.
+    for rel in existing:
+        if rel not in manifest:
+            os.remove(os.path.join(dest_dir, *rel.split("/")))
+            report.removed += 1
+    for root_dir, dirs, names in os.walk(dest_dir, topdown=False):
+        rel = os.path.relpath(root_dir, dest_dir).replace(os.sep, "/")
+        if root_dir != dest_dir and rel not in keep_dirs and not os.listdir(root_dir):
+            os.rmdir(root_dir)
+    save_manifest(manifest_dir, manifest)
+    if report.added or report.changed or report.removed:
+        # Nested changes don't touch the mod directory's own mtime; bump it so the
+        # installed-mods index (which only compares that mtime) notices the update.
+        os.utime(dest_dir)
+
+
+def sync_folder(src_dir, dest_dir, progress=None, cancel=None, done=0, total=0, manifest_dir=None, store=None):
+    # Makes dest_dir identical to src_dir, writing only added or changed files.
+    # manifest_dir is where dest_dir will finally live if it is being staged elsewhere.
+    # With a store.ContentStore, written files are linked from the store instead.
+    manifest_dir = manifest_dir or dest_dir
+    old = load_manifest(manifest_dir)
+    existing = _dest_files(dest_dir) if os.path.isdir(dest_dir) else {}
+    manifest = {}
+    keep_dirs = set()
+    report = SyncReport()
+    os.makedirs(dest_dir, exist_ok=True)
+    for root_dir, dirs, names in os.walk(src_dir):
+        for name in dirs:
+            rel = os.path.relpath(os.path.join(root_dir, name), src_dir).replace(os.sep, "/")
+            os.makedirs(os.path.join(dest_dir, *rel.split("/")), exist_ok=True)
+            keep_dirs.add(rel)
+        for name in names:
+            core.check_cancelled(cancel)
+            src = os.path.join(root_dir, name)
+            rel = os.path.relpath(src, src_dir).replace(os.sep, "/")
+            dest = os.path.join(dest_dir, *rel.split("/"))
+            st = os.stat(src)
+            entry, dest_st = old.get(rel), existing.get(rel)
+            if _intact(entry, dest_st) and entry["size"] == st.st_size and entry.get("src_mtime") == st.st_mtime_ns:
+                crc = entry["crc"]
+            elif dest_st is not None and dest_st.st_size == st.st_size:
+                crc = file_crc32(src)
+                known = entry["crc"] if _intact(entry, dest_st) else file_crc32(dest)
+                if known != crc:
+                    crc = None
+            else:
+                crc = None
+            if crc is None:
+                if store is not None:
+                    with store.object_lock:
+                        sha, crc = store.put_file(src)
+                        store.materialize(sha, dest)
+                else:
+                    with open(src, "rb") as f:
+                        crc = _copy_with_crc(f, dest)
+                    shutil.copystat(src, dest)
+                if dest_st is None:
+                    report.added += 1
+                else:
+                    report.changed += 1
+                report.bytes_written += st.st_size
+                dest_st = os.stat(dest)
+            else:
+                report.unchanged += 1
+                report.bytes_saved += st.st_size
+            manifest[rel] = {"size": st.st_size, "crc": crc, "mtime": dest_st.st_mtime_ns, "src_mtime": st.st_mtime_ns}
+            done += st.st_size
+            if progress:
+                progress(done, total)
+    _finish(dest_dir, manifest, existing, keep_dirs, report, manifest_dir)
+    return report
+
+
+def sync_zip(zf, prefix, dest_dir, progress=None, cancel=None, done=0, total=0, manifest_dir=None, workers=None,
+             store=None):
+    # Makes dest_dir identical to the members of zf under prefix ("" or "Name/"),
+    # using the CRCs stored in the ZIP so unchanged members are never decompressed.
+    # Members that do need writing are inflated in parallel by extract.extract_members.
+    # With a store.ContentStore, members it already holds are linked without being
+    # decompressed, and the rest are inflated into the store and linked from there.
+    from . import extract
+    manifest_dir = manifest_dir or dest_dir
+    old = load_manifest(manifest_dir)
+    existing = _dest_files(dest_dir) if os.path.isdir(dest_dir) else {}
+    manifest = {}
+    keep_dirs = set()
+    report = SyncReport()
+    os.makedirs(dest_dir, exist_ok=True)
+    jobs = []
+    for info in zf.infolist():
+        if not info.filename.startswith(prefix) or info.filename == prefix:
+            continue
+        core.check_cancelled(cancel)
+        rel = _safe_rel(info.filename[len(prefix):])
+        dest = _dest_path(dest_dir, rel)
+        if info.is_dir():
+            os.makedirs(dest, exist_ok=True)
+            keep_dirs.add(rel)
+            continue
+        entry, dest_st = old.get(rel), existing.get(rel)
+        unchanged = False
+        if dest_st is not None and dest_st.st_size == info.file_size:
+            known = entry["crc"] if _intact(entry, dest_st) else file_crc32(dest)
+            unchanged = known == info.CRC
+        if unchanged:
+            report.unchanged += 1
+            report.bytes_saved += info.file_size
+            manifest[rel] = {"size": info.file_size, "crc": info.CRC, "mtime": dest_st.st_mtime_ns}
+        else:
+            if dest_st is None:
+                report.added += 1
+            else:
+                report.changed += 1
+            report.bytes_written += info.file_size
+            jobs.append((info, dest))
+            manifest[rel] = None
+    done += report.bytes_saved
+    if progress:
+        progress(done, total)
+    written = jobs
+    if store is not None:
+        # Size and CRC-32 only name a candidate; the member's SHA-256 has to match too.
+        # Hashing inflates the member but writes nothing, and a match is linked.
+        candidates = [(info, dest, store.lookup(info.file_size, info.CRC)) for info, dest in jobs]
+        candidates = [(info, dest, sha) for info, dest, sha in candidates if sha is not None]
+        verified = extract.member_digests(zf.filename, [info for info, dest, sha in candidates], workers,
+                                          cancel) if candidates else {}
+        linked = set()
+        for info, dest, sha in candidates:
+            if verified.get(info.filename) != sha:
+                continue
+            core.check_cancelled(cancel)
+            with store.object_lock:
+                if not store.has(sha):
+                    continue
+                store.materialize(sha, dest)
+            linked.add(info.filename)
+            report.linked += 1
+            done += info.file_size
+            if progress:
+                progress(done, total)
+        jobs = [(info, dest) for info, dest in jobs if info.filename not in linked]
+    if jobs and store is not None:
+        # Inflate into the store's temp area, then move each member into the store and link it.
+        temps = [(info, store.temp_path()) for info, dest in jobs]
+        try:
+            extract.extract_members(zf.filename, temps, workers,
+                                    lambda written, _: progress(done + written, total) if progress else None, cancel)
+            for (info, temp), (_, dest) in zip(temps, jobs):
+                with store.object_lock:
+                    store.materialize(store.adopt(temp, info.file_size, info.CRC), dest)
+        finally:
+            for info, temp in temps:
+                if os.path.exists(temp):
+                    os.remove(temp)
+    elif jobs:
+        extract.extract_members(zf.filename, jobs, workers,
+                                lambda written, _: progress(done + written, total) if progress else None, cancel)
+    for info, dest in written:
+        rel = _safe_rel(info.filename[len(prefix):])
+        manifest[rel] = {"size": info.file_size, "crc": info.CRC, "mtime": os.stat(dest).st_mtime_ns}
+    _finish(dest_dir, manifest, existing, keep_dirs, report, manifest_dir)
+    return report
@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import itertools
+import threading
+import logging
+import collections
+from contextlib import contextmanager
+
+from . import core
+
+log = logging.getLogger(__name__)
+
+# The span log rotates at LOG_MAX_BYTES and keeps LOG_BACKUPS old files
+# (trace.jsonl.1 is the newest of those).
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUPS = 3
+# Finished spans kept in memory for the performance panel.
+RECENT_SPANS = 500
+
+_ids = itertools.count(1)
+_local = threading.local()
+_lock = threading.Lock()
+_recent = collections.deque(maxlen=RECENT_SPANS)
+_listeners = []
+_log = None
+enabled = True
+
+
+def log_path():
+    return os.path.join(core.state_dir(), "trace.jsonl")
+
+
+class Span:
+    # One timed operation. Phases split its duration into named parts (time spent
+    # downloading vs inflating vs renaming), and fields carry counts such as bytes
+    # and files. Spans opened inside another span on the same thread record it as parent.
+    def __init__(self, name, fields, parent):
+        self.name = name
+        self.id = next(_ids)
+        self.parent = parent.id if parent else None
+        self.fields = dict(fields)
+        self.phases = {}
+        self.error = None
+        self.start = time.time()
+        self.started = time.perf_counter()
+        self.duration = None
+        self.current_phase = None
+
+    def add(self, **fields):
+        # Numbers accumulate, anything else is overwritten.
+        for key, value in fields.items():
+            old = self.fields.get(key)
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)) and not isinstance(value, bool):
+                self.fields[key] = old + value
+            else:
+                self.fields[key] = value
+
+    @contextmanager
+    def phase(self, name):
+        outer, self.current_phase = self.current_phase, name
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+            self.current_phase = outer
+
+    def record(self):
+        record = {
+            "ts": round(self.start, 3),
+            "span": self.name,
+            "id": self.id,
+            "parent": self.parent,
+            "thread": threading.current_thread().name,
+            "duration": round(self.duration, 6),
+            "phases": {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            "fields": self.fields,
+        }
+        if self.error:
+            record["error"] = self.error
+        return record
+
+
+def current():
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def span(name, **fields):
+    # with trace.span("install", source=path) as s:
+    #     with s.phase("extract"): ...
+    #     s.add(bytes=n)
+    # An exception is recorded on the span and re-raised.
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    s = Span(name, fields, current())
+    _local.stack.append(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.error = f"{type(e).__name__}: {e}"
+        if s.current_phase:
+            s.error = f"{s.current_phase}: {s.error}"
+        raise
+    finally:
+        _local.stack.pop()
+        s.duration = time.perf_counter() - s.started
+        _finish(s)
+
+
+@contextmanager
+def phase(name):
+    # A phase of whatever span is open on this thread; does nothing outside a span,
+    # so lower layers can mark phases without knowing who called them.
+    s = current()
+    if s is None:
+        yield None
+        return
+    with s.phase(name):
+        yield s
+
+
+def add(**fields):
+    s = current()
+    if s is not None:
+        s.add(**fields)
+
+
+def subscribe(callback):
+    # callback(record) is called on the thread that finished the span.
+    with _lock:
+        _listeners.append(callback)
+
+
+def unsubscribe(callback):
+    with _lock:
+        if callback in _listeners:
+            _listeners.remove(callback)
+
+
+def _finish(s):
+    record = s.record()
+    with _lock:
+        _recent.append(record)
+        listeners = list(_listeners)
+        if enabled:
+            try:
+                _write(record)
+            except (OSError, TypeError, ValueError) as e:
+                # Tracing must never break the operation it traces.
+                log.warning("Trace: writing %s failed: %s", log_path(), e)
+    for callback in listeners:
+        callback(record)
+
+
+# ----- Log -----
+class RotatingLog:
+    # Append-only JSONL file, rotated by renaming once it grows past max_bytes.
+    def __init__(self, path, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.file = None
+
+    def write(self, line):
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = open(self.path, "a", encoding="utf-8")
+        if self.file.tell() + len(line) > self.max_bytes and self.file.tell():
+            self.rotate()
+        self.file.write(line)
+        self.file.flush()
+
+    def rotate(self):
+        self.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, self.path + ".1")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def _write(record):
+    global _log
+    path = log_path()
+    if _log is None or _log.path != path:
+        if _log is not None:
+            _log.close()
+        _log = RotatingLog(path)
+    _log.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+
+
+def close():
+    with _lock:
+        if _log is not None:
+            _log.close()
+
+
+# ----- Summary -----
+def recent(count=None):
+    with _lock:
+        records = list(_recent)
+    return records[-count:] if count else records
+
+
+def summary(records=None):
+    # Per span name: count, errors, total/mean/max/last seconds, summed numeric
+    # fields and total seconds per phase, most time-consuming first.
+    stats = {}
+    for record in recent() if records is None else records:
+        s = stats.setdefault(record["span"], {"span": record["span"], "count": 0, "errors": 0, "total": 0.0,
+                                              "max": 0.0, "last": 0.0, "fields": {}, "phases": {}})
+        s["count"] += 1
+        s["errors"] += 1 if record.get("error") else 0
+        s["total"] += record["duration"]
+        s["max"] = max(s["max"], record["duration"])
+        s["last"] = record["duration"]
+        for key, value in record["fields"].items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                s["fields"][key] = s["fields"].get(key, 0) + value
+        for name, seconds in record["phases"].items():
+            s["phases"][name] = s["phases"].get(name, 0.0) + seconds
+    for s in stats.values():
+        s["mean"] = s["total"] / s["count"]
+    return sorted(stats.values(), key=lambda s: s["total"], reverse=True)
+
+
+def format_summary(stats):
+    # Plain-text table for the CLI and the in-app panel.
+    if not stats:
+        return "No operations recorded yet."
+    lines = []
+    for s in stats:
+        line = f"{s['span']}: {s['count']}x, last {s['last'] * 1000:.0f} ms, mean {s['mean'] * 1000:.0f} ms, max {s['max'] * 1000:.0f} ms"
+        if s["errors"]:
+            line += f", {s['errors']} failed"
+        nbytes = s["fields"].get("bytes")
+        if nbytes:
+            line += f", {nbytes / (1024 * 1024):.1f} MB"
+            if s["total"]:
+                line += f" ({nbytes / (1024 * 1024) / s['total']:.1f} MB/s)"
+        files = s["fields"].get("files")
+        if files:
+            line += f", {files} files"
+        lines.append(line)
+        if s["phases"]:
+            phases = sorted(s["phases"].items(), key=lambda item: item[1], reverse=True)
+            lines.append("    " + ", ".join(f"{name} {seconds / s['total'] * 100 if s['total'] else 0:.0f}%"
+                                           for name, seconds in phases))
+    return "\n".join(lines)
+
+
+def read_log(path=None):
+    # Records from the log and its rotated files, oldest first.
+    path = path or log_path()
+    records = []
+    for i in range(LOG_BACKUPS, -1, -1):
+        name = f"{path}.{i}" if i else path
+        try:
+            with open(name, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        pass
+        except OSError:
+            pass
+    return records
@@ -0,0 +1,227 @@
+import os
+import sys
+import json
+import time
+import uuid
+import errno
+import shutil
+import logging
+import threading
+
+from . import core, trace
+
+log = logging.getLogger(__name__)
+
+DELETING_PREFIX = ".deleting-"
+ENTRY_FILE = "entry.json"
+# Seconds a removed mod can be brought back from the app before it is deleted.
+UNDO_SECONDS = 10
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+_trashes = {}
+_trashes_lock = threading.Lock()
+
+
+def _background_priority():
+    # Lowers the calling thread's CPU (and on Windows, I/O) priority so deleting
+    # thousands of files doesn't compete with the game or the UI.
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN)
+        elif sys.platform.startswith("linux"):
+            # Linux nice values are per thread.
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (OSError, AttributeError):
+        pass
+
+
+class Trash:
+    # Removal by rename. Folders are moved into "<Mods>.trash/<id>/" next to the Mods
+    # folder, which is a single rename on the same filesystem however many files they
+    # hold, and the actual deletion happens later on a low-priority thread. An entry
+    # whose undo window hasn't run out can be moved back with restore(). Entries with
+    # no expiry stay until purge(everything=True). Anything left over by a previous
+    # run (including half-deleted entries) goes on the next purge. Mods remember the
+    # mod profile (see profiles) they were removed from and are restored into it,
+    # even if another profile has been switched in since.
+    def __init__(self, mod_target):
+        self.mod_target = os.path.normpath(os.path.abspath(mod_target))
+        self.root = self.mod_target + ".trash"
+        self.lock = threading.Lock()
+        self.wake = threading.Condition(self.lock)
+        self.thread = None
+
+    @classmethod
+    def beside(cls, mod_target):
+        # One shared instance per Mods folder, so there is only ever one deleter thread.
+        root = os.path.normpath(os.path.abspath(mod_target))
+        with _trashes_lock:
+            if root not in _trashes:
+                _trashes[root] = cls(root)
+            return _trashes[root]
+
+    # ----- Entries -----
+    def move(self, path, kind="mod", keep=0):
+        # Moves path into the trash and returns the entry id. keep is the undo window
+        # in seconds (None: until emptied). The bookkeeping (sync manifest) moves with it.
+        from . import sync
+        path = os.path.normpath(os.path.abspath(path))
+        name = os.path.basename(path)
+        entry_id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        entry_dir = os.path.join(self.root, entry_id)
+        meta = {"name": name, "kind": kind, "origin": path, "trashed": time.time(),
+                "expires": None if keep is None else time.time() + keep}
+        if os.path.dirname(path) == self.mod_target:
+            from .profiles import ModProfiles
+            meta["profile"] = ModProfiles(self.mod_target).active()
+        with self.lock:
+            os.makedirs(entry_dir)
+            with open(os.path.join(entry_dir, ENTRY_FILE), "w") as f:
+                json.dump(meta, f)
+            try:
+                os.rename(path, os.path.join(entry_dir, name))
+                moved = True
+            except OSError as e:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                if e.errno != errno.EXDEV:
+                    raise
+                moved = False
+            if moved:
+                try:
+                    os.replace(sync.manifest_path(path), os.path.join(entry_dir, "manifest.json"))
+                except FileNotFoundError:
+                    pass
+        if not moved:
+            # The folder is on another filesystem (a mount point); all that's left is deleting in place.
+            shutil.rmtree(path)
+            sync.remove_manifest(path)
+            return None
+        self.purge_in_background()
+        return entry_id
+
+    def entries(self):
+        # Metadata of every restorable entry, newest first, each with its "id".
+        entries = []
+        if os.path.isdir(self.root):
+            for entry in os.scandir(self.root):
+                if entry.name.startswith(DELETING_PREFIX):
+                    continue
+                meta = self._meta(entry.path)
+                if meta is not None:
+                    meta["id"] = entry.name
+                    entries.append(meta)
+        return sorted(entries, key=lambda meta: meta["trashed"], reverse=True)
+
+    def _meta(self, entry_dir):
+        try:
+            with open(os.path.join(entry_dir, ENTRY_FILE), "r") as f:
+                meta = json.load(f)
+            if os.path.lexists(os.path.join(entry_dir, meta["name"])):
+                return meta
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def restore(self, entry_id):
+        # Moves an entry back to where it came from and returns its name.
+        from . import sync
+        entry_dir = os.path.join(self.root, entry_id)
+        with self.lock:
+            meta = self._meta(entry_dir) if not entry_id.startswith(DELETING_PREFIX) else None
+            if meta is None:
+                raise core.ManagerError("Nothing to restore; it has already been deleted.")
+            origin = self._restore_path(meta)
+            if os.path.lexists(origin):
+                raise core.ManagerError(f"Can't restore '{meta['name']}': a folder with that name exists.")
+            try:
+                os.rename(os.path.join(entry_dir, meta["name"]), origin)
+            except OSError as e:
+                raise core.ManagerError(f"Failed to restore '{meta['name']}': {e}")
+            if origin == meta["origin"]:
+                # Manifests only follow mods in the active Mods folder; a mod restored into
+                # a parked profile is compared file by file on its next update instead.
+                try:
+                    os.replace(os.path.join(entry_dir, "manifest.json"), sync.manifest_path(origin))
+                except FileNotFoundError:
+                    pass
+            shutil.rmtree(entry_dir, ignore_errors=True)
+        return meta["name"]
+
+    def _restore_path(self, meta):
+        # A mod removed from a profile that has since been switched out goes back into
+        # that profile's parked folder, not into whichever profile is active now.
+        profile = meta.get("profile")
+        if profile is None:
+            return meta["origin"]
+        from .profiles import ModProfiles
+        profiles = ModProfiles(self.mod_target)
+        if profile == profiles.active():
+            return meta["origin"]
+        parked = profiles.stored_path(profile)
+        if not os.path.isdir(parked):
+            raise core.ManagerError(f"Can't restore '{meta['name']}': its mod profile '{profile}' no longer exists.")
+        return os.path.join(parked, meta["name"])
+
+    # ----- Deletion -----
+    def purge(self, everything=False):
+        # Deletes expired entries (or all of them) and returns how many went.
+        now = time.time()
+        doomed = []
+        with self.lock:
+            if not os.path.isdir(self.root):
+                return 0
+            for entry in os.scandir(self.root):
+                if entry.name.startswith(DELETING_PREFIX):
+                    doomed.append(entry.path)
+                    continue
+                meta = self._meta(entry.path)
+                expires = meta.get("expires") if meta else 0
+                if everything or (expires is not None and expires <= now):
+                    # Claimed by rename, so a restore can't race the deletion.
+                    claimed = os.path.join(self.root, DELETING_PREFIX + entry.name)
+                    try:
+                        os.rename(entry.path, claimed)
+                    except OSError:
+                        continue
+                    doomed.append(claimed)
+        for path in doomed:
+            shutil.rmtree(path, ignore_errors=True)
+        if doomed:
+            # Store objects only lose their last link once the files are really gone.
+            core.release_store(self.mod_target)
+        return len(doomed)
+
+    def next_expiry(self):
+        # Half-deleted leftovers don't count; retrying them in a loop could spin on a
+        # locked file. Every purge sweeps them up anyway.
+        expiries = [meta["expires"] for meta in self.entries() if meta.get("expires") is not None]
+        return min(expiries) if expiries else None
+
+    def purge_in_background(self):
+        # Starts (or wakes) the deleter thread, which purges entries as they expire
+        # and exits once nothing is waiting.
+        with self.lock:
+            if self.thread is not None:
+                self.wake.notify()
+                return
+            self.thread = threading.Thread(target=self._run, name="trash", daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        _background_priority()
+        while True:
+            try:
+                with trace.span("trash purge") as span:
+                    span.add(entries=self.purge())
+            except OSError as e:
+                log.warning("Trash: emptying %s failed: %s", self.root, e)
+            with self.lock:
+                expiry = self.next_expiry()
+                if expiry is None:
+                    self.thread = None
+                    return
+                # An entry that couldn't be claimed (locked by another program) is
+                # retried after a pause rather than in a tight loop.
+                self.wake.wait(max(expiry - time.time(), 0.5))
@@ -0,0 +1,179 @@
+import os
+import json
+import queue
+import hashlib
+import threading
+
+from . import core, trace
+
+USAGE_VERSION = 1
+# Directory walks are I/O bound (and release the GIL in scandir/stat), so more
+# threads than cores pays off, especially on network drives and under antivirus.
+DEFAULT_WORKERS = 8
+
+
+def usage_path(mod_target):
+    key = hashlib.sha1(os.path.normcase(os.path.abspath(mod_target)).encode()).hexdigest()
+    return os.path.join(core.state_dir(), "usage", key + ".json")
+
+
+class DiskUsage:
+    # Size and file count of every mod in one Mods folder. Each directory is one task
+    # on a pool of threads, so a single huge mod is spread over all of them instead
+    # of tying one up. Per directory the cache keeps [mtime_ns, bytes, files, newest
+    # file mtime, subdirectories] of its own entries: a directory whose mtime hasn't
+    # moved costs one stat instead of a listing and a stat per file. Files are written
+    # by replacing them (see sync), which moves their directory's mtime; a file
+    # rewritten in place by some other tool is only counted again once something in
+    # its directory is added, removed or renamed.
+    def __init__(self, mod_target, workers=DEFAULT_WORKERS, path=None):
+        self.mod_target = mod_target
+        self.workers = workers
+        self.path = path or usage_path(mod_target)
+        self.lock = threading.Lock()
+        self.dirs = self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == USAGE_VERSION:
+                return data["dirs"]
+        except Exception:
+            pass
+        return {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": USAGE_VERSION, "dirs": self.dirs}, f, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def _list(self, rel):
+        # Own totals of one directory (relative to mod_target), from the cache if its
+        # mtime is unchanged. Returns (bytes, files, newest mtime, subdirectories, cached).
+        full = os.path.join(self.mod_target, *rel.split("/"))
+        mtime = os.stat(full).st_mtime_ns
+        with self.lock:
+            cached = self.dirs.get(rel)
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2], cached[3], cached[4], True
+        size = files = 0
+        latest = 0
+        subdirs = []
+        with os.scandir(full) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        size += st.st_size
+                        files += 1
+                        latest = max(latest, st.st_mtime)
+                except OSError:
+                    continue
+        with self.lock:
+            self.dirs[rel] = [mtime, size, files, latest, subdirs]
+        return size, files, latest, subdirs, False
+
+    def scan(self, names=None, on_update=None, cancel=None, max_updates_per_second=10):
+        # Returns {mod: {"size", "files", "modified"}} for the named mods (default: every
+        # directory in mod_target). on_update(totals) gets a snapshot of the running
+        # totals, each with "done" set once that mod has been fully walked, at most
+        # max_updates_per_second times and once more at the end.
+        if not os.path.isdir(self.mod_target):
+            raise core.ManagerError("Mods target directory not found.")
+        if names is None:
+            names = [entry.name for entry in os.scandir(self.mod_target)
+                     if entry.is_dir() and not entry.name.startswith(core.STAGING_PREFIX)]
+        if not names:
+            return {}
+        totals = {name: {"size": 0, "files": 0, "modified": 0, "done": False} for name in names}
+        pending = {name: 1 for name in names}
+        tasks = queue.Queue()
+        for name in names:
+            tasks.put((name, name))
+        remaining = [len(names)]
+        finished = threading.Event()
+        errors = []
+        seen = set()
+        counts = {"listed": 0, "cached": 0}
+
+        def work():
+            while True:
+                task = tasks.get()
+                if task is None or finished.is_set():
+                    return
+                name, rel = task
+                try:
+                    if cancel is not None and cancel.is_set():
+                        raise core.OperationCancelled("Cancelled.")
+                    size, files, latest, subdirs, cached = self._list(rel)
+                except core.OperationCancelled as e:
+                    errors.append(e)
+                    finished.set()
+                    return
+                except OSError:
+                    # Vanished or unreadable mid-scan; count what could be read.
+                    size = files = latest = 0
+                    subdirs, cached = [], False
+                with self.lock:
+                    seen.add(rel)
+                    counts["cached" if cached else "listed"] += 1
+                    total = totals[name]
+                    total["size"] += size
+                    total["files"] += files
+                    total["modified"] = max(total["modified"], latest)
+                    pending[name] += len(subdirs) - 1
+                    for sub in subdirs:
+                        tasks.put((name, rel + "/" + sub))
+                    if pending[name] == 0:
+                        total["done"] = True
+                        remaining[0] -= 1
+                        if remaining[0] == 0:
+                            finished.set()
+
+        with trace.span("disk usage", mods=len(names)) as span:
+            threads = [threading.Thread(target=work, daemon=True) for _ in range(max(1, self.workers))]
+            for t in threads:
+                t.start()
+            interval = 1.0 / max_updates_per_second
+            while not finished.wait(interval):
+                if on_update:
+                    on_update(self._snapshot(totals))
+            for t in threads:
+                tasks.put(None)
+            for t in threads:
+                t.join()
+            if errors:
+                raise errors[0]
+            span.add(dirs=counts["listed"] + counts["cached"], cached=counts["cached"],
+                     bytes=sum(t["size"] for t in totals.values()),
+                     files=sum(t["files"] for t in totals.values()))
+            with self.lock:
+                # Forget directories of scanned mods that weren't seen this time.
+                scanned = set(names)
+                before = len(self.dirs)
+                self.dirs = {rel: value for rel, value in self.dirs.items()
+                             if rel in seen or rel.split("/", 1)[0] not in scanned}
+                dirty = counts["listed"] or len(self.dirs) != before
+            if dirty:
+                with span.phase("save"):
+                    self.save()
+        if on_update:
+            on_update(self._snapshot(totals))
+        return {name: {key: t[key] for key in ("size", "files", "modified")} for name, t in totals.items()}
+
+    def _snapshot(self, totals):
+        with self.lock:
+            return {name: dict(t) for name, t in totals.items()}
+
+    def forget(self, name=None):
+        # Drops cached directories of one mod, or of every mod when name is None.
+        with self.lock:
+            if name is None:
+                self.dirs = {}
+            else:
+                self.dirs = {rel: value for rel, value in self.dirs.items() if rel.split("/", 1)[0] != name}
@@ -0,0 +1,235 @@
+import os
+import sys
+import time
+import select
+import logging
+import struct
+import threading
+
+from . import core
+
+log = logging.getLogger(__name__)
+
+# inotify(7) constants.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def _errno():
+    import ctypes
+    return ctypes.get_errno()
+
+
+def _libc():
+    import ctypes
+    import ctypes.util
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    return libc
+
+
+# ----- Watcher -----
+class ModsWatcher:
+    # Watches a Mods folder and calls callback(names) from a background thread with the
+    # set of top-level entries that changed, or None when the whole folder should be
+    # rescanned. Bursts of events are coalesced: the callback fires once the folder has
+    # been quiet for `debounce` seconds, or at the latest `max_delay` after the first event.
+    # On Linux this blocks on inotify, watching the folder and each mod directory in it;
+    # elsewhere it polls one scandir every `poll_interval` seconds.
+    def __init__(self, path, callback, debounce=0.3, max_delay=2.0, poll_interval=2.0):
+        self.path = path
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.backend = None
+        self.stopping = threading.Event()
+        self.thread = None
+        self._wake = None
+
+    def start(self):
+        target = self._poll
+        if sys.platform.startswith("linux") and os.path.isdir(self.path):
+            try:
+                self._inotify_setup()
+                target = self._inotify_loop
+            except OSError:
+                pass
+        self.backend = "inotify" if target == self._inotify_loop else "poll"
+        self.thread = threading.Thread(target=target, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        if self._wake is not None:
+            os.write(self._wake[1], b"x")
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+            if self._wake is not None:
+                os.close(self._wake[0])
+                os.close(self._wake[1])
+
+    def _ignored(self, name):
+        return name.startswith(core.STAGING_PREFIX)
+
+    def _emit(self, names):
+        try:
+            self.callback(names)
+        except Exception:
+            # Keep watching; a broken callback must not kill the thread.
+            log.exception("Watcher: change callback failed")
+
+    # ----- inotify -----
+    def _inotify_setup(self):
+        libc = _libc()
+        if libc is None:
+            raise OSError("inotify is not available")
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(_errno(), "inotify_init1 failed")
+        self._libc, self._fd = libc, fd
+        self._watches = {}
+        self._root_gone = False
+        try:
+            self._add_watch(self.path, "")
+            for entry in os.scandir(self.path):
+                if entry.is_dir(follow_symlinks=False) and not self._ignored(entry.name):
+                    try:
+                        self._add_watch(entry.path, entry.name)
+                    except OSError:
+                        pass
+        except OSError:
+            os.close(fd)
+            raise
+        self._wake = os.pipe()
+
+    def _add_watch(self, path, name):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(_errno(), f"Cannot watch {path}")
+        self._watches[wd] = name
+
+    def _read_events(self):
+        # Returns the changed top-level names, or None if a full rescan is needed.
+        names = set()
+        rescan = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    rescan = True
+                    continue
+                owner = self._watches.get(wd)
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+                if owner is None:
+                    continue
+                if owner == "":
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                        # A moved folder keeps its watch, but it is no longer the Mods folder.
+                        self._root_gone = True
+                        rescan = True
+                        continue
+                    if not name or self._ignored(name):
+                        continue
+                    if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                        try:
+                            self._add_watch(os.path.join(self.path, name), name)
+                        except OSError:
+                            pass
+                    names.add(name)
+                else:
+                    names.add(owner)
+        return None if rescan else names
+
+    def _inotify_loop(self):
+        fd, wake = self._fd, self._wake[0]
+        pending = set()
+        rescan = False
+        first = last = None
+        try:
+            while not self.stopping.is_set():
+                timeout = None
+                if first is not None:
+                    timeout = max(0.0, min(first + self.max_delay, last + self.debounce) - time.monotonic())
+                ready, _, _ = select.select([fd, wake], [], [], timeout)
+                if wake in ready:
+                    break
+                if fd in ready:
+                    names = self._read_events()
+                    if names is None:
+                        rescan = True
+                    else:
+                        pending |= names
+                    if rescan or pending:
+                        last = time.monotonic()
+                        first = first or last
+                    continue
+                if first is not None:
+                    self._emit(None if rescan else pending)
+                    pending, rescan = set(), False
+                    first = last = None
+                if self._root_gone or "" not in self._watches.values():
+                    # The folder itself was removed or moved away; poll until it is back.
+                    break
+        finally:
+            os.close(fd)
+        if not self.stopping.is_set():
+            self._poll()
+
+    # ----- Polling -----
+    def _snapshot(self):
+        # {name: mtime_ns} for every top-level entry. On Windows the scandir entries
+        # already carry their stat data, so this is one directory read per poll.
+        snapshot = {}
+        try:
+            for entry in os.scandir(self.path):
+                if self._ignored(entry.name):
+                    continue
+                try:
+                    snapshot[entry.name] = entry.stat(follow_symlinks=False).st_mtime_ns
+                except OSError:
+                    continue
+        except OSError:
+            return None
+        return snapshot
+
+    def _poll(self):
+        previous = self._snapshot()
+        while not self.stopping.wait(self.poll_interval):
+            current = self._snapshot()
+            if current == previous:
+                continue
+            if current is None or previous is None:
+                self._emit(None)
+            else:
+                changed = {name for name in current.keys() | previous.keys() if current.get(name) != previous.get(name)}
+                self._emit(changed)
+            previous = current
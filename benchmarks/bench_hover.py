@@ -0,0 +1,78 @@
+# Mouse-move cost across repeated mod-list refreshes: the old per-button Window binding
+# against the shared hover dispatcher. Runs headless against a stand-in window.
+#   python -m benchmarks.bench_hover [--rows 100] [--refreshes 50]
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+
+from kivy.properties import BooleanProperty, ListProperty
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+
+from hover import HoverButton, HoverDispatcher
+import hover
+
+
+class FakeWindow(BoxLayout):
+    mouse_pos = ListProperty([0, 0])
+
+    def get_root_window(self):
+        return self
+
+
+class LegacyHoverButton(Button):
+    # The original HoverButton: binds the window itself and is never unbound.
+    hovered = BooleanProperty(False)
+    window = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.window.bind(mouse_pos=self.on_mouseover)
+
+    def on_mouseover(self, window, pos):
+        self.hovered = bool(self.get_root_window() and self.collide_point(*self.to_widget(*pos)))
+
+
+def measure(window, button_class, rows, refreshes, moves=200):
+    timings = []
+    lst = BoxLayout(orientation="vertical", size=(400, rows * 50), size_hint=(None, None))
+    window.add_widget(lst)
+    for refresh in range(refreshes):
+        # What refresh_mods_list used to do: throw every card away and build new ones.
+        lst.clear_widgets()
+        for i in range(rows):
+            button = button_class(size_hint=(None, None), size=(100, 40), pos=(300, i * 50))
+            lst.add_widget(button)
+        start = time.perf_counter()
+        for m in range(moves):
+            window.mouse_pos = [310 + m % 50, (m * 37) % (rows * 50)]
+        timings.append((time.perf_counter() - start) / moves)
+    window.remove_widget(lst)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--refreshes", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    window = FakeWindow(size=(800, args.rows * 50))
+    LegacyHoverButton.window = window
+    legacy = measure(window, LegacyHoverButton, args.rows, args.refreshes)
+
+    window = FakeWindow(size=(800, args.rows * 50))
+    hover.hover_dispatcher = HoverDispatcher(window)
+    dispatched = measure(window, HoverButton, args.rows, args.refreshes)
+
+    print("%10s %18s %18s" % ("refresh", "legacy us/move", "dispatcher us/move"))
+    for i in sorted({0, 1, args.refreshes // 4, args.refreshes // 2, args.refreshes - 1}):
+        print("%10d %18.1f %18.1f" % (i + 1, legacy[i] * 1e6, dispatched[i] * 1e6))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# Refresh time, memory and widget count of the installed-mods list from 10 to 10,000 mods.
+# Needs a desktop session (Kivy creates a window).
+#   python -m benchmarks.bench_mods_list [--counts 10 100 1000 10000]
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+
+
+def make_mods_folder(root, count):
+    mods = os.path.join(root, "Mods")
+    for i in range(count):
+        mod_dir = os.path.join(mods, "Mod%05d" % i)
+        os.makedirs(mod_dir)
+        with open(os.path.join(mod_dir, "main.lua"), "w") as f:
+            f.write("--- MOD_NAME: Mod %d\n--- MOD_AUTHOR: [Bench]\n--- VERSION: 1.0.%d\n" % (i, i))
+    return mods
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    args = parser.parse_args(argv)
+
+    from kivy.base import EventLoop
+    from kivy.clock import Clock
+    EventLoop.ensure_window()
+    import main as app_main
+    from balatro_manager.index import ModIndex
+
+    print("%8s %12s %12s %10s" % ("mods", "refresh ms", "memory KB", "row widgets"))
+    for count in args.counts:
+        root = tempfile.mkdtemp()
+        try:
+            mods_folder = make_mods_folder(root, count)
+            index = ModIndex(mods_folder, path=os.path.join(root, "index.json"))
+            mods, changed = index.refresh()
+
+            def refresh_view(view):
+                view.data = app_main.mods_view_data(mods)
+                Clock.tick()
+                Clock.tick()
+
+            view = app_main.make_mods_view()
+            view.size = (600, 150)
+            start = time.perf_counter()
+            refresh_view(view)
+            elapsed = time.perf_counter() - start
+            # Separate pass for memory: tracemalloc would distort the timing.
+            view = app_main.make_mods_view()
+            view.size = (600, 150)
+            tracemalloc.start()
+            refresh_view(view)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print("%8d %12.1f %12.0f %10d" % (count, elapsed * 1000, peak / 1024, len(view.children[0].children)))
+        finally:
+            shutil.rmtree(root)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
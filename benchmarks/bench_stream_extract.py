@@ -0,0 +1,67 @@
+# Compares download-then-extract against streaming extraction for a tar.gz release.
+#   python -m benchmarks.bench_stream_extract [--size-mb 64] [--mbps 200]
+import os
+import sys
+import time
+import shutil
+import tarfile
+import argparse
+import tempfile
+
+from balatro_manager import download
+from benchmarks.release_server import serve
+
+
+def make_release(path, size_mb, files=64):
+    # Half random, half zeroes: compresses to something close to a real release.
+    src = tempfile.mkdtemp()
+    per_file = size_mb * 1024 * 1024 // files
+    for i in range(files):
+        with open(os.path.join(src, "file%03d.bin" % i), "wb") as f:
+            f.write(os.urandom(per_file // 2) + bytes(per_file // 2))
+    with tarfile.open(path, "w:gz") as tar:
+        tar.add(src, arcname="lovely")
+    shutil.rmtree(src)
+
+
+def download_then_extract(url, work):
+    archive = os.path.join(work, "archive.tar.gz")
+    download.download_file(url, archive, connections=1)
+    with tarfile.open(archive, "r:gz") as tar:
+        tar.extractall(os.path.join(work, "out"))
+
+
+def streaming(url, work):
+    download.stream_extract_tar(url, os.path.join(work, "out"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--mbps", type=float, default=200, help="Bandwidth cap in megabits per second (0 = none)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    root = tempfile.mkdtemp()
+    try:
+        make_release(os.path.join(root, "lovely.tar.gz"), args.size_mb)
+        server, base_url = serve(root, int(args.mbps * 1e6 / 8))
+        url = base_url + "/lovely.tar.gz"
+        for name, fn in (("download+extract", download_then_extract), ("streaming", streaming)):
+            best = None
+            for _ in range(args.repeat):
+                work = tempfile.mkdtemp(dir=root)
+                start = time.perf_counter()
+                fn(url, work)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+                shutil.rmtree(work)
+            print("%-18s %.3f s" % (name, best))
+        server.shutdown()
+    finally:
+        shutil.rmtree(root)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,313 @@
+# End-to-end benchmarks on synthetic workloads, written to JSON for tracking regressions.
+#   python -m benchmarks.bench_suite [--sizes 1 16 256 2048] [--mods 1000 5000] [--output results.json]
+#   python -m benchmarks.bench_suite --compare old.json new.json
+# Everything runs in a temporary directory (cache/, state/ and lovely/ included), and the
+# Lovely download and the mod catalog go to a local HTTP server standing in for GitHub
+# releases and the catalog index.
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import zipfile
+import tarfile
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from balatro_manager import core, lovely
+from balatro_manager import cache as archive_cache
+from balatro_manager.catalog import Catalog
+from balatro_manager.index import ModIndex
+from balatro_manager.search import ModSearch
+from benchmarks.bench_extract import compressible
+from benchmarks.release_server import serve
+
+MB = 1024 * 1024
+# Big mods are mostly textures and sounds: files of a few MB that barely compress.
+ASSET_SIZE = 4 * MB
+
+
+# ----- Workloads -----
+def make_sized_zip(path, size_mb):
+    chunk = os.urandom(ASSET_SIZE // 2) + compressible(ASSET_SIZE // 2)
+    remaining = size_mb * MB
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        zf.writestr("SizedMod/main.lua", "--- MOD_NAME: Sized Mod\n")
+        i = 0
+        while remaining > 0:
+            # Vary the head of every file so the content store can't collapse them into one.
+            data = i.to_bytes(8, "little") + chunk[8:min(ASSET_SIZE, remaining)]
+            zf.writestr("SizedMod/assets/%05d.bin" % i, data)
+            remaining -= len(data)
+            i += 1
+
+
+def make_small_files_tree(path, files=10000):
+    for i in range(files):
+        folder = os.path.join(path, "SmallFiles", "part%02d" % (i // 500))
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, "f%05d.lua" % i), "wb") as f:
+            f.write(b"return %d\n" % i + compressible(512))
+
+
+def zip_folder(src, path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for root_dir, dirs, names in os.walk(src):
+            for name in names:
+                full = os.path.join(root_dir, name)
+                zf.write(full, os.path.relpath(full, os.path.dirname(src)))
+
+
+def make_wrapper_zip(path, mods=20, files=50):
+    # A modpack as people zip it: one wrapper folder holding several mod folders.
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for m in range(mods):
+            zf.writestr("Modpack-main/Mod%02d/main.lua" % m, "--- MOD_NAME: Pack Mod %d\n" % m)
+            for i in range(files):
+                zf.writestr("Modpack-main/Mod%02d/src/%03d.lua" % (m, i), compressible(4096))
+
+
+def make_mods_folder(path, count):
+    for i in range(count):
+        mod = os.path.join(path, "Mod%05d" % i)
+        os.makedirs(mod)
+        with open(os.path.join(mod, "mod.json"), "w") as f:
+            json.dump({"id": "mod%d" % i, "name": "Mod %d" % i, "author": ["Author %d" % (i % 97)],
+                       "version": "1.0.%d" % i, "tags": ["tag%d" % (i % 7)]}, f)
+        with open(os.path.join(mod, "main.lua"), "w") as f:
+            f.write("return %d\n" % i)
+
+
+def make_lovely_release(www, version):
+    folder = os.path.join(www, "v" + version)
+    os.makedirs(folder)
+    with zipfile.ZipFile(os.path.join(folder, lovely.ASSETS[lovely.DEFAULT_RELEASE]), "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("version.dll", os.urandom(4 * MB))
+        zf.writestr("README.md", "Lovely " + version)
+    with tarfile.open(os.path.join(folder, lovely.ASSETS["macOS (aarch64-apple-darwin)"]), "w:gz") as tf:
+        data = os.urandom(4 * MB)
+        info = tarfile.TarInfo("version.dll")
+        info.size = len(data)
+        tf.addfile(info, io.BytesIO(data))
+
+
+def make_catalog_index(www, count):
+    mods = [{"id": "mod%d" % i, "name": "Mod %d" % i, "author": ["Author %d" % (i % 97)], "version": "1.0.%d" % i,
+             "tags": ["tag%d" % (i % 7)], "description": "Synthetic catalog entry %d" % i,
+             "download_url": "mods/mod%d.zip" % i, "size": i * 1024, "updated": 1700000000 + i} for i in range(count)]
+    with open(os.path.join(www, "catalog-%d.json" % count), "w") as f:
+        json.dump({"mods": mods}, f)
+
+
+# ----- Harness -----
+class Results:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def time(self, name, fn, setup=None, params=None, nbytes=0, repeat=None):
+        # Best of `repeat` runs; setup runs untimed before each.
+        runs = []
+        for _ in range(repeat or self.repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            fn()
+            runs.append(time.perf_counter() - start)
+        best = min(runs)
+        result = {"name": name, "params": params or {}, "seconds": best, "runs": runs}
+        if nbytes:
+            result["bytes"] = nbytes
+            result["mb_per_s"] = nbytes / MB / best if best else None
+        self.results.append(result)
+        print("  %-60s %9.3f s%s" % (name, best, "  %7.1f MB/s" % result["mb_per_s"] if nbytes else ""))
+        return best
+
+
+def _source_bytes(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(r, f)) for r, d, names in os.walk(path) for f in names)
+    with zipfile.ZipFile(path) as zf:
+        return sum(info.file_size for info in zf.infolist())
+
+
+def bench_install(results, name, source, mods_dir, params):
+    nbytes = _source_bytes(source)
+    names = [name for prefix, name in core.mod_layout(source)]
+
+    def clean():
+        shutil.rmtree(mods_dir, ignore_errors=True)
+        shutil.rmtree(mods_dir + ".store", ignore_errors=True)
+        shutil.rmtree(os.path.join("state", "manifests"), ignore_errors=True)
+
+    def uninstall_all():
+        for mod in names:
+            if os.path.isdir(os.path.join(mods_dir, mod)):
+                core.uninstall_mod(mod, mods_dir)
+
+    for dedupe in (False, True):
+        label = " (store)" if dedupe else ""
+        results.time("install %s%s" % (name, label), lambda: core.install_mod(source, mods_dir, dedupe=dedupe),
+                     setup=clean, params=params, nbytes=nbytes)
+        results.time("reinstall unchanged %s%s" % (name, label), lambda: core.install_mod(source, mods_dir, dedupe=dedupe),
+                     params=params, nbytes=nbytes)
+        results.time("uninstall %s%s" % (name, label), uninstall_all,
+                     setup=lambda: core.install_mod(source, mods_dir, dedupe=dedupe), params=params)
+        if dedupe:
+            # The store still holds every object, so this only links files.
+            results.time("install after uninstall %s (store)" % name, lambda: core.install_mod(source, mods_dir),
+                         setup=uninstall_all, params=params, nbytes=nbytes)
+    clean()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(args):
+    results = Results(args.repeat)
+    root = tempfile.mkdtemp(dir=args.tmp)
+    start_dir = os.getcwd()
+    os.chdir(root)
+    try:
+        mods_dir = os.path.join(root, "Mods")
+        os.makedirs("src")
+
+        print("install / uninstall")
+        for size_mb in args.sizes:
+            path = os.path.join("src", "sized-%dmb.zip" % size_mb)
+            make_sized_zip(path, size_mb)
+            bench_install(results, "zip %d MB" % size_mb, path, mods_dir, {"size_mb": size_mb})
+            os.remove(path)
+        make_small_files_tree(os.path.join(root, "src"), args.small_files)
+        small_tree = os.path.join("src", "SmallFiles")
+        bench_install(results, "folder %d small files" % args.small_files, small_tree, mods_dir, {"files": args.small_files})
+        zip_folder(small_tree, os.path.join("src", "small.zip"))
+        bench_install(results, "zip %d small files" % args.small_files, os.path.join("src", "small.zip"), mods_dir,
+                      {"files": args.small_files})
+        make_wrapper_zip(os.path.join("src", "modpack.zip"))
+        bench_install(results, "wrapper-folder modpack zip", os.path.join("src", "modpack.zip"), mods_dir,
+                      {"folders": 20, "files": 51 * 20})
+
+        print("extract_archive")
+        out = os.path.join(root, "extracted")
+        results.time("extract_archive zip %d small files" % args.small_files,
+                     lambda: core.extract_archive(os.path.join("src", "small.zip"), out, "small.zip"),
+                     setup=lambda: shutil.rmtree(out, ignore_errors=True), params={"files": args.small_files},
+                     nbytes=_source_bytes(os.path.join("src", "small.zip")))
+        shutil.rmtree(out, ignore_errors=True)
+
+        print("refresh installed mods list")
+        for count in args.mods:
+            folder = os.path.join(root, "ModsFolder%d" % count)
+            make_mods_folder(folder, count)
+
+            def cold():
+                shutil.rmtree(os.path.join("state", "index"), ignore_errors=True)
+                ModSearch(ModIndex(folder).refresh()[0])
+
+            def warm():
+                ModSearch(ModIndex(folder).refresh()[0])
+            # What refresh_mods_list does off the UI thread: index refresh plus search index.
+            results.time("refresh %d mods (cold index)" % count, cold, params={"mods": count})
+            results.time("refresh %d mods (warm index)" % count, warm, params={"mods": count})
+            shutil.rmtree(folder)
+
+        print("download Lovely (local release server)")
+        www = os.path.join(root, "www")
+        make_lovely_release(www, lovely.DEFAULT_VERSION)
+        server, base_url = serve(www, int(args.mbps * 1e6 / 8))
+        lovely.RELEASE_BASE = base_url
+        try:
+            for release in (lovely.DEFAULT_RELEASE, "macOS (aarch64-apple-darwin)"):
+                kind = "zip" if release == lovely.DEFAULT_RELEASE else "tar.gz"
+
+                def reset():
+                    shutil.rmtree("cache", ignore_errors=True)
+                    shutil.rmtree("lovely", ignore_errors=True)
+                    # A cold run starts without the process-wide ArchiveCache for the old folder.
+                    archive_cache._caches.clear()
+                # The body of download_lovely_thread, without the UI around it.
+                results.time("download Lovely %s (cold)" % kind, lambda: lovely.fetch(release), setup=reset,
+                             params={"mbps": args.mbps})
+                results.time("download Lovely %s (cached, revalidated)" % kind, lambda: lovely.fetch(release),
+                             params={"mbps": args.mbps})
+
+            print("mod catalog (local index server)")
+            for count in args.mods:
+                make_catalog_index(www, count)
+                url = "%s/catalog-%d.json" % (base_url, count)
+                results.time("catalog %d mods (cold fetch)" % count, lambda: Catalog(url).refresh(),
+                             setup=lambda: shutil.rmtree(os.path.join("cache", "catalog"), ignore_errors=True),
+                             params={"mods": count})
+                results.time("catalog %d mods (revalidated, 304)" % count, lambda: Catalog(url).refresh(),
+                             params={"mods": count})
+                # What opening the catalog does before any network traffic: read the cache, index it, list it.
+                results.time("catalog %d mods (open from cache + search)" % count,
+                             lambda: Catalog(url).search("author 4", "date"), params={"mods": count})
+        finally:
+            server.shutdown()
+    finally:
+        os.chdir(start_dir)
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": results.results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print("Results written to %s" % args.output)
+
+
+def compare(old_path, new_path, threshold):
+    with open(old_path) as f:
+        old = {r["name"]: r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    regressions = 0
+    for result in new:
+        before = old.get(result["name"])
+        if not before:
+            continue
+        ratio = result["seconds"] / before["seconds"] if before["seconds"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print("  %-60s %9.3f -> %9.3f s  (%.2fx)%s" % (result["name"], before["seconds"], result["seconds"], ratio, flag))
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 16, 256], help="Mod ZIP sizes in MB (up to 2048)")
+    parser.add_argument("--small-files", type=int, default=10000)
+    parser.add_argument("--mods", type=int, nargs="+", default=[1000, 5000], help="Entries in the synthetic Mods folders")
+    parser.add_argument("--mbps", type=float, default=0, help="Release server bandwidth cap in megabits per second (0 = none)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tmp", default=None, help="Where to build workloads (needs about twice the largest size free)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown reported as a regression by --compare")
+    args = parser.parse_args(argv)
+    if args.compare:
+        return compare(*args.compare, args.threshold)
+    args.output = os.path.abspath(args.output)
+    run(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import os
+import re
+import time
+import threading
+import functools
+import http.server
+import email.utils
+
+
+# ----- Local stand-in for GitHub release downloads -----
+class ReleaseHandler(http.server.SimpleHTTPRequestHandler):
+    # Serves files from a directory with Range support, ETag/Last-Modified revalidation
+    # and an optional bandwidth cap.
+    bytes_per_second = 0
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            return super().send_head()
+        size = os.path.getsize(path)
+        mtime = int(os.path.getmtime(path))
+        etag = '"%x-%x"' % (size, mtime)
+        last_modified = email.utils.formatdate(mtime, usegmt=True)
+        if self.not_modified(etag, mtime):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            return None
+        f = open(path, "rb")
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if if_range and if_range not in (etag, last_modified):
+            # The client's partial copy is of another version; send the whole file.
+            match = None
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2) or size - 1)
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes %d-%d/%d" % (start, end, size))
+            f.seek(start)
+            self.remaining = end - start + 1
+        else:
+            self.send_response(200)
+            self.remaining = size
+        self.send_header("Content-Length", str(self.remaining))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        return f
+
+    def not_modified(self, etag, mtime):
+        # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110).
+        if self.headers.get("If-None-Match"):
+            return self.headers["If-None-Match"] == etag
+        try:
+            since = email.utils.parsedate_to_datetime(self.headers.get("If-Modified-Since", ""))
+        except (TypeError, ValueError):
+            return False
+        return since is not None and mtime <= since.timestamp()
+
+    def copyfile(self, source, outputfile):
+        chunk_size = 64 * 1024
+        while self.remaining > 0:
+            chunk = source.read(min(chunk_size, self.remaining))
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            self.remaining -= len(chunk)
+            if self.bytes_per_second:
+                time.sleep(len(chunk) / self.bytes_per_second)
+
+    def log_message(self, *args):
+        pass
+
+    # Clients hang up mid-transfer whenever a download is cancelled or restarted;
+    # that is expected here, not worth a traceback.
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def finish(self):
+        try:
+            super().finish()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def serve(directory, bytes_per_second=0):
+    # Starts a server on a free localhost port; returns (server, base_url).
+    handler = type("ThrottledHandler", (ReleaseHandler,), {"bytes_per_second": bytes_per_second})
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(handler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, "http://127.0.0.1:%d" % server.server_port
@@ -0,0 +1,88 @@
+import weakref
+
+from kivy.properties import BooleanProperty
+from kivy.uix.button import Button
+
+
+# ----- Hover Dispatcher -----
+class HoverDispatcher:
+    # One Window.mouse_pos binding for every hover-aware widget. Widgets are held weakly
+    # and bucketed by window position in a coarse grid, so a mouse move only tests the
+    # few widgets under the pointer. The grid is rebuilt lazily after any registered
+    # widget moves or resizes, and only from widgets that are currently on screen.
+    cell_size = 64
+
+    def __init__(self, window=None):
+        self.window = window
+        self.widgets = weakref.WeakSet()
+        self.hovered = weakref.WeakSet()
+        self.grid = {}
+        self.dirty = True
+        self.bound = False
+
+    def register(self, widget):
+        self.widgets.add(widget)
+        widget.fbind('pos', self.mark_dirty)
+        widget.fbind('size', self.mark_dirty)
+        widget.fbind('parent', self.mark_dirty)
+        self.dirty = True
+        if not self.bound:
+            window = self.window
+            if window is None:
+                from kivy.core.window import Window
+                window = Window
+            if window is not None:
+                window.bind(mouse_pos=self.on_mouse_pos)
+                self.bound = True
+
+    def unregister(self, widget):
+        self.widgets.discard(widget)
+        self.hovered.discard(widget)
+        widget.funbind('pos', self.mark_dirty)
+        widget.funbind('size', self.mark_dirty)
+        widget.funbind('parent', self.mark_dirty)
+        self.dirty = True
+
+    def mark_dirty(self, *args):
+        self.dirty = True
+
+    def rebuild(self):
+        size = self.cell_size
+        grid = {}
+        for widget in list(self.widgets):
+            if widget.get_root_window() is None:
+                continue
+            x, y = widget.to_window(widget.x, widget.y)
+            for cx in range(int(x // size), int((x + widget.width) // size) + 1):
+                for cy in range(int(y // size), int((y + widget.height) // size) + 1):
+                    grid.setdefault((cx, cy), []).append(widget)
+        self.grid = grid
+        self.dirty = False
+
+    def candidates(self, pos):
+        if self.dirty:
+            self.rebuild()
+        return self.grid.get((int(pos[0] // self.cell_size), int(pos[1] // self.cell_size)), ())
+
+    def on_mouse_pos(self, window, pos):
+        under = [widget for widget in self.candidates(pos)
+                 if widget.get_root_window() is not None and widget.collide_point(*widget.to_widget(*pos))]
+        for widget in list(self.hovered):
+            if widget not in under:
+                widget.hovered = False
+                self.hovered.discard(widget)
+        for widget in under:
+            if widget not in self.hovered:
+                widget.hovered = True
+                self.hovered.add(widget)
+
+
+hover_dispatcher = HoverDispatcher()
+
+
+# ----- Custom Hover Button Class -----
+class HoverButton(Button):
+    hovered = BooleanProperty(False)
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        hover_dispatcher.register(self)
@@ -1,54 +1,80 @@
 import os
-import json
-import platform
-import zipfile
-import tarfile
-import tempfile
-import shutil
-import requests
+import time
 import threading
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Taken before Kivy is imported so the reported time-to-first-frame covers the whole cold start.
+STARTUP_TIME = time.perf_counter()
 
 from kivy.app import App
 from kivy.clock import Clock
+from kivy.logger import Logger
 from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.gridlayout import GridLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 from kivy.uix.scrollview import ScrollView
-from kivy.uix.popup import Popup
-from kivy.uix.progressbar import ProgressBar
-from kivy.uix.filechooser import FileChooserListView
 from kivy.uix.widget import Widget
 from kivy.lang import Builder
 from kivy.metrics import dp
-from kivy.core.clipboard import Clipboard
 from kivy.core.window import Window
 from kivy.graphics import Color, Rectangle, RoundedRectangle
 from kivy.factory import Factory
-from kivy.properties import BooleanProperty
-from kivy.uix.button import Button
-
-# ----- Determine Default Paths for Each OS -----
-if platform.system() == "Windows":
-    default_target_dll = r"C:\Program Files (x86)\Steam\steamapps\common\Balatro"
-    default_mod_target = os.path.expandvars(r"%AppData%\Balatro\Mods")
-elif platform.system() == "Darwin":
-    default_target_dll = "/Applications/Balatro"
-    default_mod_target = os.path.expanduser("~/Library/Application Support/Balatro/Mods")
-else:
-    default_target_dll = os.path.expanduser("~/Balatro")
-    default_mod_target = os.path.expanduser("~/.balatro/mods")
-
-# ----- Custom Hover Button Class -----
-class HoverButton(Button):
-    hovered = BooleanProperty(False)
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        Window.bind(mouse_pos=self.on_mouseover)
-    def on_mouseover(self, window, pos):
-        if self.get_root_window() and self.collide_point(*self.to_widget(*pos)):
-            self.hovered = True
-        else:
-            self.hovered = False
+
+from hover import HoverButton  # registers HoverButton for the KV rules below
+
+from balatro_manager import core, batch, lovely, trace
+from balatro_manager.core import default_target_dll, default_mod_target
+from balatro_manager.jobs import JobScheduler, mod_key, DONE, FAILED, CANCELLED
+from balatro_manager.index import ModIndex, display_name
+from balatro_manager.search import ModSearch
+from balatro_manager.config import ConfigStore
+from balatro_manager.profiles import ModProfiles, DEFAULT_PROFILE as DEFAULT_MOD_PROFILE
+from balatro_manager.watcher import ModsWatcher
+from balatro_manager.trash import Trash, UNDO_SECONDS
+
+# Download progress is pushed to the UI at most this many times per second.
+PROGRESS_UPDATES_PER_SECOND = 10
+# Mod installs/removals that may run at the same time (same-mod jobs always run in order).
+MOD_JOB_WORKERS = 2
+# Installed-mods sort choices shown in the UI, mapped to ModSearch sort keys.
+MOD_SORTS = {"Name": "name", "Size": "size", "Install date": "date"}
+# The performance panel redraws at most this often while operations are finishing.
+PERF_PANEL_INTERVAL = 0.5
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def mod_label_text(mod, sizing=False):
+    # sizing: the size shown is a running total from a walk still in progress.
+    text = display_name(mod)
+    if mod.get("version"):
+        text += f"  v{mod['version']}"
+    if mod.get("authors"):
+        text += "  by " + ", ".join(mod["authors"])
+    if "size" in mod:
+        text += f"\n{format_size(mod['size'])}, {mod['files']} files" + ("..." if sizing else "")
+    else:
+        text += "\nCounting files..."
+    return text
+
+def mods_view_data(mods):
+    return [{'text': mod_label_text(mod), 'mod_dir': mod["dir"]} for mod in mods]
+
+# ----- Installed mods list -----
+def make_mods_view():
+    # Only rows that are on screen get widgets; scrolling rebinds them to other entries.
+    view = RecycleView(size_hint=(1, None), height=dp(150), do_scroll_x=False)
+    rows = RecycleBoxLayout(orientation='vertical', default_size=(None, dp(50)), default_size_hint=(1, None),
+                            size_hint_y=None, spacing=dp(5), padding=[0, 0, dp(10), 0])
+    rows.bind(minimum_height=rows.setter('height'))
+    view.add_widget(rows)
+    # viewclass is handed to the layout manager, so it has to be set once that exists.
+    view.viewclass = 'ModRow'
+    return view
 
 # ----- KV Language Styling (Rounded edges and hover effects) -----
 Builder.load_string('''
@@ -148,6 +174,41 @@ Builder.load_string('''
             pos: self.pos
             size: self.size
 
+<ModRow@BoxLayout>:
+    text: ''
+    mod_dir: ''
+    orientation: 'horizontal'
+    spacing: dp(10)
+    ThemedLabel:
+        text: root.text
+        size_hint_x: 0.7
+    DangerButton:
+        text: 'Remove'
+        size_hint_x: 0.3
+        opacity: 1 if root.mod_dir else 0
+        disabled: not root.mod_dir
+        on_press: app.uninstall_mod(root.mod_dir)
+
+<PerfPanel@BoxLayout>:
+    size_hint_y: None
+    height: dp(160)
+    padding: dp(10), dp(5)
+    canvas.before:
+        Color:
+            rgba: 0.12, 0.12, 0.16, 1
+        Rectangle:
+            pos: self.pos
+            size: self.size
+    ScrollView:
+        Label:
+            id: perf_label
+            color: 0.85, 0.85, 0.85, 1
+            font_size: '12sp'
+            size_hint_y: None
+            height: self.texture_size[1]
+            text_size: self.width, None
+            halign: 'left'
+
 <ModCard@BoxLayout>:
     orientation: 'vertical'
     padding: dp(8)
@@ -162,80 +223,6 @@ Builder.load_string('''
             size: self.size
 ''')
 
-# ----- Release URLs -----
-RELEASE_URLS = {
-    "Windows (x86_64-pc-windows-msvc)": "https://github.com/ethangreen-dev/lovely-injector/releases/download/v0.7.1/lovely-x86_64-pc-windows-msvc.zip",
-    "macOS (x86_64-apple-darwin)": "https://github.com/ethangreen-dev/lovely-injector/releases/download/v0.7.1/lovely-x86_64-apple-darwin.tar.gz",
-    "macOS (aarch64-apple-darwin)": "https://github.com/ethangreen-dev/lovely-injector/releases/download/v0.7.1/lovely-aarch64-apple-darwin.tar.gz"
-}
-
-# ----- Custom File Chooser -----
-class CustomFileChooser(FileChooserListView):
-    def __init__(self, **kwargs):
-        super(CustomFileChooser, self).__init__(**kwargs)
-    def on_touch_up(self, touch):
-        if touch.grab_current is not self:
-            return super(CustomFileChooser, self).on_touch_up(touch)
-        touch.ungrab(self)
-        if self.collide_point(*touch.pos):
-            return True
-        return super(CustomFileChooser, self).on_touch_up(touch)
-
-# ----- Directory Chooser Popup -----
-class DirectoryChooserPopup(Popup):
-    def __init__(self, select_callback, **kwargs):
-        super().__init__(**kwargs)
-        self.title = "Select Directory"
-        self.size_hint = (0.9, 0.9)
-        self.select_callback = select_callback
-        self.background_color = (0.15, 0.15, 0.2, 1)
-        self.title_color = (1, 1, 1, 1)
-        box = BoxLayout(orientation="vertical", spacing=dp(10))
-        self.filechooser = CustomFileChooser(path='.', filters=[])
-        box.add_widget(self.filechooser)
-        btn_layout = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10), padding=[0, dp(10), 0, 0])
-        select_btn = Factory.ThemedButton(text="Select")
-        select_btn.bind(on_press=self.select_dir)
-        cancel_btn = Factory.ThemedButton(text="Cancel")
-        cancel_btn.bind(on_press=self.dismiss)
-        btn_layout.add_widget(select_btn)
-        btn_layout.add_widget(cancel_btn)
-        box.add_widget(btn_layout)
-        self.add_widget(box)
-    def select_dir(self, instance):
-        if self.filechooser.selection:
-            selected_path = self.filechooser.selection[0]
-            if os.path.isdir(selected_path):
-                self.select_callback(selected_path)
-                self.dismiss()
-
-# ----- File Chooser Popup -----
-class FileChooserPopup(Popup):
-    def __init__(self, select_callback, filters=None, **kwargs):
-        super().__init__(**kwargs)
-        self.title = "Select File"
-        self.size_hint = (0.9, 0.9)
-        self.select_callback = select_callback
-        self.background_color = (0.15, 0.15, 0.2, 1)
-        self.title_color = (1, 1, 1, 1)
-        box = BoxLayout(orientation="vertical", spacing=dp(10))
-        self.filechooser = CustomFileChooser(filters=filters if filters else [])
-        box.add_widget(self.filechooser)
-        btn_layout = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10), padding=[0, dp(10), 0, 0])
-        select_btn = Factory.ThemedButton(text="Select")
-        select_btn.bind(on_press=self.select_file)
-        cancel_btn = Factory.ThemedButton(text="Cancel")
-        cancel_btn.bind(on_press=self.dismiss)
-        btn_layout.add_widget(select_btn)
-        btn_layout.add_widget(cancel_btn)
-        box.add_widget(btn_layout)
-        self.add_widget(box)
-    def select_file(self, instance):
-        if self.filechooser.selection:
-            selected_path = self.filechooser.selection[0]
-            self.select_callback(selected_path)
-            self.dismiss()
-
 # ----- Main Application -----
 class BalatroManagerApp(App):
     def build(self):
@@ -252,7 +239,10 @@ class BalatroManagerApp(App):
         title_label = Factory.HeaderLabel(text="Balatro Mod & Injector Manager")
         launch_button = Factory.ThemedButton(text="Launch Balatro", size_hint_x=None, width=dp(150))
         launch_button.bind(on_press=self.launch_balatro)
+        perf_button = Factory.ThemedButton(text="Performance", size_hint_x=None, width=dp(120))
+        perf_button.bind(on_press=self.toggle_perf_panel)
         header_layout.add_widget(title_label)
+        header_layout.add_widget(perf_button)
         header_layout.add_widget(launch_button)
         main_layout.add_widget(header_layout)
 
@@ -262,6 +252,13 @@ class BalatroManagerApp(App):
         status_bar.add_widget(self.lovely_status_label)
         main_layout.add_widget(status_bar)
 
+        # Performance panel (hidden until toggled): timings of recent operations.
+        self.perf_panel = Factory.PerfPanel()
+        self.perf_label = self.perf_panel.ids.perf_label
+        self.perf_visible = False
+        self.main_layout = main_layout
+        self._perf_trigger = Clock.create_trigger(self.update_perf_panel, PERF_PANEL_INTERVAL)
+
         # Scrollable Content.
         scroll_view = ScrollView(size_hint=(1, 1))
         content_layout = BoxLayout(orientation='vertical', spacing=dp(15), padding=dp(15), size_hint_y=None)
@@ -300,11 +297,16 @@ class BalatroManagerApp(App):
         release_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(40), spacing=dp(10))
         release_label = Factory.ThemedLabel(text="Injector Release:", size_hint_x=0.3)
         self.release_spinner = Factory.ThemedSpinner(
-            text="Windows (x86_64-pc-windows-msvc)",
-            values=list(RELEASE_URLS.keys()),
-            size_hint_x=0.7)
+            text=lovely.DEFAULT_RELEASE,
+            values=list(lovely.RELEASES),
+            size_hint_x=0.5)
+        self.version_spinner = Factory.ThemedSpinner(
+            text=lovely.DEFAULT_VERSION,
+            values=list(lovely.VERSIONS),
+            size_hint_x=0.2)
         release_layout.add_widget(release_label)
         release_layout.add_widget(self.release_spinner)
+        release_layout.add_widget(self.version_spinner)
         installer_section.add_widget(release_layout)
         installer_btn_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(50), spacing=dp(10))
         download_btn = Factory.ThemedButton(text="Download Lovely")
@@ -313,9 +315,12 @@ class BalatroManagerApp(App):
         install_btn.bind(on_press=self.install_lovely)
         uninstall_btn = Factory.DangerButton(text="Uninstall Lovely")
         uninstall_btn.bind(on_press=self.uninstall_lovely)
+        log_btn = Factory.ThemedButton(text="View Log")
+        log_btn.bind(on_press=self.open_lovely_log)
         installer_btn_layout.add_widget(download_btn)
         installer_btn_layout.add_widget(install_btn)
         installer_btn_layout.add_widget(uninstall_btn)
+        installer_btn_layout.add_widget(log_btn)
         installer_section.add_widget(installer_btn_layout)
         progress_layout = BoxLayout(orientation='vertical', size_hint_y=None, height=dp(50), spacing=dp(5))
         progress_label = Factory.ThemedLabel(text="Download Progress:", size_hint_y=None, height=dp(20))
@@ -331,7 +336,7 @@ class BalatroManagerApp(App):
 
         # Section 2: Mods Manager.
         mods_section = BoxLayout(orientation='vertical', padding=dp(15), spacing=dp(10), size_hint_y=None)
-        mods_section.height = dp(300)
+        mods_section.height = dp(450)
         with mods_section.canvas.before:
             Color(rgba=(0.16, 0.16, 0.2, 1))
             self.mods_rect = Rectangle(pos=mods_section.pos, size=mods_section.size)
@@ -369,21 +374,54 @@ class BalatroManagerApp(App):
         mod_target_layout.add_widget(mod_target_paste)
         mod_target_layout.add_widget(mod_target_clear)
         mods_section.add_widget(mod_target_layout)
+        mod_profile_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(40), spacing=dp(10))
+        mod_profile_label = Factory.ThemedLabel(text="Mod Profile:", size_hint_x=0.3)
+        self.mod_profile_spinner = Factory.ThemedSpinner(text=DEFAULT_MOD_PROFILE, values=[DEFAULT_MOD_PROFILE], size_hint_x=0.3)
+        self.mod_profile_spinner.bind(text=self.switch_mod_profile)
+        self.new_profile_input = Factory.ThemedInput(hint_text="New profile name", multiline=False, size_hint_x=0.25)
+        new_profile_btn = Factory.ThemedButton(text="Create", size_hint_x=0.15)
+        new_profile_btn.bind(on_press=self.create_mod_profile)
+        mod_profile_layout.add_widget(mod_profile_label)
+        mod_profile_layout.add_widget(self.mod_profile_spinner)
+        mod_profile_layout.add_widget(self.new_profile_input)
+        mod_profile_layout.add_widget(new_profile_btn)
+        mods_section.add_widget(mod_profile_layout)
         mod_btn_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(50), spacing=dp(10))
         install_mod_btn = Factory.ThemedButton(text="Install Mod")
         install_mod_btn.bind(on_press=self.install_mod)
         refresh_mods_btn = Factory.ThemedButton(text="Refresh Mods List")
         refresh_mods_btn.bind(on_press=lambda x: self.refresh_mods_list())
+        catalog_btn = Factory.ThemedButton(text="Browse Catalog")
+        catalog_btn.bind(on_press=self.open_catalog)
         mod_btn_layout.add_widget(install_mod_btn)
         mod_btn_layout.add_widget(refresh_mods_btn)
+        mod_btn_layout.add_widget(catalog_btn)
         mods_section.add_widget(mod_btn_layout)
+        job_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(40), spacing=dp(10))
+        self.mod_job_label = Factory.ThemedLabel(text="No mod operations running.", size_hint_x=0.4)
+        self.mod_job_progress = Factory.ThemedProgressBar(max=100, value=0, size_hint_x=0.2, size_hint_y=None, height=dp(20), pos_hint={'center_y': 0.5})
+        # Shown for UNDO_SECONDS after a removal, while the mod is still in the trash.
+        self.undo_btn = Factory.ThemedButton(text="Undo Remove", size_hint_x=0.2, opacity=0, disabled=True)
+        self.undo_btn.bind(on_press=self.undo_removal)
+        cancel_jobs_btn = Factory.DangerButton(text="Cancel", size_hint_x=0.2)
+        cancel_jobs_btn.bind(on_press=lambda x: self.jobs.cancel_all())
+        job_layout.add_widget(self.mod_job_label)
+        job_layout.add_widget(self.mod_job_progress)
+        job_layout.add_widget(self.undo_btn)
+        job_layout.add_widget(cancel_jobs_btn)
+        mods_section.add_widget(job_layout)
         installed_mods_header = Factory.SectionHeaderLabel(text="Installed Mods")
         mods_section.add_widget(installed_mods_header)
-        mods_list_scroll = ScrollView(size_hint=(1, None), height=dp(150), do_scroll_x=False)
-        self.installed_mods_box = GridLayout(cols=1, spacing=dp(5), size_hint_y=None, padding=[0, 0, dp(10), 0])
-        self.installed_mods_box.bind(minimum_height=self.installed_mods_box.setter('height'))
-        mods_list_scroll.add_widget(self.installed_mods_box)
-        mods_section.add_widget(mods_list_scroll)
+        mods_search_layout = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(40), spacing=dp(10))
+        self.mods_search_input = Factory.ThemedInput(hint_text="Search by name, author or tag", multiline=False)
+        self.mods_search_input.bind(text=self.apply_mods_filter)
+        self.mods_sort_spinner = Factory.ThemedSpinner(text="Name", values=list(MOD_SORTS), size_hint_x=0.3)
+        self.mods_sort_spinner.bind(text=self.apply_mods_filter)
+        mods_search_layout.add_widget(self.mods_search_input)
+        mods_search_layout.add_widget(self.mods_sort_spinner)
+        mods_section.add_widget(mods_search_layout)
+        self.installed_mods_view = make_mods_view()
+        mods_section.add_widget(self.installed_mods_view)
         content_layout.add_widget(mods_section)
 
         scroll_view.add_widget(content_layout)
@@ -400,30 +438,67 @@ class BalatroManagerApp(App):
         footer.add_widget(footer_label)
         main_layout.add_widget(footer)
 
-        # Bind changes so config is saved automatically.
+        # Fill the fields from the saved config first, then save on every change;
+        # the store coalesces those edits into one write once typing settles.
+        self.config_store = ConfigStore(self.config_path())
+        self.load_config()
         self.target_dll_input.bind(text=lambda inst, value: self.save_config())
         self.mod_target_input.bind(text=lambda inst, value: self.save_config())
         self.mod_path_input.bind(text=lambda inst, value: self.save_config())
 
-        self.load_config()
+        # The mod scan and Lovely status check touch the (possibly slow) target
+        # directories, so they run in the background once the first frame is up.
+        self._mods_scan_id = 0
+        self._lovely_check_id = 0
+        self.mod_index = None
+        self.mods_watcher = None
+        self.refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refresh")
+        self.mods_search = None
+        self.mods_rows = {}
+        self.mods_error = None
+        self._showing_profiles = False
+        self.last_removal = None
+        # Mod installs and removals run on worker threads; updates come back through the Clock.
+        self.jobs = JobScheduler(workers=MOD_JOB_WORKERS,
+                                 on_update=lambda job: Clock.schedule_once(lambda dt: self.on_job_update(job), 0))
+        trace.subscribe(self.on_trace)
+        Window.bind(on_flip=self.on_first_frame)
+        return main_layout
+
+    def on_stop(self):
+        trace.unsubscribe(self.on_trace)
+        self.config_store.flush()
+        self.refresh_pool.shutdown(wait=False, cancel_futures=True)
+        if self.mods_watcher is not None:
+            self.mods_watcher.stop()
+        self.jobs.shutdown(wait=True, cancel=True)
+        trace.close()
+
+    def on_first_frame(self, *args):
+        Window.unbind(on_flip=self.on_first_frame)
+        Logger.info("Startup: time to first frame %.0f ms", (time.perf_counter() - STARTUP_TIME) * 1000)
+        threading.Thread(target=core.cleanup_staging, args=(self.clean_path(self.mod_target_input.text),), daemon=True).start()
         self.refresh_mods_list()
+        self.refresh_mod_profiles()
         self.update_lovely_status()
-        return main_layout
 
     # ----- Helper to remove surrounding quotes.
     def clean_path(self, path):
-        return path.strip().strip('"').strip("'")
+        return core.clean_path(path)
 
     # ----- Paste Functions -----
     def paste_target_dll(self, instance):
+        from kivy.core.clipboard import Clipboard
         text = Clipboard.paste()
         clean = text.strip().strip('"').strip("'")
         self.target_dll_input.text = f'"{clean}"'
     def paste_mod_target(self, instance):
+        from kivy.core.clipboard import Clipboard
         text = Clipboard.paste()
         clean = text.strip().strip('"').strip("'")
         self.mod_target_input.text = f'"{clean}"'
     def paste_mod_path(self, instance):
+        from kivy.core.clipboard import Clipboard
         text = Clipboard.paste()
         clean = text.strip().strip('"').strip("'")
         self.mod_path_input.text = f'"{clean}"'
@@ -447,6 +522,7 @@ class BalatroManagerApp(App):
 
     # ----- Browse Callbacks -----
     def browse_target_dll(self, instance):
+        from popups import DirectoryChooserPopup
         popup = DirectoryChooserPopup(select_callback=self.set_target_dll)
         popup.open()
     def set_target_dll(self, path):
@@ -455,6 +531,7 @@ class BalatroManagerApp(App):
         self.save_config()
         self.update_lovely_status()
     def browse_mod_target(self, instance):
+        from popups import DirectoryChooserPopup
         popup = DirectoryChooserPopup(select_callback=self.set_mod_target)
         popup.open()
     def set_mod_target(self, path):
@@ -462,106 +539,69 @@ class BalatroManagerApp(App):
         self.mod_target_input.text = f'"{clean}"'
         self.save_config()
         self.refresh_mods_list()
+        self.refresh_mod_profiles()
     def browse_mod(self, instance):
+        from popups import FileChooserPopup
         popup = FileChooserPopup(select_callback=self.set_mod_path)
         popup.open()
     def set_mod_path(self, path):
         clean = path.strip().strip('"').strip("'")
         self.mod_path_input.text = f'"{clean}"'
+    def open_lovely_log(self, instance):
+        from popups import LogViewerPopup
+        popup = LogViewerPopup(self.clean_path(self.mod_target_input.text))
+        popup.open()
 
     # ----- Config: Load/Save paths -----
     def config_path(self):
-        return os.path.join(os.getcwd(), "config.json")
+        return core.config_path()
     def load_config(self):
-        try:
-            with open(self.config_path(), "r") as f:
-                data = json.load(f)
-            if "target_dll" in data:
-                self.target_dll_input.text = f'"{data["target_dll"]}"'
-            if "mod_target" in data:
-                self.mod_target_input.text = f'"{data["mod_target"]}"'
-            if "last_mod_path" in data:
-                self.mod_path_input.text = f'"{data["last_mod_path"]}"'
-        except Exception:
-            pass
+        # Kivy's App.run() calls load_config() too, before build(); there is nothing to
+        # fill in yet at that point. (App.config is Kivy's own, hence config_store.)
+        if getattr(self, "config_store", None) is None:
+            return None
+        data = self.config_store.load()
+        if "target_dll" in data:
+            self.target_dll_input.text = f'"{data["target_dll"]}"'
+        if "mod_target" in data:
+            self.mod_target_input.text = f'"{data["mod_target"]}"'
+        if "last_mod_path" in data:
+            self.mod_path_input.text = f'"{data["last_mod_path"]}"'
+        self.catalog_url = data.get("catalog_url", "")
     def save_config(self):
         data = {
             "target_dll": self.clean_path(self.target_dll_input.text),
             "mod_target": self.clean_path(self.mod_target_input.text),
             "last_mod_path": self.clean_path(self.mod_path_input.text)
         }
-        try:
-            with open(self.config_path(), "w") as f:
-                json.dump(data, f, indent=4)
-        except Exception as e:
-            print("Error saving config:", e)
+        if self.catalog_url:
+            data["catalog_url"] = self.catalog_url
+        self.config_store.update(data)
 
     # ----- Launch Balatro -----
     def launch_balatro(self, instance):
-        target_dir = self.clean_path(self.target_dll_input.text)
-        if platform.system() == "Windows":
-            exe_name = "balatro.exe"
-        else:
-            exe_name = "balatro"
-        exe_path = os.path.join(target_dir, exe_name)
-        if os.path.isfile(exe_path):
-            try:
-                subprocess.Popen([exe_path])
-            except Exception as e:
-                self.show_notification("Failed to launch Balatro: " + str(e))
-        else:
-            self.show_notification("Balatro executable not found in target directory.")
+        try:
+            core.launch_balatro(self.clean_path(self.target_dll_input.text))
+        except core.ManagerError as e:
+            self.show_notification(str(e))
 
     # ----- Download Lovely in a separate thread -----
     def start_download_lovely(self, instance):
         self.lovely_progress.value = 0
         threading.Thread(target=self.download_lovely_thread, daemon=True).start()
     def download_lovely_thread(self):
-        release = self.release_spinner.text
-        url = RELEASE_URLS.get(release)
-        if not url:
-            Clock.schedule_once(lambda dt: self.update_lovely_status("Invalid release selection."), 0)
-            return
+        release, version = self.release_spinner.text, self.version_spinner.text
         Clock.schedule_once(lambda dt: self.update_lovely_status("Downloading archive...", (0.25, 0.5, 0.8, 1)), 0)
+        progress = lambda p: Clock.schedule_once(lambda dt: self.update_progress(p), 0)
         try:
-            r = requests.get(url, stream=True)
-            r.raise_for_status()
-            total_length = r.headers.get('content-length')
-            total_length = int(total_length) if total_length else 0
-            temp_file = tempfile.NamedTemporaryFile(delete=False)
-            downloaded = 0
-            chunk_size = 8192
-            for chunk in r.iter_content(chunk_size=chunk_size):
-                if chunk:
-                    temp_file.write(chunk)
-                    downloaded += len(chunk)
-                    if total_length:
-                        percent = int(downloaded / total_length * 100)
-                        Clock.schedule_once(lambda dt, p=percent: self.update_progress(p), 0)
-            temp_file.close()
-            archive_path = temp_file.name
-        except Exception as e:
-            Clock.schedule_once(lambda dt: self.update_lovely_status("Download error: " + str(e), (0.8, 0.3, 0.3, 1)), 0)
+            manifest = lovely.fetch(release, version, progress, PROGRESS_UPDATES_PER_SECOND)
+        except core.ManagerError as e:
+            Clock.schedule_once(lambda dt, msg=str(e): self.update_lovely_status(msg, (0.8, 0.3, 0.3, 1)), 0)
             return
-        Clock.schedule_once(lambda dt: self.update_lovely_status("Extracting archive...", (0.25, 0.5, 0.8, 1)), 0)
-        lovely_folder = os.path.join(os.getcwd(), "lovely")
-        if os.path.exists(lovely_folder):
-            shutil.rmtree(lovely_folder)
-        os.makedirs(lovely_folder, exist_ok=True)
-        success = self.extract_archive(archive_path, lovely_folder, url)
-        os.remove(archive_path)
-        if success:
-            found = False
-            for root_dir, dirs, files in os.walk(lovely_folder):
-                if any(f.lower() == "version.dll" for f in files):
-                    found = True
-                    break
-            if found:
-                Clock.schedule_once(lambda dt: self.update_lovely_status("Lovely downloaded and extracted successfully.", (0.3, 0.8, 0.3, 1)), 0)
-            else:
-                Clock.schedule_once(lambda dt: self.update_lovely_status("Extraction complete, but version.dll not found.", (0.8, 0.6, 0.3, 1)), 0)
+        if manifest.get("dll"):
+            Clock.schedule_once(lambda dt: self.update_lovely_status(f"Lovely {version} downloaded and extracted successfully.", (0.3, 0.8, 0.3, 1)), 0)
         else:
-            Clock.schedule_once(lambda dt: self.update_lovely_status("Extraction failed.", (0.8, 0.3, 0.3, 1)), 0)
+            Clock.schedule_once(lambda dt: self.update_lovely_status("Extraction complete, but version.dll not found.", (0.8, 0.6, 0.3, 1)), 0)
 
     def update_progress(self, value):
         self.lovely_progress.value = value
@@ -570,168 +610,317 @@ class BalatroManagerApp(App):
         if color is None:
             color = (0.9, 0.7, 0.3, 1)
         if message:
+            self._lovely_check_id += 1
             self.lovely_status_label.text = f"Lovely Status: {message}"
             self.lovely_status_label.color = color
-        else:
-            target_dir = self.clean_path(self.target_dll_input.text)
-            target_dll_path = os.path.join(target_dir, "version.dll")
-            if os.path.isfile(target_dll_path):
-                self.lovely_status_label.text = "Lovely Status: Installed"
-                self.lovely_status_label.color = (0.3, 0.8, 0.3, 1)
-            else:
-                self.lovely_status_label.text = "Lovely Status: Not Installed"
-                self.lovely_status_label.color = (0.9, 0.7, 0.3, 1)
-
-    def extract_archive(self, archive_path, target_folder, url):
-        try:
-            if "zip" in url:
-                with zipfile.ZipFile(archive_path, 'r') as zf:
-                    zf.extractall(target_folder)
-            elif "tar.gz" in url:
-                with tarfile.open(archive_path, 'r:gz') as tar:
-                    tar.extractall(target_folder)
-            else:
-                self.update_lovely_status("Unsupported archive format.", (0.8, 0.3, 0.3, 1))
-                return False
-            return True
-        except Exception as e:
-            self.update_lovely_status("Extraction error: " + str(e), (0.8, 0.3, 0.3, 1))
-            return False
-
-    def install_lovely(self, instance):
-        lovely_folder = os.path.join(os.getcwd(), "lovely")
-        if not os.path.exists(lovely_folder):
-            self.update_lovely_status("Lovely not downloaded.", (0.8, 0.3, 0.3, 1))
-            return
-        version_dll_source = None
-        for root_dir, dirs, files in os.walk(lovely_folder):
-            for file in files:
-                if file.lower() == "version.dll":
-                    version_dll_source = os.path.join(root_dir, file)
-                    break
-            if version_dll_source:
-                break
-        if not version_dll_source:
-            self.update_lovely_status("version.dll not found in downloaded files.", (0.8, 0.3, 0.3, 1))
             return
+        # The file check may hit a slow or network-mounted directory, so run it off the UI thread.
+        self._lovely_check_id += 1
+        check_id = self._lovely_check_id
         target_dir = self.clean_path(self.target_dll_input.text)
-        if not os.path.isdir(target_dir):
-            self.update_lovely_status("Invalid target DLL directory.", (0.8, 0.3, 0.3, 1))
+        def check():
+            # Hashes are cached by size and mtime, so this is normally a stat or two.
+            installed = lovely.installed_version(target_dir)
+            Clock.schedule_once(lambda dt: self.apply_lovely_status(check_id, installed), 0)
+        threading.Thread(target=check, daemon=True).start()
+
+    def apply_lovely_status(self, check_id, installed):
+        if check_id != self._lovely_check_id:
             return
-        target_dll_path = os.path.join(target_dir, "version.dll")
+        if installed:
+            version = "unknown version" if installed[0] == "unknown" else f"v{installed[0]}"
+            self.lovely_status_label.text = f"Lovely Status: Installed ({version})"
+            self.lovely_status_label.color = (0.3, 0.8, 0.3, 1)
+        else:
+            self.lovely_status_label.text = "Lovely Status: Not Installed"
+            self.lovely_status_label.color = (0.9, 0.7, 0.3, 1)
+
+    def install_lovely(self, instance):
+        version = self.version_spinner.text
         try:
-            shutil.copy(version_dll_source, target_dll_path)
-            self.update_lovely_status("Installation complete!", (0.3, 0.8, 0.3, 1))
-        except Exception as e:
-            self.update_lovely_status("Failed to install Lovely: " + str(e), (0.8, 0.3, 0.3, 1))
+            if lovely.install(self.clean_path(self.target_dll_input.text), self.release_spinner.text, version):
+                self.update_lovely_status(f"Lovely {version} installed.", (0.3, 0.8, 0.3, 1))
+            else:
+                self.update_lovely_status(f"Lovely {version} is already installed.", (0.3, 0.8, 0.3, 1))
+        except core.ManagerError as e:
+            self.update_lovely_status(str(e), (0.8, 0.3, 0.3, 1))
 
     def uninstall_lovely(self, instance):
-        target_dir = self.clean_path(self.target_dll_input.text)
-        mod_dir = self.clean_path(self.mod_target_input.text)
-        target_dll_path = os.path.join(target_dir, "version.dll")
-        lovely_dir_path = os.path.join(mod_dir, "lovely")
-        errors = []
-        if os.path.isfile(target_dll_path):
-            try:
-                os.remove(target_dll_path)
-            except Exception as e:
-                errors.append(str(e))
-        if os.path.isdir(lovely_dir_path):
-            try:
-                shutil.rmtree(lovely_dir_path)
-            except Exception as e:
-                errors.append(str(e))
-        if errors:
-            self.update_lovely_status("Uninstall failed: " + ", ".join(errors), (0.8, 0.3, 0.3, 1))
-        else:
+        try:
+            core.uninstall_lovely(self.clean_path(self.target_dll_input.text),
+                                  self.clean_path(self.mod_target_input.text))
             self.update_lovely_status("Lovely successfully uninstalled.", (0.3, 0.7, 0.9, 1))
-
-    def flatten_mod_directory(self, mod_dir, target_parent):
-        if not os.path.exists(mod_dir):
-            return
-        items = os.listdir(mod_dir)
-        if items and all(os.path.isdir(os.path.join(mod_dir, item)) for item in items):
-            for item in items:
-                src = os.path.join(mod_dir, item)
-                dst = os.path.join(target_parent, item)
-                try:
-                    shutil.move(src, dst)
-                except Exception as e:
-                    print(f"Error moving {src} to {dst}: {e}")
-            shutil.rmtree(mod_dir)
+        except core.ManagerError as e:
+            self.update_lovely_status(str(e), (0.8, 0.3, 0.3, 1))
 
     def install_mod(self, instance):
         mod_path = self.clean_path(self.mod_path_input.text)
         mod_target = self.clean_path(self.mod_target_input.text)
-        if not os.path.exists(mod_target):
-            os.makedirs(mod_target)
         if not mod_path or not os.path.exists(mod_path):
             self.show_notification("Invalid mod selection.")
             return
-        if os.path.isfile(mod_path) and mod_path.lower().endswith(".zip"):
-            mod_name = os.path.splitext(os.path.basename(mod_path))[0]
-            dest_dir = os.path.join(mod_target, mod_name)
-            try:
-                with zipfile.ZipFile(mod_path, 'r') as zf:
-                    zf.extractall(dest_dir)
-                self.flatten_mod_directory(dest_dir, mod_target)
-                self.show_notification(f"Mod '{mod_name}' installed from ZIP.", True)
-            except Exception as e:
-                self.show_notification(f"Failed to extract mod ZIP: {e}", False)
-                return
-        elif os.path.isdir(mod_path):
-            mod_name = os.path.basename(mod_path.rstrip(os.sep))
-            dest_dir = os.path.join(mod_target, mod_name)
-            try:
-                if os.path.exists(dest_dir):
-                    shutil.rmtree(dest_dir)
-                shutil.copytree(mod_path, dest_dir)
-                self.flatten_mod_directory(dest_dir, mod_target)
-                self.show_notification(f"Mod '{mod_name}' installed from folder.", True)
-            except Exception as e:
-                self.show_notification(f"Failed to copy mod folder: {e}", False)
-                return
-        else:
-            self.show_notification("Invalid mod selection.")
+        if batch.is_mod_collection(mod_path):
+            # A folder of mod archives: install everything in it as one batch.
+            def run(job):
+                return batch.install_mods([mod_path], mod_target, progress=job.report, cancel=job.cancel_event).summary()
+            # Holds every mod directory the batch writes, so none of them can be removed meanwhile.
+            self.jobs.submit(f"Installing mods from '{os.path.basename(mod_path)}'",
+                             batch.install_keys([mod_path], mod_target), run)
             return
-        self.refresh_mods_list()
+        mod_name = core.mod_name_for(mod_path)
+        # Keyed by the directories the install writes (a ZIP named MyMod-1.2 may install MyMod).
+        self.jobs.submit(f"Installing '{mod_name}'", batch.install_keys([mod_path], mod_target),
+                         lambda job: core.install_mod(mod_path, mod_target, job.report, job.cancel_event))
+
+    def open_catalog(self, instance):
+        from popups import CatalogPopup
+        CatalogPopup(self.catalog_url, self.install_catalog_mod, self.set_catalog_url).open()
+
+    def set_catalog_url(self, url):
+        if url != self.catalog_url:
+            self.catalog_url = url
+            self.save_config()
+
+    def install_catalog_mod(self, catalog, mod):
+        # Which directories the archive installs into is only known once it has been
+        # downloaded, so the download is one job and the install, keyed by those
+        # directories like any other install, is a second one.
+        mod_target = self.clean_path(self.mod_target_input.text)
+        def download(job):
+            path = catalog.download(mod["dir"], lambda percent: job.report(percent, 100), job.cancel_event)
+            def run(install_job):
+                from balatro_manager.catalog import discard_download
+                try:
+                    return core.install_mod(path, mod_target, install_job.report, install_job.cancel_event)
+                finally:
+                    discard_download(path)
+            self.jobs.submit(f"Installing '{mod['name']}'", batch.install_keys([path], mod_target), run)
+            return f"Downloaded '{mod['name']}'."
+        self.jobs.submit(f"Downloading '{mod['name']}' from the catalog", "catalog:" + mod["dir"], download)
 
     def uninstall_mod(self, mod_name):
         mod_target = self.clean_path(self.mod_target_input.text)
-        mod_dir = os.path.join(mod_target, mod_name)
-        if os.path.isdir(mod_dir):
-            try:
-                shutil.rmtree(mod_dir)
-                self.show_notification(f"Mod '{mod_name}' uninstalled.", True)
-            except Exception as e:
-                self.show_notification(f"Failed to uninstall mod '{mod_name}': {e}", False)
+        def run(job):
+            entry_id = core.uninstall_mod(mod_name, mod_target, job.report, job.cancel_event, undo_seconds=UNDO_SECONDS)
+            if entry_id:
+                Clock.schedule_once(lambda dt: self.offer_undo(mod_target, entry_id, mod_name), 0)
+            return f"Mod '{mod_name}' uninstalled."
+        self.jobs.submit(f"Removing '{mod_name}'", mod_key(mod_target, mod_name), run)
+
+    def offer_undo(self, mod_target, entry_id, mod_name):
+        removal = (mod_target, entry_id, mod_name)
+        self.last_removal = removal
+        self.undo_btn.text = f"Undo: {mod_name}"
+        self.undo_btn.opacity, self.undo_btn.disabled = 1, False
+        Clock.schedule_once(lambda dt: self.hide_undo(removal), UNDO_SECONDS)
+
+    def hide_undo(self, removal=None):
+        if removal is None or removal == self.last_removal:
+            self.last_removal = None
+            self.undo_btn.opacity, self.undo_btn.disabled = 0, True
+
+    def undo_removal(self, instance):
+        if self.last_removal is None:
+            return
+        mod_target, entry_id, mod_name = self.last_removal
+        self.hide_undo()
+        try:
+            Trash.beside(mod_target).restore(entry_id)
+        except core.ManagerError as e:
+            self.show_notification(str(e))
         else:
-            self.show_notification("Mod not found.")
+            self.show_notification(f"Mod '{mod_name}' restored.", True)
         self.refresh_mods_list()
 
+    def on_job_update(self, job):
+        if job.state == DONE:
+            self.show_notification(job.result, True)
+            self.refresh_mods_list()
+        elif job.state == FAILED:
+            self.show_notification(str(job.error), False)
+            self.refresh_mods_list()
+        elif job.state == CANCELLED:
+            self.show_notification(f"{job.description} cancelled.")
+            self.refresh_mods_list()
+        active = self.jobs.active()
+        if not active:
+            self.mod_job_label.text = "No mod operations running."
+            self.mod_job_progress.value = 0
+            return
+        current = active[0]
+        queued = f" (+{len(active) - 1} more)" if len(active) > 1 else ""
+        self.mod_job_label.text = f"{current.description}: {current.progress}%{queued}"
+        self.mod_job_progress.value = current.progress
+
+    # ----- Mod profiles -----
+    def refresh_mod_profiles(self):
+        # Listed on the refresh pool, like the mods themselves.
+        mod_target = self.clean_path(self.mod_target_input.text)
+        def read():
+            try:
+                profiles = ModProfiles(mod_target)
+                names, active = profiles.names(), profiles.active()
+            except (core.ManagerError, OSError) as e:
+                Logger.warning("Mods: listing mod profiles failed: %s", e)
+                return
+            Clock.schedule_once(lambda dt: self.show_mod_profiles(names, active), 0)
+        self.refresh_pool.submit(read)
+
+    def show_mod_profiles(self, names, active):
+        self._showing_profiles = True
+        try:
+            self.mod_profile_spinner.values = names
+            self.mod_profile_spinner.text = active
+        finally:
+            self._showing_profiles = False
+
+    def switch_mod_profile(self, spinner, name):
+        if self._showing_profiles:
+            return
+        profiles = ModProfiles(self.clean_path(self.mod_target_input.text))
+        if name == profiles.active():
+            return
+        if self.jobs.active():
+            self.show_notification("Wait for the running mod operations to finish first.")
+        else:
+            try:
+                # Two directory renames, so this is instant whatever the modpack size.
+                profiles.switch(name)
+                self.show_notification(f"Switched to profile '{name}'.", True)
+            except core.ManagerError as e:
+                self.show_notification(str(e))
+            # The Mods folder now holds a different set of mods; start from its own index.
+            self.mod_index = None
+            self.refresh_mods_list()
+            self.update_lovely_status()
+        self.refresh_mod_profiles()
+
+    def create_mod_profile(self, instance):
+        name = self.new_profile_input.text.strip()
+        try:
+            ModProfiles(self.clean_path(self.mod_target_input.text)).create(name)
+        except (core.ManagerError, OSError) as e:
+            self.show_notification(str(e))
+            return
+        self.new_profile_input.text = ""
+        self.refresh_mod_profiles()
+        self.show_notification(f"Profile '{name}' created.", True)
+
     def refresh_mods_list(self):
-        self.installed_mods_box.clear_widgets()
+        # Everything that touches the disk (loading the index, setting up the watcher,
+        # the scan itself) runs on the refresh pool. It has a single worker, so refreshes
+        # never overlap, and only the newest one is allowed to repopulate the list.
+        self._mods_scan_id += 1
+        scan_id = self._mods_scan_id
         mod_target = self.clean_path(self.mod_target_input.text)
-        if os.path.isdir(mod_target):
-            for item in os.listdir(mod_target):
-                item_path = os.path.join(mod_target, item)
-                if os.path.isdir(item_path):
-                    mod_card = BoxLayout(orientation='horizontal', size_hint_y=None, height=dp(50), spacing=dp(10))
-                    mod_label = Factory.ThemedLabel(text=item, size_hint_x=0.7)
-                    remove_btn = Factory.DangerButton(text="Remove", size_hint_x=0.3)
-                    remove_btn.bind(on_press=lambda instance, mod=item: self.uninstall_mod(mod))
-                    mod_card.add_widget(mod_label)
-                    mod_card.add_widget(remove_btn)
-                    self.installed_mods_box.add_widget(mod_card)
+        def publish(mods, error=None):
+            # The search index and row texts are built here so typing in the search box
+            # only has to pick rows out of them.
+            search, rows = ModSearch(mods), {row['mod_dir']: row for row in mods_view_data(mods)}
+            Clock.schedule_once(lambda dt: self.populate_mods_list(scan_id, search, rows, error), 0)
+        def scan():
+            if scan_id != self._mods_scan_id:
+                # A newer refresh is queued behind this one.
+                return
+            mod_index = self.mod_index
+            if mod_index is None or mod_index.mod_target != mod_target:
+                mod_index = self.mod_index = ModIndex(mod_target)
+                self.watch_mods_folder(mod_target)
+            try:
+                (mods, changed), error = mod_index.refresh(sizes=False), None
+            except core.ManagerError as e:
+                mods, error = [], str(e)
+            publish(mods, error)
+            if error or not mod_index.unsized():
+                return
+            # New and changed mods are walked on the disk-usage thread pool; their
+            # running totals stream into the list until the walk is done.
+            partial = lambda totals: Clock.schedule_once(lambda dt: self.update_mod_sizes(scan_id, totals), 0)
+            try:
+                publish(mod_index.update_usage(on_update=partial))
+            except (core.ManagerError, OSError) as e:
+                Logger.warning("Mods: disk usage scan failed: %s", e)
+        def run():
+            try:
+                scan()
+            except Exception:
+                Logger.exception("Mods: refresh failed")
+        self.refresh_pool.submit(run)
+
+    def watch_mods_folder(self, mod_target):
+        # Runs on the refresh pool: setting up inotify walks the folder tree. Changes made
+        # by other tools or by the game arrive already coalesced, so a burst of file
+        # events costs one incremental refresh.
+        if self.mods_watcher is not None:
+            self.mods_watcher.stop()
+        self.mods_watcher = ModsWatcher(
+            mod_target, lambda names: Clock.schedule_once(lambda dt: self.on_mods_changed(mod_target, names), 0)).start()
+
+    def on_mods_changed(self, mod_target, names):
+        if self.mod_index is None or self.mod_index.mod_target != mod_target:
+            return
+        # The index only notices mods whose directory mtime moved; forget the ones
+        # the watcher saw change so edits deeper inside a mod are picked up too.
+        for name in (names if names is not None else [None]):
+            self.mod_index.invalidate(name)
+        self.refresh_mods_list()
+
+    def populate_mods_list(self, scan_id, search, rows, error=None):
+        if scan_id != self._mods_scan_id:
+            return
+        self.mods_search, self.mods_rows, self.mods_error = search, rows, error
+        self.apply_mods_filter()
+
+    def update_mod_sizes(self, scan_id, totals):
+        if scan_id != self._mods_scan_id or self.mods_search is None:
+            return
+        mods = {mod["dir"]: mod for mod in self.mods_search.mods}
+        for name, total in totals.items():
+            if name in mods and name in self.mods_rows:
+                mod = dict(mods[name], size=total["size"], files=total["files"])
+                self.mods_rows[name] = {'text': mod_label_text(mod, sizing=not total["done"]), 'mod_dir': name}
+        self.apply_mods_filter()
+
+    def apply_mods_filter(self, *args):
+        if self.mods_error:
+            data = [{'text': self.mods_error, 'mod_dir': ''}]
+        elif self.mods_search is None:
+            return
+        else:
+            mods = self.mods_search.search(self.mods_search_input.text, MOD_SORTS[self.mods_sort_spinner.text])
+            data = [self.mods_rows[mod["dir"]] for mod in mods]
+            if not data and self.mods_search.mods:
+                data = [{'text': "No mods match the search.", 'mod_dir': ''}]
+        # Rows are recycled, so only an actual change in the data costs any widget work.
+        if data != self.installed_mods_view.data:
+            self.installed_mods_view.data = data
+
+    # ----- Performance panel -----
+    def toggle_perf_panel(self, instance):
+        self.perf_visible = not self.perf_visible
+        if self.perf_visible:
+            # Just below the status bar.
+            self.main_layout.add_widget(self.perf_panel, index=len(self.main_layout.children) - 2)
+            self.update_perf_panel()
         else:
-            self.installed_mods_box.add_widget(Factory.ThemedLabel(text="Mods target directory not found."))
+            self.main_layout.remove_widget(self.perf_panel)
+
+    def on_trace(self, record):
+        # Called on whichever thread finished the span.
+        if self.perf_visible:
+            Clock.schedule_once(lambda dt: self._perf_trigger(), 0)
+
+    def update_perf_panel(self, *args):
+        if self.perf_visible:
+            self.perf_label.text = trace.format_summary(trace.summary())
 
     def show_notification(self, message, success=False):
+        from kivy.uix.popup import Popup
         popup = Popup(
             title="Notification",
             content=Factory.ThemedLabel(text=message),
             size_hint=(None, None),
-            size=(dp(300), dp(150))
+            size=(dp(300), dp(150) + dp(20) * message.count("\n"))
         )
         popup.open()
         Clock.schedule_once(lambda dt: popup.dismiss(), 2)
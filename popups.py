@@ -0,0 +1,360 @@
+import os
+import threading
+
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.popup import Popup
+from kivy.uix.filechooser import FileChooserListView
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.metrics import dp
+from kivy.factory import Factory
+from kivy.clock import Clock
+from kivy.lang import Builder
+
+from balatro_manager.core import ManagerError
+from balatro_manager.logtail import LogTail, compile_filter, next_error
+
+# ----- Custom File Chooser -----
+class CustomFileChooser(FileChooserListView):
+    def __init__(self, **kwargs):
+        super(CustomFileChooser, self).__init__(**kwargs)
+    def on_touch_up(self, touch):
+        if touch.grab_current is not self:
+            return super(CustomFileChooser, self).on_touch_up(touch)
+        touch.ungrab(self)
+        if self.collide_point(*touch.pos):
+            return True
+        return super(CustomFileChooser, self).on_touch_up(touch)
+
+# ----- Directory Chooser Popup -----
+class DirectoryChooserPopup(Popup):
+    def __init__(self, select_callback, **kwargs):
+        super().__init__(**kwargs)
+        self.title = "Select Directory"
+        self.size_hint = (0.9, 0.9)
+        self.select_callback = select_callback
+        self.background_color = (0.15, 0.15, 0.2, 1)
+        self.title_color = (1, 1, 1, 1)
+        box = BoxLayout(orientation="vertical", spacing=dp(10))
+        self.filechooser = CustomFileChooser(path='.', filters=[])
+        box.add_widget(self.filechooser)
+        btn_layout = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10), padding=[0, dp(10), 0, 0])
+        select_btn = Factory.ThemedButton(text="Select")
+        select_btn.bind(on_press=self.select_dir)
+        cancel_btn = Factory.ThemedButton(text="Cancel")
+        cancel_btn.bind(on_press=self.dismiss)
+        btn_layout.add_widget(select_btn)
+        btn_layout.add_widget(cancel_btn)
+        box.add_widget(btn_layout)
+        self.add_widget(box)
+    def select_dir(self, instance):
+        if self.filechooser.selection:
+            selected_path = self.filechooser.selection[0]
+            if os.path.isdir(selected_path):
+                self.select_callback(selected_path)
+                self.dismiss()
+
+# ----- File Chooser Popup -----
+class FileChooserPopup(Popup):
+    def __init__(self, select_callback, filters=None, **kwargs):
+        super().__init__(**kwargs)
+        self.title = "Select File"
+        self.size_hint = (0.9, 0.9)
+        self.select_callback = select_callback
+        self.background_color = (0.15, 0.15, 0.2, 1)
+        self.title_color = (1, 1, 1, 1)
+        box = BoxLayout(orientation="vertical", spacing=dp(10))
+        self.filechooser = CustomFileChooser(filters=filters if filters else [])
+        box.add_widget(self.filechooser)
+        btn_layout = BoxLayout(size_hint_y=None, height=dp(50), spacing=dp(10), padding=[0, dp(10), 0, 0])
+        select_btn = Factory.ThemedButton(text="Select")
+        select_btn.bind(on_press=self.select_file)
+        cancel_btn = Factory.ThemedButton(text="Cancel")
+        cancel_btn.bind(on_press=self.dismiss)
+        btn_layout.add_widget(select_btn)
+        btn_layout.add_widget(cancel_btn)
+        box.add_widget(btn_layout)
+        self.add_widget(box)
+    def select_file(self, instance):
+        if self.filechooser.selection:
+            selected_path = self.filechooser.selection[0]
+            self.select_callback(selected_path)
+            self.dismiss()
+
+# ----- Lovely Log Viewer Popup -----
+Builder.load_string('''
+<LogLine@Label>:
+    color: 0.85, 0.85, 0.85, 1
+    font_size: '12sp'
+    halign: 'left'
+    valign: 'middle'
+    text_size: self.width, None
+    shorten: True
+    shorten_from: 'right'
+''')
+
+# How often the log is checked for appended lines while the viewer is open.
+LOG_POLL_INTERVAL = 0.5
+ERROR_COLOR = (1, 0.45, 0.45, 1)
+LINE_COLOR = (0.85, 0.85, 0.85, 1)
+
+class LogViewerPopup(Popup):
+    # Follows the newest Lovely log while the game runs. The file is read on a
+    # background thread (only appended bytes, see logtail), and the list is a
+    # RecycleView, so only the lines on screen have widgets however long the log gets.
+    def __init__(self, mod_target, **kwargs):
+        super().__init__(**kwargs)
+        self.title = "Lovely Log"
+        self.size_hint = (0.95, 0.95)
+        self.background_color = (0.15, 0.15, 0.2, 1)
+        self.title_color = (1, 1, 1, 1)
+        self.tail = LogTail(mod_target)
+        self.pattern = None
+        self.visible = []
+        self.error_index = -1
+        self.following = True
+        box = BoxLayout(orientation="vertical", spacing=dp(10))
+        tools = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(10))
+        self.filter_input = Factory.ThemedInput(hint_text="Filter (regular expression)", multiline=False, size_hint_x=0.5)
+        self.filter_input.bind(text=self.set_filter)
+        errors_btn = Factory.DangerButton(text="Next Error", size_hint_x=0.25)
+        errors_btn.bind(on_press=self.jump_to_error)
+        self.follow_btn = Factory.ThemedButton(text="Following", size_hint_x=0.25)
+        self.follow_btn.bind(on_press=self.toggle_follow)
+        tools.add_widget(self.filter_input)
+        tools.add_widget(errors_btn)
+        tools.add_widget(self.follow_btn)
+        box.add_widget(tools)
+        self.view = RecycleView(do_scroll_x=False)
+        rows = RecycleBoxLayout(orientation='vertical', default_size=(None, dp(20)), default_size_hint=(1, None),
+                                size_hint_y=None)
+        rows.bind(minimum_height=rows.setter('height'))
+        self.view.add_widget(rows)
+        self.view.viewclass = 'LogLine'
+        box.add_widget(self.view)
+        bottom = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(10))
+        self.status_label = Factory.ThemedLabel(text="Looking for a Lovely log...", size_hint_x=0.75)
+        close_btn = Factory.ThemedButton(text="Close", size_hint_x=0.25)
+        close_btn.bind(on_press=self.dismiss)
+        bottom.add_widget(self.status_label)
+        bottom.add_widget(close_btn)
+        box.add_widget(bottom)
+        self.add_widget(box)
+        self.stop_event = threading.Event()
+        self.bind(on_dismiss=lambda *args: self.stop_event.set())
+        threading.Thread(target=self.poll_log, daemon=True).start()
+
+    def poll_log(self):
+        while not self.stop_event.is_set():
+            added = self.tail.poll()
+            while self.tail.behind() and not self.stop_event.is_set():
+                added += self.tail.poll()
+            if added:
+                Clock.schedule_once(lambda dt: self.show_lines(), 0)
+            elif self.tail.path is None:
+                Clock.schedule_once(lambda dt: self.show_status(), 0)
+            self.stop_event.wait(LOG_POLL_INTERVAL)
+
+    def set_filter(self, instance, text):
+        try:
+            self.pattern = compile_filter(text)
+        except ManagerError as e:
+            self.status_label.text = str(e)
+            return
+        self.error_index = -1
+        self.show_lines()
+
+    def show_lines(self):
+        self.visible = self.tail.snapshot(self.pattern)
+        self.view.data = [{'text': text, 'color': ERROR_COLOR if is_error else LINE_COLOR}
+                          for number, text, is_error in self.visible]
+        if self.following:
+            self.view.scroll_y = 0
+        self.show_status()
+
+    def show_status(self):
+        if self.tail.path is None:
+            self.status_label.text = "No Lovely log yet; it appears once the game has started with Lovely."
+            return
+        self.status_label.text = (f"{os.path.basename(self.tail.path)}: {len(self.visible)} lines shown, "
+                                  f"{self.tail.error_count} errors")
+
+    def toggle_follow(self, instance):
+        self.following = not self.following
+        self.follow_btn.text = "Following" if self.following else "Paused"
+        if self.following:
+            self.show_lines()
+
+    def jump_to_error(self, instance):
+        index = next_error(self.visible, self.error_index)
+        if index is None:
+            self.status_label.text = "No errors in the lines shown."
+            return
+        self.error_index = index
+        # Stop following so new lines don't pull the view away from the error.
+        self.following = False
+        self.follow_btn.text = "Paused"
+        self.view.scroll_y = 1 - index / max(1, len(self.visible) - 1)
+        self.status_label.text = f"Error {sum(1 for line in self.visible[:index + 1] if line[2])} of " \
+                                 f"{sum(1 for line in self.visible if line[2])}: line {self.visible[index][0]}"
+
+# ----- Mod Catalog Popup -----
+Builder.load_string('''
+<CatalogRow@BoxLayout>:
+    text: ''
+    mod_id: ''
+    # Called with mod_id; every row's data carries it, so rows don't depend on the widget tree.
+    install: None
+    orientation: 'horizontal'
+    spacing: dp(10)
+    ThemedLabel:
+        text: root.text
+        size_hint_x: 0.75
+        shorten: True
+        shorten_from: 'right'
+    ThemedButton:
+        text: 'Install'
+        size_hint_x: 0.25
+        opacity: 1 if root.mod_id else 0
+        disabled: not root.mod_id
+        on_press: root.install(root.mod_id) if root.install else None
+''')
+
+# Catalog sort choices, mapped to ModSearch sort keys.
+CATALOG_SORTS = {"Name": "name", "Recently updated": "date", "Size": "size"}
+
+def catalog_row_text(mod):
+    text = mod["name"]
+    if mod["version"]:
+        text += f"  v{mod['version']}"
+    if mod["authors"]:
+        text += "  by " + ", ".join(mod["authors"])
+    details = mod["description"] or ", ".join(mod["tags"])
+    return text + ("\n" + details.splitlines()[0] if details else "")
+
+class CatalogPopup(Popup):
+    # Browses the remote mod catalog. The cached index is shown as soon as it is read
+    # from disk; a conditional refresh then runs in the background (when the cache is
+    # older than catalog.MAX_AGE, or on Refresh) and swaps the list in only if the
+    # index changed. Searching is in memory, so it works the same offline.
+    def __init__(self, url, on_install, on_url_change, **kwargs):
+        super().__init__(**kwargs)
+        self.title = "Mod Catalog"
+        self.size_hint = (0.95, 0.95)
+        self.background_color = (0.15, 0.15, 0.2, 1)
+        self.title_color = (1, 1, 1, 1)
+        self.on_install = on_install
+        self.on_url_change = on_url_change
+        self.catalog = None
+        self.rows = {}
+        self.load_id = 0
+        box = BoxLayout(orientation="vertical", spacing=dp(10))
+        source = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(10))
+        self.url_input = Factory.ThemedInput(text=url or "", hint_text="Catalog index URL (JSON)", multiline=False,
+                                             size_hint_x=0.75)
+        self.url_input.bind(on_text_validate=lambda instance: self.load(refresh=True))
+        refresh_btn = Factory.ThemedButton(text="Refresh", size_hint_x=0.25)
+        refresh_btn.bind(on_press=lambda instance: self.load(refresh=True))
+        source.add_widget(self.url_input)
+        source.add_widget(refresh_btn)
+        box.add_widget(source)
+        tools = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(10))
+        self.search_input = Factory.ThemedInput(hint_text="Search by name, author or tag", multiline=False)
+        self.search_input.bind(text=self.apply_filter)
+        self.sort_spinner = Factory.ThemedSpinner(text="Name", values=list(CATALOG_SORTS), size_hint_x=0.3)
+        self.sort_spinner.bind(text=self.apply_filter)
+        tools.add_widget(self.search_input)
+        tools.add_widget(self.sort_spinner)
+        box.add_widget(tools)
+        self.view = RecycleView(do_scroll_x=False)
+        rows = RecycleBoxLayout(orientation='vertical', default_size=(None, dp(50)), default_size_hint=(1, None),
+                                size_hint_y=None, spacing=dp(5), padding=[0, 0, dp(10), 0])
+        rows.bind(minimum_height=rows.setter('height'))
+        self.view.add_widget(rows)
+        self.view.viewclass = 'CatalogRow'
+        box.add_widget(self.view)
+        bottom = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(10))
+        self.status_label = Factory.ThemedLabel(text="", size_hint_x=0.75)
+        close_btn = Factory.ThemedButton(text="Close", size_hint_x=0.25)
+        close_btn.bind(on_press=self.dismiss)
+        bottom.add_widget(self.status_label)
+        bottom.add_widget(close_btn)
+        box.add_widget(bottom)
+        self.add_widget(box)
+        self.load()
+
+    def load(self, refresh=False):
+        # Reads the cached index, then revalidates it if asked to or if it is old.
+        # Only the newest load may update the list.
+        from balatro_manager.catalog import Catalog
+        url = self.url_input.text.strip()
+        self.load_id += 1
+        load_id = self.load_id
+        if not url:
+            self.status_label.text = "Enter the URL of a mod catalog index."
+            return
+        self.on_url_change(url)
+        self.status_label.text = "Loading catalog..."
+        def publish(catalog, changed, error=None):
+            rows = {mod["dir"]: {'text': catalog_row_text(mod), 'mod_id': mod["dir"], 'install': self.install}
+                    for mod in catalog.mods} if changed else None
+            if changed:
+                # Builds the search index here rather than on the first keystroke.
+                catalog.search()
+            Clock.schedule_once(lambda dt: self.show(load_id, catalog, rows, error), 0)
+        def run():
+            try:
+                catalog = Catalog(url)
+            except ManagerError as e:
+                Clock.schedule_once(lambda dt, msg=str(e): self.show(load_id, None, None, msg), 0)
+                return
+            if catalog.loaded:
+                publish(catalog, True)
+            if not (refresh or catalog.stale()):
+                return
+            Clock.schedule_once(lambda dt: self.show_status(load_id, "Checking for catalog updates..."), 0)
+            try:
+                mods, changed = catalog.refresh()
+            except ManagerError as e:
+                publish(catalog, False, str(e))
+                return
+            publish(catalog, changed or not self.rows, catalog.error)
+        threading.Thread(target=run, daemon=True).start()
+
+    def show(self, load_id, catalog, rows, error=None):
+        if load_id != self.load_id:
+            return
+        if catalog is not None:
+            self.catalog = catalog
+        if rows is not None:
+            self.rows = rows
+        self.apply_filter()
+        self.show_status(load_id, error)
+
+    def show_status(self, load_id, message=None):
+        if load_id != self.load_id:
+            return
+        if message:
+            self.status_label.text = message
+            return
+        if self.catalog is None or not self.catalog.loaded:
+            return
+        age = self.catalog.age()
+        when = "just now" if age < 60 else f"{age / 60:.0f} min ago" if age < 3600 else \
+            f"{age / 3600:.0f} h ago" if age < 86400 else f"{age / 86400:.0f} days ago"
+        self.status_label.text = f"{len(self.catalog.mods)} mods, checked {when}"
+
+    def apply_filter(self, *args):
+        if self.catalog is None or not self.rows:
+            data = []
+        else:
+            mods = self.catalog.search(self.search_input.text, CATALOG_SORTS[self.sort_spinner.text])
+            data = [self.rows[mod["dir"]] for mod in mods if mod["dir"] in self.rows]
+            if not data and self.catalog.mods:
+                data = [{'text': "No mods match the search.", 'mod_id': '', 'install': self.install}]
+        if data != self.view.data:
+            self.view.data = data
+
+    def install(self, mod_id):
+        if self.catalog is not None and mod_id:
+            self.on_install(self.catalog, self.catalog.get(mod_id))
@@ -0,0 +1,41 @@
+# The archive cache against benchmarks.release_server on localhost.
+#   python -m pytest tests
+import os
+import shutil
+
+import pytest
+
+from balatro_manager.cache import ArchiveCache
+from benchmarks.release_server import serve
+
+
+@pytest.fixture
+def server(tmp_path):
+    root = tmp_path / "srv"
+    root.mkdir()
+    server, base = serve(str(root))
+    yield root, base
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_after_cache_folder_was_deleted(server, tmp_path):
+    # The shared instance lives as long as the app; the user may clear its folder meanwhile.
+    root, base = server
+    (root / "mod.zip").write_bytes(os.urandom(100000))
+    cache = ArchiveCache.shared(str(tmp_path / "cache"))
+    path, sha256 = cache.fetch(base + "/mod.zip")
+    shutil.rmtree(tmp_path / "cache")
+    assert ArchiveCache.shared(str(tmp_path / "cache")) is cache
+    path, again = cache.fetch(base + "/mod.zip")
+    assert again == sha256 and os.path.isfile(path)
+
+
+def test_fetch_reuses_the_cached_archive(server, tmp_path):
+    root, base = server
+    (root / "mod.zip").write_bytes(os.urandom(100000))
+    cache = ArchiveCache.shared(str(tmp_path / "cache"))
+    path, sha256 = cache.fetch(base + "/mod.zip")
+    os.utime(path, (0, 0))
+    assert cache.fetch(base + "/mod.zip") == (path, sha256)
+    assert os.path.getmtime(path) == 0
@@ -0,0 +1,111 @@
+# The remote mod catalog against benchmarks.release_server on localhost.
+#   python -m pytest tests
+import os
+import json
+import zipfile
+import threading
+
+import pytest
+
+from balatro_manager import core
+from balatro_manager.catalog import Catalog, discard_download
+from benchmarks.release_server import serve
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # cache/ and state/ live under the working directory.
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def server(workdir):
+    root = workdir / "srv"
+    root.mkdir()
+    write_index(root, [{"id": "CoolMod", "name": "Cool Mod", "url": "cool.zip", "tags": ["jokers"]},
+                       {"id": "Other", "url": "other.zip"}])
+    with zipfile.ZipFile(root / "cool.zip", "w") as zf:
+        zf.writestr("CoolMod/main.lua", "return 1")
+    server, base = serve(str(root))
+    yield root, base
+    server.shutdown()
+    server.server_close()
+
+
+def write_index(root, mods):
+    (root / "index.json").write_text(json.dumps({"mods": mods}))
+
+
+def test_refresh_then_revalidate_with_304(server):
+    root, base = server
+    catalog = Catalog(base + "/index.json")
+    assert not catalog.loaded
+    mods, changed = catalog.refresh()
+    assert changed and [mod["dir"] for mod in mods] == ["CoolMod", "Other"]
+    assert mods[0]["download_url"] == base + "/cool.zip"
+    # A second instance starts from the cache file and only revalidates.
+    again = Catalog(base + "/index.json")
+    assert again.loaded and again.etag == catalog.etag
+    mods, changed = again.refresh()
+    assert not changed and len(mods) == 2 and again.error is None
+    assert [mod["dir"] for mod in again.search("jok")] == ["CoolMod"]
+
+
+def test_changed_index_is_picked_up(server):
+    root, base = server
+    catalog = Catalog(base + "/index.json")
+    catalog.refresh()
+    write_index(root, [{"id": "New", "url": "new.zip"}])
+    st = os.stat(root / "index.json")
+    os.utime(root / "index.json", (st.st_atime + 10, st.st_mtime + 10))
+    mods, changed = catalog.refresh()
+    assert changed and [mod["dir"] for mod in mods] == ["New"]
+
+
+def test_offline_and_unreachable_fall_back_to_the_cache(server):
+    root, base = server
+    url = base + "/index.json"
+    with pytest.raises(core.ManagerError):
+        Catalog(url).refresh(offline=True)
+    Catalog(url).refresh()
+    mods, changed = Catalog(url).refresh(offline=True)
+    assert len(mods) == 2 and not changed
+    (root / "index.json").unlink()
+    catalog = Catalog(url)
+    catalog.url = base + "/gone.json"
+    mods, changed = catalog.refresh()
+    assert len(mods) == 2 and not changed and catalog.error
+
+
+def test_unreachable_without_cache_fails(workdir):
+    with pytest.raises(core.ManagerError):
+        Catalog("http://127.0.0.1:9/index.json").refresh(timeout=2)
+
+
+def test_each_download_gets_its_own_file(server):
+    root, base = server
+    catalog = Catalog(base + "/index.json")
+    catalog.refresh()
+    paths = []
+    threads = [threading.Thread(target=lambda: paths.append(catalog.download("CoolMod"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    assert len(set(paths)) == 4
+    # Named after the mod, which is what install_mod names the folder after.
+    assert {os.path.basename(path) for path in paths} == {"CoolMod.zip"}
+    for path in paths:
+        assert zipfile.ZipFile(path).namelist() == ["CoolMod/main.lua"]
+        discard_download(path)
+        assert not os.path.exists(os.path.dirname(path))
+
+
+def test_install_removes_its_download(server, workdir):
+    root, base = server
+    catalog = Catalog(base + "/index.json")
+    catalog.refresh()
+    catalog.install("CoolMod", str(workdir / "Mods"))
+    assert (workdir / "Mods" / "CoolMod" / "main.lua").read_text() == "return 1"
+    assert os.listdir(workdir / "cache" / "catalog" / "downloads") == []
@@ -0,0 +1,196 @@
+# Downloads against benchmarks.release_server on localhost.
+#   python -m pytest tests
+import io
+import os
+import json
+import hashlib
+import tarfile
+import threading
+
+import pytest
+import requests
+
+from balatro_manager import download
+from benchmarks.release_server import serve
+
+# Long enough for any of these downloads; a test that hangs fails instead.
+DEADLINE = 30
+
+
+@pytest.fixture
+def server(tmp_path):
+    root = tmp_path / "srv"
+    root.mkdir()
+    server, base = serve(str(root))
+    yield root, base
+    server.shutdown()
+    server.server_close()
+
+
+def finish(target, *args, **kwargs):
+    # Runs target on a thread and returns its result or raises its exception.
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = target(*args, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(DEADLINE)
+    assert not thread.is_alive(), f"{target.__name__} did not return"
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
+
+
+def make_tar(path, files):
+    with tarfile.open(path, "w:gz") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# ----- Streaming tar.gz extraction -----
+def test_stream_extract_tar_extracts_and_tees(server, tmp_path):
+    root, base = server
+    sha = make_tar(root / "lovely.tar.gz", {"lovely/version.dll": os.urandom(200000), "lovely/a.txt": b"a"})
+    tee = tmp_path / "archive.part"
+    out = tmp_path / "out"
+    assert finish(download.stream_extract_tar, base + "/lovely.tar.gz", str(out), tee_path=str(tee)) == sha
+    assert (out / "lovely" / "a.txt").read_bytes() == b"a"
+    assert hashlib.sha256(tee.read_bytes()).hexdigest() == sha
+
+
+def test_stream_extract_tar_fails_when_tee_cannot_be_opened(server, tmp_path):
+    # Regression: the tee was opened outside the producer's try, and the reader waited forever.
+    root, base = server
+    make_tar(root / "lovely.tar.gz", {"lovely/version.dll": b"dll"})
+    with pytest.raises(FileNotFoundError):
+        finish(download.stream_extract_tar, base + "/lovely.tar.gz", str(tmp_path / "out"),
+               tee_path=str(tmp_path / "missing" / "archive.part"))
+
+
+def test_stream_extract_tar_reports_http_errors(server, tmp_path):
+    root, base = server
+    with pytest.raises(requests.HTTPError):
+        finish(download.stream_extract_tar, base + "/missing.tar.gz", str(tmp_path / "out"))
+
+
+# ----- Ranged, resumable downloads -----
+class RecordingSession(requests.Session):
+    # Remembers the Range header of every GET; before_get(n) runs ahead of the nth one.
+    def __init__(self, before_get=None):
+        super().__init__()
+        self.ranges = []
+        self.statuses = []
+        self.before_get = before_get
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            count = len(self.ranges)
+            self.ranges.append((kwargs.get("headers") or {}).get("Range"))
+        if self.before_get:
+            self.before_get(count)
+        r = super().get(url, **kwargs)
+        with self.lock:
+            self.statuses.append(r.status_code)
+        return r
+
+
+def requested_bytes(ranges):
+    total = 0
+    for header in ranges:
+        start, end = header[len("bytes="):].split("-")
+        total += int(end) - int(start) + 1
+    return total
+
+
+def test_split_covers_the_file_without_overlap():
+    size = 10 * download.MIN_SEGMENT_SIZE + 7
+    segments = download._split(size, 4)
+    assert len(segments) == 4
+    assert segments[0]["start"] == 0 and segments[-1]["end"] == size - 1
+    for a, b in zip(segments, segments[1:]):
+        assert b["start"] == a["end"] + 1
+    # Small files aren't worth more than one connection.
+    assert len(download._split(download.MIN_SEGMENT_SIZE - 1, 4)) == 1
+
+
+def test_download_file_fetches_ranges_in_parallel(server, tmp_path):
+    root, base = server
+    data = os.urandom(4 * download.MIN_SEGMENT_SIZE + 123)
+    (root / "big.bin").write_bytes(data)
+    session = RecordingSession()
+    dest = str(tmp_path / "big.bin")
+    finish(download.download_file, base + "/big.bin", dest, connections=4, session=session)
+    assert open(dest, "rb").read() == data
+    assert len(session.ranges) == 4 and all(session.ranges)
+    assert requested_bytes(session.ranges) == len(data)
+    assert not os.path.exists(dest + ".part") and not os.path.exists(dest + ".part.json")
+
+
+def interrupted_download(base, dest, size):
+    # Cancels a throttled download part way and returns what the resume state says was done.
+    cancel = threading.Event()
+    progress = lambda percent: cancel.set() if percent >= 20 else None
+    with pytest.raises(download.DownloadCancelled):
+        finish(download.download_file, base + "/big.bin", dest, progress, connections=2, cancel=cancel,
+               max_updates_per_second=1000)
+    with open(dest + ".part.json") as f:
+        state = json.load(f)
+    done = sum(segment["done"] for segment in state["segments"])
+    assert 0 < done < size
+    return done
+
+
+@pytest.fixture
+def slow_server(tmp_path):
+    root = tmp_path / "slow"
+    root.mkdir()
+    server, base = serve(str(root), bytes_per_second=4 * 1024 * 1024)
+    yield root, base
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_file_resumes_from_saved_state(slow_server, tmp_path):
+    root, base = slow_server
+    data = os.urandom(2 * download.MIN_SEGMENT_SIZE)
+    (root / "big.bin").write_bytes(data)
+    dest = str(tmp_path / "big.bin")
+    done = interrupted_download(base, dest, len(data))
+    session = RecordingSession()
+    finish(download.download_file, base + "/big.bin", dest, connections=2, session=session)
+    assert open(dest, "rb").read() == data
+    # Only what was missing is asked for again, and the server honoured If-Range.
+    assert requested_bytes(session.ranges) == len(data) - done
+    assert set(session.statuses) == {206}
+
+
+def test_download_file_restarts_when_the_file_changes_during_resume(slow_server, tmp_path):
+    root, base = slow_server
+    old = os.urandom(2 * download.MIN_SEGMENT_SIZE)
+    new = os.urandom(len(old))
+    path = root / "big.bin"
+    path.write_bytes(old)
+    dest = str(tmp_path / "big.bin")
+    interrupted_download(base, dest, len(old))
+
+    def replace(count):
+        # After the resume has probed the old version, before it asks for the rest.
+        if count == 0:
+            path.write_bytes(new)
+            st = os.stat(path)
+            os.utime(path, (st.st_atime + 10, st.st_mtime + 10))
+
+    session = RecordingSession(before_get=replace)
+    finish(download.download_file, base + "/big.bin", dest, connections=2, session=session)
+    assert open(dest, "rb").read() == new
+    assert 200 in session.statuses
@@ -0,0 +1,124 @@
+# Hover tracking through the shared dispatcher, headless against a stand-in window.
+#   python -m pytest tests
+import os
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+os.environ.setdefault("KIVY_NO_CONSOLELOG", "1")
+
+import pytest
+from kivy.properties import ListProperty
+from kivy.uix.floatlayout import FloatLayout
+
+import hover
+from hover import HoverButton, HoverDispatcher
+
+ROWS = 100
+ROW_HEIGHT = 50
+
+
+class FakeWindow(FloatLayout):
+    mouse_pos = ListProperty([0, 0])
+
+    def get_root_window(self):
+        return self
+
+
+class CountingButton(HoverButton):
+    # Counts hit tests and records hover transitions: False -> True is an enter,
+    # True -> False a leave.
+    collisions = 0
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.events = []
+        self.bind(hovered=lambda button, value: self.events.append("enter" if value else "leave"))
+
+    def collide_point(self, x, y):
+        CountingButton.collisions += 1
+        return super().collide_point(x, y)
+
+
+@pytest.fixture
+def window(monkeypatch):
+    window = FakeWindow(size=(800, ROWS * ROW_HEIGHT))
+    monkeypatch.setattr(hover, "hover_dispatcher", HoverDispatcher(window))
+    CountingButton.collisions = 0
+    return window
+
+
+def fill(layout, rows=ROWS):
+    # What a mods list refresh does: drop every row and build new ones.
+    layout.clear_widgets()
+    buttons = []
+    for i in range(rows):
+        button = CountingButton(size_hint=(None, None), size=(100, 40), pos=(300, i * ROW_HEIGHT))
+        layout.add_widget(button)
+        buttons.append(button)
+    return buttons
+
+
+def move(window, x, y):
+    before = CountingButton.collisions
+    window.mouse_pos = [x, y]
+    return CountingButton.collisions - before
+
+
+def test_mouse_move_tests_only_nearby_buttons_after_refresh(window):
+    layout = FloatLayout(size=window.size, size_hint=(None, None))
+    window.add_widget(layout)
+    for refresh in range(5):
+        buttons = fill(layout)
+        for i in (0, 37, ROWS - 1):
+            # A 40px row spans at most two 64px cells, so at most two rows share a cell.
+            tests = move(window, 310, i * ROW_HEIGHT + 20)
+            assert 1 <= tests <= 2
+            assert [b for b in buttons if b.hovered] == [buttons[i]]
+        # Nowhere near a row: nothing is hit-tested at all.
+        assert move(window, 50, 20) == 0
+        assert not any(b.hovered for b in buttons)
+    # Rows thrown away by earlier refreshes are off screen and never tested again.
+    assert len(hover.hover_dispatcher.grid.get((310 // 64, 20 // 64), ())) <= 2
+
+
+def test_enter_and_leave_fire_once_per_crossing(window):
+    layout = FloatLayout(size=window.size, size_hint=(None, None))
+    window.add_widget(layout)
+    first, second = fill(layout, 2)
+    move(window, 310, 10)
+    move(window, 320, 15)
+    assert first.events == ["enter"]
+    assert second.events == []
+    move(window, 310, ROW_HEIGHT + 10)
+    assert first.events == ["enter", "leave"]
+    assert second.events == ["enter"]
+    move(window, 10, 10)
+    assert second.events == ["enter", "leave"]
+    assert first.events == ["enter", "leave"]
+
+
+def test_refresh_clears_hover_on_removed_rows(window):
+    layout = FloatLayout(size=window.size, size_hint=(None, None))
+    window.add_widget(layout)
+    old = fill(layout, 3)
+    move(window, 310, 10)
+    assert old[0].events == ["enter"]
+    new = fill(layout, 3)
+    move(window, 311, 10)
+    assert old[0].events == ["enter", "leave"]
+    assert new[0].events == ["enter"]
+    assert sum(b.hovered for b in old + new) == 1
+
+
+def test_moved_button_is_found_at_its_new_position(window):
+    # RecycleView reuses rows by moving them rather than rebuilding them.
+    layout = FloatLayout(size=window.size, size_hint=(None, None))
+    window.add_widget(layout)
+    button, = fill(layout, 1)
+    move(window, 310, 10)
+    assert button.hovered
+    button.pos = (300, 1000)
+    move(window, 310, 11)
+    assert not button.hovered
+    move(window, 310, 1010)
+    assert button.hovered
+    assert button.events == ["enter", "leave", "enter"]